@@ -2,23 +2,77 @@
 
 from flask import Flask
 from dotenv import load_dotenv
+import importlib
 import os
 
 # --- Importe as INSTÂNCIAS do extensions.py ---
-from .extensions import db, rest_api, migrate, cors
-
-# --- Importe os Namespaces da API ---
-from .api.test_ns import test_ns
-from .api.journey_ns import journey_ns # Importe o novo namespace também
-
-load_dotenv()
-
-
-
-
-def create_app():
-    """Factory function para criar a instância da aplicação Flask."""
+from .extensions import (db, rest_api, cors, response_cache, pool_metrics, request_metrics, replica_router,
+                         journey_events)
+from .pool import engine_options_from_env
+from .replicas import STICKY_HEADER, parse_replica_urls, replica_binds
+from .startup import LazyGroup, StartupTimings
+from . import http_cache, partitioning, search, serialization
+
+# --- Namespaces da API ---
+# (módulo, namespace, prefixo da URL). Importados só dentro de create_app, e não no
+# import do pacote; API_NAMESPACES (ex.: 'journeys,costs') sobe apenas um subconjunto.
+API_NAMESPACES = (
+    ('.api.test_ns', 'test_ns', '/api/test'),
+    # Você adicionará outros namespaces (users_ns, projects_ns, etc.) aqui depois
+    # ('.api.users_ns', 'users_ns', '/api/users'),
+    ('.api.journey_ns', 'journey_ns', '/api/journeys'),
+    ('.api.cost_ns', 'cost_ns', '/api/costs'),
+    ('.api.analytics_ns', 'analytics_ns', '/api/analytics'),
+    ('.api.pacing_ns', 'pacing_ns', '/api/pacing'),
+    ('.api.search_ns', 'search_ns', '/api/search'),
+    ('.api.jobs_ns', 'jobs_ns', '/api/jobs'),
+    ('.api.system_ns', 'system_ns', '/api/system'),
+)
+
+
+def _env_flag(name, default='0'):
+    return os.getenv(name, default).lower() not in ('0', 'false', 'no', 'off')
+
+
+def _init_migrate(app):
+    """Flask-Migrate (importa o Alembic, ~150 ms); retorna o grupo 'flask db'."""
+    from flask_migrate import Migrate
+    from flask_migrate.cli import db as db_cli_group
+    # include_object: a coluna gerada search_vector, os índices de busca e as partições de costs ficam fora dos modelos
+    Migrate(app, db, include_object=_include_in_migrations)
+    return db_cli_group
+
+
+def _include_in_migrations(obj, name, type_, reflected, compare_to):
+    return (search.include_in_migrations(obj, name, type_, reflected, compare_to)
+            and partitioning.include_in_migrations(obj, name, type_, reflected, compare_to))
+
+
+def _register_namespaces(app):
+    """Importa e registra os namespaces habilitados em API_NAMESPACES."""
+    enabled = app.config['API_NAMESPACES']
+    for module_name, attr, path in API_NAMESPACES:
+        if enabled is not None and path.rsplit('/', 1)[-1] not in enabled:
+            continue
+        namespace = getattr(importlib.import_module(module_name, __name__), attr)
+        # O 'path' define o prefixo da URL para todas as rotas DENTRO deste namespace
+        # A rota '/hello' dentro de 'test_ns' se tornará '/api/test/hello'
+        rest_api.add_namespace(namespace, path=path)
+
+
+def create_app(fast_startup=None):
+    """Factory function para criar a instância da aplicação Flask.
+
+    fast_startup (padrão: FAST_STARTUP do ambiente) adia o Flask-Migrate/Alembic
+    para o primeiro 'flask db', para workers que só servem HTTP (autoscaling, cold start).
+    O tempo de cada fase fica em app.extensions['startup'] (ver check_cli.py --importtime).
+    """
+    timings = StartupTimings()
+    load_dotenv()
+    if fast_startup is None:
+        fast_startup = _env_flag('FAST_STARTUP')
     app = Flask(__name__)
+    app.config['FAST_STARTUP'] = fast_startup
 
     # --- Configuração do Banco de Dados ---
     database_url = os.getenv('DATABASE_URL')
@@ -28,31 +82,80 @@ def create_app():
         database_url = database_url.replace("postgres://", "postgresql://", 1)
     app.config['SQLALCHEMY_DATABASE_URI'] = database_url
     app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    # Pool de conexões: perfil em DB_POOL_PROFILE, ajustes finos em DB_* (ver backend/pool.py)
+    app.config['SQLALCHEMY_ENGINE_OPTIONS'] = engine_options_from_env(database_url)
+    # Réplicas de leitura (backend/replicas.py): URLs separadas por vírgula; vazio = tudo no primário
+    app.config['SQLALCHEMY_BINDS'] = replica_binds(parse_replica_urls(os.getenv('DATABASE_REPLICA_URLS')))
+    app.config['REPLICA_READ_YOUR_WRITES_SECONDS'] = float(os.getenv('REPLICA_READ_YOUR_WRITES_SECONDS', '5'))
+    app.config['REPLICA_RETRY_SECONDS'] = float(os.getenv('REPLICA_RETRY_SECONDS', '30'))
+    app.config['REPLICA_MAX_LAG_SECONDS'] = float(os.getenv('REPLICA_MAX_LAG_SECONDS', '0'))
+    app.config['REPLICA_CHECK_SECONDS'] = float(os.getenv('REPLICA_CHECK_SECONDS', '10'))
+    # Eventos SSE das jornadas (backend/journey_events.py): auto, memory, postgres (LISTEN/NOTIFY) ou none
+    app.config['LIVE_EVENTS_BACKEND'] = os.getenv('LIVE_EVENTS_BACKEND', 'auto')
+    app.config['LIVE_EVENTS_HEARTBEAT_SECONDS'] = float(os.getenv('LIVE_EVENTS_HEARTBEAT_SECONDS', '15'))
+    app.config['LIVE_EVENTS_MAX_SUBSCRIBERS'] = int(os.getenv('LIVE_EVENTS_MAX_SUBSCRIBERS', '1000'))
+    # Instrumentação (/metrics, log de consultas lentas); METRICS_ENABLED=0 desliga tudo
+    app.config['METRICS_ENABLED'] = os.getenv('METRICS_ENABLED', '1').lower() not in ('0', 'false', 'no', 'off')
+    app.config['SLOW_QUERY_MS'] = int(os.getenv('SLOW_QUERY_MS', '200'))
+    # Cache de respostas: 'lru' (em memória, por processo), 'redis' ou 'none'
+    app.config['CACHE_BACKEND'] = os.getenv('CACHE_BACKEND', 'lru')
+    app.config['CACHE_TTL'] = int(os.getenv('CACHE_TTL', '300'))
+    app.config['CACHE_MAX_ENTRIES'] = int(os.getenv('CACHE_MAX_ENTRIES', '2048'))
+    app.config['CACHE_REDIS_URL'] = os.getenv('CACHE_REDIS_URL', 'redis://localhost:6379/0')
+    # Serializador JSON das respostas: auto (orjson se instalado), orjson ou json
+    app.config['JSON_SERIALIZER'] = os.getenv('JSON_SERIALIZER', 'auto')
+    # Fila de jobs (backend/jobs.py): tentativas, backoff, lease do worker e tamanho máximo do arquivo enviado
+    app.config['JOBS_MAX_ATTEMPTS'] = int(os.getenv('JOBS_MAX_ATTEMPTS', '3'))
+    app.config['JOBS_BACKOFF_SECONDS'] = float(os.getenv('JOBS_BACKOFF_SECONDS', '10'))
+    app.config['JOBS_LEASE_SECONDS'] = int(os.getenv('JOBS_LEASE_SECONDS', '300'))
+    app.config['JOBS_POLL_INTERVAL'] = float(os.getenv('JOBS_POLL_INTERVAL', '1'))
+    app.config['JOBS_MAX_INPUT_BYTES'] = int(os.getenv('JOBS_MAX_INPUT_BYTES', str(512 * 2 ** 20)))
+    # Onde os workers gravam os arquivos gerados (ex.: exportações); compartilhado com os processos da API
+    app.config['JOBS_OUTPUT_DIR'] = os.getenv('JOBS_OUTPUT_DIR') or os.path.join(app.instance_path, 'job_outputs')
+    # Snapshot colunar dos custos (backend/cost_snapshot.py): diretório dos arquivos Arrow e folga do incremental
+    app.config['COST_SNAPSHOT_DIR'] = os.getenv('COST_SNAPSHOT_DIR') or os.path.join(app.instance_path, 'cost_snapshot')
+    app.config['COST_SNAPSHOT_OVERLAP_SECONDS'] = int(os.getenv('COST_SNAPSHOT_OVERLAP_SECONDS', '300'))
+    # Namespaces servidos por este processo, pelo prefixo da URL (ex.: 'journeys,costs'); vazio = todos
+    api_namespaces = os.getenv('API_NAMESPACES', '').strip()
+    app.config['API_NAMESPACES'] = {name.strip() for name in api_namespaces.split(',')} if api_namespaces else None
     # Adicione outras configurações do Flask aqui, se necessário (ex: SECRET_KEY)
     # app.config['SECRET_KEY'] = os.getenv('SECRET_KEY', 'uma-chave-secreta-default-para-dev')
+    timings.mark('config')
 
 
     # --- Inicializar Extensões com a App ---
     db.init_app(app) # Associa SQLAlchemy com a app
+    timings.mark('sqlalchemy')
+    pool_metrics.init_app(app) # Contadores do pool (checkouts, overflow, espera, invalidações)
+    request_metrics.init_app(app) # Histogramas por rota e contagem/tempo de SQL por requisição
     rest_api.init_app(app) # Associa Flask-RESTX com a app
-    cors.init_app(app) # <--- 2. Inicialize CORS com a app (configuração básica para dev)
+    replica_router.init_app(app) # GETs da API nas réplicas (antes de registrar os namespaces)
+    serialization.init_app(app) # Representação application/json via orjson (Decimal/datetime nativos)
+    response_cache.init_app(app) # Cache de respostas da API
+    journey_events.init_app(app) # Publica no commit as alterações de jornadas para os streams SSE
+    http_cache.init_app(app) # ETag/Last-Modified, 304 e compressão gzip/brotli em todas as rotas
+    cors.init_app(app, expose_headers=[STICKY_HEADER]) # <--- 2. Inicialize CORS com a app (configuração básica para dev; expõe o header de read-your-writes das réplicas)
     # Alternativa mais segura para produção (especificando origem):
     # cors_origins = os.getenv('CORS_ORIGINS', 'http://localhost:5173').split(',') # Exemplo
     # CORS(app, resources={r"/api/*": {"origins": cors_origins}})
-    
-    migrate.init_app(app, db) # Inicializa Migrate aqui
+    timings.mark('extensions')
+
+    # Inicializa Migrate aqui; no modo rápido, só quando um comando 'flask db' for usado
+    if fast_startup:
+        app.cli.add_command(LazyGroup('db', lambda: _init_migrate(app), help='Perform database migrations.'))
+    else:
+        _init_migrate(app)
+    timings.mark('migrate')
 
     # --- IMPORTANTE: Importar modelos DEPOIS de inicializar db ---
     from . import models
+    from . import rollups  # Registra a manutenção incremental de cost_rollups
     # --- FIM DA IMPORTAÇÃO ---
+    timings.mark('models')
 
     # --- Registrar Namespaces da API ---
-    # O 'path' define o prefixo da URL para todas as rotas DENTRO deste namespace
-    # A rota '/hello' dentro de 'test_ns' se tornará '/api/test/hello'
-    rest_api.add_namespace(test_ns, path='/api/test')
-    # Você adicionará outros namespaces (users_ns, projects_ns, etc.) aqui depois
-    # api.add_namespace(users_ns, path='/api/users')
-    rest_api.add_namespace(journey_ns, path='/api/journeys')
+    _register_namespaces(app)
+    timings.mark('namespaces')
 
     # --- Rotas Flask Padrão (Opcional) ---
     # Mantenha apenas se fizer sentido ter rotas fora da API RESTX
@@ -74,6 +177,12 @@ def create_app():
         except Exception as e:
             print(f'Falha ao conectar com o banco de dados: {e}')
 
+    # --- Comandos CLI do MidasPipe (exportação, etc.) ---
+    from .commands import register_commands
+    register_commands(app)
+    timings.mark('commands')
+
+    app.extensions['startup'] = timings
     return app
 
 # Código para rodar com 'python app.py' (geralmente não necessário se usar 'flask run')
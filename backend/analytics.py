@@ -0,0 +1,117 @@
+# backend/analytics.py
+# Gasto agregado por período (dia/semana/mês), calculado inteiramente no PostgreSQL
+
+from sqlalchemy import Date, Interval, cast, func, literal, select, true
+
+from .extensions import db
+from .models import Cost, Step
+
+BUCKETS = ('day', 'week', 'month')
+GROUP_BY = ('none', 'cost_type', 'channel', 'step')
+
+
+class AnalyticsUnsupported(RuntimeError):
+    """Consulta analítica pedida em um banco sem date_trunc/generate_series."""
+
+
+def cost_period_bounds():
+    """Expressões (início, fim) do período de um custo.
+
+    Sem timePeriod_start, o custo vale só para o dia (UTC) de occoured_at; sem
+    timePeriod_end, só para o dia de início. 'AT TIME ZONE' torna a expressão
+    imutável, o que permite indexá-la (ver migração dos índices de analytics).
+    """
+    start = func.coalesce(Cost.timePeriod_start, cast(func.timezone('UTC', Cost.occoured_at), Date))
+    end = func.coalesce(Cost.timePeriod_end, start)
+    return start, end
+
+
+def spend_by_bucket(bucket='month', group_by='none', journey_id=None, step_id=None, channel=None,
+                    cost_type=None, date_from=None, date_to=None):
+    """Soma o gasto por período, rateando custos que cobrem vários períodos.
+
+    Cada custo com timePeriod_start..timePeriod_end é distribuído entre os
+    períodos que cobre, proporcionalmente aos dias de sobreposição. O rateio é
+    feito em SQL: um generate_series LATERAL produz os períodos de cada custo,
+    e o GROUP BY soma as frações, sem trazer linhas para o Python.
+    """
+    if bucket not in BUCKETS:
+        raise ValueError(f"Período inválido: {bucket!r}")
+    if group_by not in GROUP_BY:
+        raise ValueError(f"Agrupamento inválido: {group_by!r}")
+    if db.session.get_bind().dialect.name != 'postgresql':
+        raise AnalyticsUnsupported('Analytics de gasto requer PostgreSQL')
+
+    period_start, period_end = cost_period_bounds()
+    costs = (
+        select(Cost.value, Cost.cost_type, Cost.step_id, Step.channel,
+               period_start.label('period_start'), period_end.label('period_end'))
+        .join(Step, Step.id == Cost.step_id)
+    )
+    if journey_id is not None:
+        costs = costs.where(Step.journey_id == journey_id)
+    if step_id is not None:
+        costs = costs.where(Cost.step_id == step_id)
+    if channel is not None:
+        costs = costs.where(Step.channel == channel)
+    if cost_type is not None:
+        costs = costs.where(Cost.cost_type == cost_type)
+    if date_from is not None:
+        costs = costs.where(period_end >= date_from)
+    if date_to is not None:
+        costs = costs.where(period_start <= date_to)
+    costs = costs.cte('c')
+
+    step = cast(literal(f'1 {bucket}'), Interval)
+    series = (
+        func.generate_series(func.date_trunc(bucket, costs.c.period_start),
+                             func.date_trunc(bucket, costs.c.period_end), step)
+        .table_valued('bucket_start')
+        .render_derived(name='b')
+        .lateral()
+    )
+    bucket_first_day = cast(series.c.bucket_start, Date)
+    bucket_last_day = cast(series.c.bucket_start + step, Date) - 1
+    overlap_days = (func.least(costs.c.period_end, bucket_last_day)
+                    - func.greatest(costs.c.period_start, bucket_first_day) + 1)
+    total_days = costs.c.period_end - costs.c.period_start + 1
+    share = costs.c.value * overlap_days / total_days
+
+    key = {
+        'none': None,
+        'cost_type': costs.c.cost_type,
+        'channel': costs.c.channel,
+        'step': costs.c.step_id,
+    }[group_by]
+    group_columns = [bucket_first_day] if key is None else [bucket_first_day, key]
+    columns = [bucket_first_day.label('bucket_start')]
+    if key is not None:
+        columns.append(key.label('key'))
+    query = (
+        select(*columns, func.round(func.sum(share), 2).label('spent'))
+        .select_from(costs)
+        .join(series, true())
+        .group_by(*group_columns)
+        .order_by(*group_columns)
+    )
+    if date_from is not None:
+        query = query.where(bucket_first_day >= func.date_trunc(bucket, cast(date_from, Date)))
+    if date_to is not None:
+        query = query.where(bucket_first_day <= date_to)
+
+    series_rows = []
+    total = 0.0
+    for row in db.session.execute(query):
+        spent = float(row.spent or 0)
+        total += spent
+        item = {'bucket_start': row.bucket_start.isoformat(), 'spent': spent}
+        if key is not None:
+            item['key'] = row.key
+        series_rows.append(item)
+
+    return {
+        'bucket': bucket,
+        'group_by': group_by,
+        'total': round(total, 2),
+        'series': series_rows,
+    }
@@ -0,0 +1,92 @@
+# backend/api/analytics_ns.py
+
+from flask import current_app
+from flask_restx import Namespace, Resource, inputs
+
+from ..analytics import BUCKETS, GROUP_BY, AnalyticsUnsupported, spend_by_bucket
+from ..cost_snapshot import (SNAPSHOT_GROUP_BY, CostSnapshotError, CostSnapshotUnavailable, query_cost_snapshot,
+                             snapshot_status)
+from ..jobs import JobError, enqueue_job
+from .jobs_ns import accepted
+
+analytics_ns = Namespace('analytics', description='Consultas analíticas sobre Custos')
+
+spend_parser = analytics_ns.parser()
+spend_parser.add_argument('bucket', type=str, default='month', choices=BUCKETS, location='args',
+                          help='Granularidade: day, week ou month')
+spend_parser.add_argument('group_by', type=str, default='none', choices=GROUP_BY, location='args',
+                          help='Quebra adicional: cost_type, channel ou step')
+spend_parser.add_argument('journey_id', type=int, location='args')
+spend_parser.add_argument('step_id', type=int, location='args')
+spend_parser.add_argument('channel', type=str, location='args')
+spend_parser.add_argument('cost_type', type=str, location='args')
+spend_parser.add_argument('from', type=inputs.date_from_iso8601, dest='date_from', location='args',
+                          help='Data inicial (YYYY-MM-DD)')
+spend_parser.add_argument('to', type=inputs.date_from_iso8601, dest='date_to', location='args',
+                          help='Data final (YYYY-MM-DD)')
+
+
+@analytics_ns.route('/spend')
+class SpendAnalyticsResource(Resource):
+    @analytics_ns.expect(spend_parser)
+    def get(self):
+        """Gasto por dia/semana/mês, com rateio de custos que cobrem vários períodos."""
+        args = spend_parser.parse_args()
+        try:
+            return spend_by_bucket(**args)
+        except AnalyticsUnsupported as e:
+            return {'message': str(e)}, 501
+
+
+# --- Snapshot colunar (Arrow em disco, ver cost_snapshot.py): consultas sem tocar no banco ---
+snapshot_parser = analytics_ns.parser()
+snapshot_parser.add_argument('group_by', type=str, default='month', location='args',
+                             help=f"Colunas separadas por vírgula: {', '.join(SNAPSHOT_GROUP_BY)} (vazio = total)")
+snapshot_parser.add_argument('from', type=str, dest='month_from', location='args', help='Mês inicial (YYYY-MM)')
+snapshot_parser.add_argument('to', type=str, dest='month_to', location='args', help='Mês final (YYYY-MM)')
+snapshot_parser.add_argument('channel', type=str, location='args')
+snapshot_parser.add_argument('step_type', type=str, location='args')
+snapshot_parser.add_argument('cost_type', type=str, location='args')
+snapshot_parser.add_argument('user_id', type=int, location='args')
+snapshot_parser.add_argument('journey_id', type=int, location='args')
+snapshot_parser.add_argument('step_id', type=int, location='args')
+
+
+@analytics_ns.route('/snapshot')
+class CostSnapshotResource(Resource):
+    def get(self):
+        """Estado do snapshot colunar: marca d'água, última atualização, meses e linhas."""
+        status = snapshot_status(current_app.config['COST_SNAPSHOT_DIR'])
+        if status is None:
+            return {'message': "Snapshot de custos ainda não gerado (flask refresh-cost-snapshot)"}, 404
+        return status
+
+
+@analytics_ns.route('/snapshot/spend')
+class CostSnapshotSpendResource(Resource):
+    @analytics_ns.expect(snapshot_parser)
+    def get(self):
+        """Gasto e número de custos agrupados, lidos do snapshot (atualizado até a marca d'água)."""
+        args = snapshot_parser.parse_args()
+        group_by = [key.strip() for key in (args.pop('group_by') or '').split(',') if key.strip()]
+        try:
+            return query_cost_snapshot(current_app.config['COST_SNAPSHOT_DIR'], group_by, **args)
+        except ValueError as e:
+            return {'message': str(e)}, 400
+        except CostSnapshotUnavailable as e:
+            return {'message': str(e)}, 501
+        except CostSnapshotError as e:
+            return {'message': str(e)}, 503
+
+
+@analytics_ns.route('/snapshot/refresh')
+class CostSnapshotRefreshResource(Resource):
+    def post(self):
+        """Enfileira a atualização do snapshot ({"full": true} reexporta tudo); acompanhe em /api/jobs/<id>."""
+        dados = analytics_ns.payload or {}
+        try:
+            job = enqueue_job('refresh_cost_snapshot', {'full': bool(dados.get('full')),
+                                                        'reconcile': dados.get('reconcile', True)})
+        except JobError as e:
+            return {'message': str(e)}, 400
+        return accepted(job)
@@ -0,0 +1,60 @@
+# backend/api/cost_ns.py
+
+import io
+
+from flask import current_app, request
+from flask_restx import Namespace, Resource, inputs
+
+from ..cost_import import IMPORT_BATCH_SIZE, IMPORT_FORMATS, import_costs
+from ..jobs import JobError, enqueue_job
+from .jobs_ns import accepted
+
+cost_ns = Namespace('costs', description='Operações relacionadas a Custos (Costs)')
+
+# Content-Types aceitos no corpo da importação
+IMPORT_CONTENT_TYPES = {
+    'text/csv': 'csv',
+    'application/x-ndjson': 'ndjson',
+    'application/ndjson': 'ndjson',
+}
+
+cost_import_parser = cost_ns.parser()
+cost_import_parser.add_argument('format', type=str, choices=IMPORT_FORMATS, location='args',
+                                help='csv ou ndjson (padrão: deduzido do Content-Type)')
+cost_import_parser.add_argument('batch_size', type=int, default=IMPORT_BATCH_SIZE, location='args',
+                                help='Linhas por lote/transação')
+cost_import_parser.add_argument('async', type=inputs.boolean, default=False, location='args',
+                                help="true: enfileira um job import_costs e responde 202 (acompanhe em /api/jobs/<id>)")
+
+
+@cost_ns.route('/import')
+class CostImportResource(Resource):
+    @cost_ns.expect(cost_import_parser)
+    def post(self):
+        """Importa Custos em massa (CSV ou NDJSON no corpo), com UPSERT idempotente."""
+        args = cost_import_parser.parse_args()
+        fmt = args['format'] or IMPORT_CONTENT_TYPES.get(request.mimetype)
+        if fmt is None:
+            return {'message': 'Informe ?format=csv|ndjson ou um Content-Type text/csv / application/x-ndjson'}, 415
+        batch_size = max(1, args['batch_size'] or IMPORT_BATCH_SIZE)
+
+        if args['async']:
+            # O arquivo vai para a tabela jobs; o worker importa fora da requisição. O limite
+            # vale antes de ler: pelo Content-Length e, sem ele (chunked), lendo no máximo limite + 1
+            max_input = current_app.config['JOBS_MAX_INPUT_BYTES']
+            too_large = {'message': f'Arquivo de entrada maior que o limite de {max_input} bytes (JOBS_MAX_INPUT_BYTES)'}
+            if request.content_length is not None and request.content_length > max_input:
+                return too_large, 413
+            input_data = request.stream.read(max_input + 1)
+            if len(input_data) > max_input:
+                return too_large, 413
+            try:
+                job = enqueue_job('import_costs', {'format': fmt, 'batch_size': batch_size}, input_data=input_data)
+            except JobError as e:
+                return {'message': str(e)}, 400
+            return accepted(job)
+
+        # Lê o corpo como stream de texto, sem carregar o arquivo inteiro
+        stream = io.TextIOWrapper(request.stream, encoding='utf-8-sig', newline='')
+        report = import_costs(stream, fmt, batch_size=batch_size)
+        return report, 200
@@ -0,0 +1,79 @@
+# backend/api/jobs_ns.py
+
+from flask import Response, current_app, send_from_directory
+from flask_restx import Namespace, Resource, inputs
+
+from ..jobs import JOB_STATUSES, JobError, cancel_job, enqueue_job, job_summary, list_jobs
+from ..models import Job
+
+jobs_ns = Namespace('jobs', description="Operações pesadas em segundo plano (executadas por 'flask jobs-worker')")
+
+JOBS_MAX_LIMIT = 500
+
+jobs_list_parser = jobs_ns.parser()
+jobs_list_parser.add_argument('status', type=str, choices=JOB_STATUSES, location='args')
+jobs_list_parser.add_argument('kind', type=str, location='args')
+jobs_list_parser.add_argument('limit', type=inputs.int_range(1, JOBS_MAX_LIMIT), default=50, location='args')
+
+
+def accepted(job):
+    """Resposta 202 de um job enfileirado, com Location apontando para o status."""
+    return job_summary(job), 202, {'Location': f'/api/jobs/{job.id}'}
+
+
+@jobs_ns.route('/')
+class JobListResource(Resource):
+    @jobs_ns.expect(jobs_list_parser)
+    def get(self):
+        """Lista os jobs mais recentes (filtros por status e tipo)."""
+        args = jobs_list_parser.parse_args()
+        return {'items': list_jobs(args['status'], args['kind'], args['limit'])}
+
+    def post(self):
+        """Enfileira um job: {"kind": ..., "payload": {...}, "max_attempts": N}.
+
+        Tipos: export_journeys, rebuild_cost_rollups, pace_steps, clone_journey, refresh_cost_snapshot; importação de custos: POST /api/costs/import?async=true.
+        """
+        dados = jobs_ns.payload or {}
+        if not isinstance(dados.get('payload') or {}, dict):
+            return {'message': "'payload' deve ser um objeto"}, 400
+        max_attempts = dados.get('max_attempts')
+        if max_attempts is not None and not isinstance(max_attempts, int):
+            return {'message': "'max_attempts' deve ser um inteiro"}, 400
+        try:
+            job = enqueue_job(dados.get('kind'), dados.get('payload'), max_attempts=max_attempts)
+        except JobError as e:
+            return {'message': str(e)}, 400
+        return accepted(job)
+
+
+@jobs_ns.route('/<int:job_id>')
+class JobResource(Resource):
+    def get(self, job_id):
+        """Status, progresso e resultado de um job."""
+        return job_summary(Job.query.get_or_404(job_id))
+
+    def delete(self, job_id):
+        """Cancela um job que ainda está na fila."""
+        job = Job.query.get_or_404(job_id)
+        if not cancel_job(job.id):
+            return {'message': f'Job {job_id} já começou ou terminou ({job.status})'}, 409
+        return '', 204
+
+
+@jobs_ns.route('/<int:job_id>/output')
+class JobOutputResource(Resource):
+    def get(self, job_id):
+        """Arquivo gerado pelo job (ex.: exportação), depois que ele termina."""
+        job = Job.query.get_or_404(job_id)
+        if job.status != 'succeeded':
+            return {'message': f'Job {job_id} ainda não terminou com sucesso ({job.status})'}, 409
+        if job.output_mimetype is None:
+            return {'message': f'Job {job_id} não gera arquivo'}, 404
+        if job.output_path is not None:
+            # Lido do disco em blocos, sem carregar o arquivo na memória
+            return send_from_directory(current_app.config['JOBS_OUTPUT_DIR'], job.output_path,
+                                       mimetype=job.output_mimetype, as_attachment=True,
+                                       download_name=job.output_filename)
+        return Response(job.output_data, mimetype=job.output_mimetype,
+                        headers={'Content-Disposition': f'attachment; filename={job.output_filename}'})
@@ -1,8 +1,27 @@
 # backend/api/journey_ns.py (Arquivo renomeado)
 
+import datetime
+
+from flask import Response, g, stream_with_context
 from flask_restx import Namespace, Resource
-from ..extensions import db
-from ..models import Journey # Importa o modelo renomeado
+from sqlalchemy import func, select
+from ..extensions import db, journey_events, response_cache
+from ..models import Journey, Step, Cost, StepEdge # Importa o modelo renomeado
+from ..http_cache import conditional
+from ..export import EXPORT_FORMATS, EXPORT_MIMETYPES, iter_export
+from ..canvas import COST_MODES, load_journey_canvas
+from ..jobs import JobError, enqueue_job
+from ..journey_events import LiveEventsError
+from ..journey_clone import JourneyCloneError, clone_journey, clone_options
+from ..journey_delete import JourneyDeleteError, delete_journeys
+from ..journey_queries import (LIST_DEFAULT_LIMIT, LIST_MAX_LIMIT, clamp_limit, journey_item_payload,
+                               journey_item_statement, journey_list_page, journey_list_statement,
+                               journey_list_version_statement)
+from ..rollups import journey_spend_summary
+from ..step_batch import StepBatchError, apply_step_updates
+from ..step_graph import (GraphCycleError, StepGraphError, add_step_edge, dependency_report, list_step_edges,
+                          remove_step_edge, slip_impact)
+from .jobs_ns import accepted
 
 # Renomeia o namespace
 journey_ns = Namespace('journeys', description='Operações relacionadas a Jornadas (Journeys)')
@@ -10,13 +29,101 @@ journey_ns = Namespace('journeys', description='Operações relacionadas a Jorna
 # Modelos para marshalling (definir depois)
 # journey_output_model = journey_ns.model('JourneyOutput', { ... })
 
+# --- Cache de respostas ---
+# Itens: a chave inclui journeys.version, lida do banco a cada GET e trocada no
+# commit de qualquer escrita na jornada (ver journey_events.bump_journey_versions),
+# então um commit nunca é servido a partir de uma entrada antiga, em nenhum worker.
+# Listagem: a chave inclui count/sum/max(version) das jornadas filtradas, do mesmo jeito.
+
+
+def _journey_versions(journey_id):
+    """journeys.version e a última alteração da jornada/passos, pela PK; None se a jornada não existir.
+
+    Lidas do banco a cada GET e nunca guardadas no cache: com o LRU (por processo),
+    um token memorizado não veria o PUT feito em outro worker.
+    """
+    return db.session.execute(
+        select(
+            Journey.version,
+            func.coalesce(Journey.modificated_at, Journey.created_at).label('journey_changed_at'),
+            select(func.max(func.coalesce(Step.modificated_at, Step.created_at)))
+            .where(Step.journey_id == journey_id).scalar_subquery().label('steps_changed_at'),
+        ).where(Journey.id == journey_id)
+    ).first()
+
+
+def _journey_cache_key(journey_id):
+    """Chave do item na versão atual da jornada; None se a jornada não existir."""
+    # Lida pelo validador (@conditional) logo antes, no mesmo GET: uma consulta só
+    memo = g.pop('_journey_versions', None)
+    versions = memo[1] if memo is not None and memo[0] == journey_id else _journey_versions(journey_id)
+    if versions is None:
+        return None
+    return f'journey:{journey_id}@{versions.version}'
+
+
+# --- Validadores HTTP (ETag / Last-Modified) ---
+# O ETag vem de journeys.version, que muda a cada commit; os timestamps (resolução de
+# segundos no SQLite) só alimentam o Last-Modified.
+def _journey_validators(journey_id):
+    """ETag pela versão da jornada; Last-Modified pela jornada e pelo passo alterado por último."""
+    versions = _journey_versions(journey_id)
+    if versions is None:
+        return None
+    g._journey_versions = (journey_id, versions)
+    last_modified = max((v for v in (versions.journey_changed_at, versions.steps_changed_at) if v is not None),
+                        default=None)
+    return f'journey:{journey_id}@{versions.version}', last_modified
+
+
+def _journey_tree_validators(journey_id):
+    """Validadores da árvore (jornada, passos, custos e dependências) em uma única consulta."""
+    journey_steps = Step.journey_id == journey_id
+    row = db.session.execute(
+        select(
+            Journey.version,
+            func.coalesce(Journey.modificated_at, Journey.created_at).label('journey_changed_at'),
+            select(func.max(func.coalesce(Step.modificated_at, Step.created_at)))
+            .where(journey_steps).scalar_subquery().label('steps_changed_at'),
+            select(func.max(func.coalesce(Cost.modificated_at, Cost.created_at)))
+            .join(Step, Step.id == Cost.step_id).where(journey_steps).scalar_subquery().label('costs_changed_at'),
+            select(func.max(StepEdge.created_at))
+            .where(StepEdge.journey_id == journey_id).scalar_subquery().label('edges_changed_at'),
+        ).where(Journey.id == journey_id)
+    ).first()
+    if row is None:
+        return None
+    changed = [v for v in tuple(row)[1:] if v is not None]
+    return f'journey-tree:{journey_id}@{row.version}', max(changed) if changed else None
+
+
+# --- Parâmetros de listagem (paginação por cursor / keyset) ---
+journey_list_parser = journey_ns.parser()
+journey_list_parser.add_argument('limit', type=int, default=LIST_DEFAULT_LIMIT, location='args',
+                                 help=f'Quantidade de itens por página (máx. {LIST_MAX_LIMIT})')
+journey_list_parser.add_argument('cursor', type=int, location='args',
+                                 help='Valor de next_cursor retornado pela página anterior')
+journey_list_parser.add_argument('status', type=str, location='args', help='Filtra por status')
+journey_list_parser.add_argument('user_id', type=int, location='args', help='Filtra pelo usuário criador')
+journey_list_parser.add_argument('name', type=str, location='args',
+                                 help='Filtra por prefixo do nome (usa o índice ix_journeys_name)')
+
 @journey_ns.route('/') # Rota base é /api/journeys/ (definido no __init__.py)
 class JourneyListResource(Resource): # Nome da classe atualizado (opcional)
+    @journey_ns.expect(journey_list_parser)
     def get(self):
-        """Lista todas as Jornadas."""
-        journeys = Journey.query.all() # Usa o modelo Journey
-        # ATUALIZAR a forma como os dados são retornados se necessário
-        return [{'id': j.id, 'nome': j.name, 'descricao': j.description, 'status': j.status} for j in journeys]
+        """Lista as Jornadas, paginadas por cursor (keyset em id)."""
+        args = journey_list_parser.parse_args()
+        args['limit'] = clamp_limit(args['limit'])
+        count, total, latest = db.session.execute(journey_list_version_statement(**args)).one()
+        key = f'journeys:list:{count}:{total}:{latest}:' + '&'.join(f'{k}={args[k]}' for k in sorted(args))
+        return response_cache.get_or_set(key, lambda: self._list_page(args))
+
+    @staticmethod
+    def _list_page(args):
+        """Consulta uma página da listagem (chamado apenas em cache miss)."""
+        rows = db.session.execute(journey_list_statement(**args)).all()
+        return journey_list_page(rows, args['limit'])
 
     def post(self):
         """Cria uma nova Jornada."""
@@ -41,11 +148,21 @@ class JourneyListResource(Resource): # Nome da classe atualizado (opcional)
 # Renomear parâmetro na rota e na função
 @journey_ns.route('/<int:journey_id>')
 class JourneyResource(Resource): # Nome da classe atualizado (opcional)
+    @conditional(_journey_validators)
     def get(self, journey_id): # Parâmetro atualizado
         """Busca uma Jornada específica pelo ID."""
-        journey = Journey.query.get_or_404(journey_id) # Usa o modelo Journey
-        # ATUALIZAR retorno se necessário
-        return {'id': journey.id, 'nome': journey.name, 'descricao': journey.description, 'status': journey.status}
+        key = _journey_cache_key(journey_id)
+        if key is None:
+            journey_ns.abort(404)
+        cached = response_cache.get(key)
+        if cached is not None:
+            return cached
+        row = db.session.execute(journey_item_statement(journey_id)).first()
+        if row is None:
+            journey_ns.abort(404)
+        payload = journey_item_payload(row)
+        response_cache.set(key, payload)
+        return payload
 
     def put(self, journey_id): # Parâmetro atualizado
         """Atualiza uma Jornada existente."""
@@ -55,15 +172,236 @@ class JourneyResource(Resource): # Nome da classe atualizado (opcional)
         journey.name = dados.get('nome', journey.name)
         journey.description = dados.get('descricao', journey.description)
         journey.status = dados.get('status', journey.status)
-        db.session.commit()
+        db.session.commit()  # Troca journeys.version: novo ETag e novas chaves do item e da listagem
         # ATUALIZAR retorno se necessário
         return {'id': journey.id, 'nome': journey.name, 'status': journey.status}
 
 
     def delete(self, journey_id): # Parâmetro atualizado
-        """Deleta uma Jornada."""
-        journey = Journey.query.get_or_404(journey_id) # Usa o modelo Journey
-        # ... (lógica como antes) ...
-        db.session.delete(journey)
+        """Deleta uma Jornada (Passos e Custos são removidos pelo banco, sem carregá-los)."""
+        if not delete_journeys([journey_id]):
+            journey_ns.abort(404)
+        db.session.commit()
+        # Item: sem a linha no banco, o GET responde 404 antes de ler o cache
+        return '', 204 # Retorno vazio com status 204
+
+
+@journey_ns.route('/bulk-delete')
+class JourneyBulkDeleteResource(Resource):
+    def post(self):
+        """Deleta várias Jornadas de uma vez: {"ids": [1, 2, ...]} (até 1000 por pedido)."""
+        ids = (journey_ns.payload or {}).get('ids')
+        if not isinstance(ids, list) or not ids or not all(isinstance(i, int) and not isinstance(i, bool) for i in ids):
+            return {'message': "'ids' deve ser uma lista não vazia de inteiros"}, 400
+        try:
+            deleted = delete_journeys(ids)
+        except JourneyDeleteError as e:
+            return {'message': str(e)}, 400
         db.session.commit()
-        return '', 204 # Retorno vazio com status 204
\ No newline at end of file
+        return {'deleted': deleted, 'not_found': sorted(set(ids) - set(deleted))}
+
+
+# --- Exportação em streaming (Journey -> Step -> Cost) ---
+journey_export_parser = journey_ns.parser()
+journey_export_parser.add_argument('format', type=str, default='ndjson', choices=EXPORT_FORMATS,
+                                   location='args', help='Formato da exportação (ndjson ou csv)')
+journey_export_parser.add_argument('user_id', type=int, location='args', help='Filtra pelo usuário criador')
+
+
+def _export_response(fmt, journey_id=None, user_id=None):
+    """Resposta gerada sob demanda: os primeiros bytes saem antes de a consulta terminar."""
+    extension = 'ndjson' if fmt == 'ndjson' else 'csv'
+    filename = f'journey_{journey_id}.{extension}' if journey_id else f'journeys.{extension}'
+    return Response(
+        stream_with_context(iter_export(fmt, journey_id=journey_id, user_id=user_id)),
+        mimetype=EXPORT_MIMETYPES[fmt],
+        headers={'Content-Disposition': f'attachment; filename={filename}'},
+    )
+
+
+@journey_ns.route('/export')
+class JourneyExportResource(Resource):
+    @journey_ns.expect(journey_export_parser)
+    def get(self):
+        """Exporta todas as Jornadas com seus Passos e Custos."""
+        args = journey_export_parser.parse_args()
+        return _export_response(args['format'], user_id=args['user_id'])
+
+
+@journey_ns.route('/<int:journey_id>/export')
+class JourneyItemExportResource(Resource):
+    @journey_ns.expect(journey_export_parser)
+    def get(self, journey_id):
+        """Exporta uma Jornada com seus Passos e Custos."""
+        args = journey_export_parser.parse_args()
+        # Confirma a existência antes de abrir o stream (para poder responder 404)
+        db.session.query(Journey.id).filter(Journey.id == journey_id).first_or_404()
+        return _export_response(args['format'], journey_id=journey_id)
+
+
+# --- Alterações em tempo real (Server-Sent Events, ver journey_events.py) ---
+@journey_ns.route('/<int:journey_id>/events')
+class JourneyEventsResource(Resource):
+    def get(self, journey_id):
+        """Stream text/event-stream com um delta ('change') a cada commit que altera a Jornada.
+
+        No evento 'ready' o cliente carrega o grafo; depois recarrega só o que cada delta indicar.
+        """
+        db.session.query(Journey.id).filter(Journey.id == journey_id).first_or_404()
+        try:
+            subscription = journey_events.subscribe(journey_id)
+        except LiveEventsError as e:
+            return {'message': str(e)}, 503
+        response = Response(journey_events.event_stream(subscription), mimetype='text/event-stream',
+                            headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+        # Se o stream nunca for iterado, o finally do gerador não roda
+        response.call_on_close(lambda: journey_events.unsubscribe(subscription))
+        return response
+
+
+# --- Grafo completo da jornada (payload do canvas) ---
+journey_graph_parser = journey_ns.parser()
+journey_graph_parser.add_argument('costs', type=str, default='list', choices=COST_MODES, location='args',
+                                  help='list: custos de cada passo; totals: totais por passo/cost_type; none: sem custos')
+
+
+@journey_ns.route('/<int:journey_id>/graph')
+class JourneyGraphResource(Resource):
+    @journey_ns.expect(journey_graph_parser)
+    @conditional(_journey_tree_validators)
+    def get(self, journey_id):
+        """Retorna a Jornada com Passos (posições, canais, orçamentos) e Custos em consultas fixas."""
+        args = journey_graph_parser.parse_args()
+        payload = load_journey_canvas(journey_id, costs=args['costs'])
+        if payload is None:
+            journey_ns.abort(404, 'Jornada não encontrada')
+        return payload
+
+
+@journey_ns.route('/<int:journey_id>/budget')
+class JourneyBudgetResource(Resource):
+    @conditional(_journey_tree_validators)
+    def get(self, journey_id):
+        """Orçamento x realizado da Jornada, por Passo e por tipo de custo (lido dos rollups)."""
+        db.session.query(Journey.id).filter(Journey.id == journey_id).first_or_404()
+        return journey_spend_summary(journey_id)
+
+
+@journey_ns.route('/<int:journey_id>/steps')
+class JourneyStepBatchResource(Resource):
+    def patch(self, journey_id):
+        """Atualiza muitos Passos de uma vez (posições, status, datas, orçamento) em uma transação.
+
+        Corpo: {"updates": [{"id": 1, "pos_x": 10, "pos_y": 20}, ...]}. Itens repetidos
+        para o mesmo passo são fundidos no servidor (o último valor de cada campo vence).
+        """
+        db.session.query(Journey.id).filter(Journey.id == journey_id).first_or_404()
+        dados = journey_ns.payload or {}
+        try:
+            return apply_step_updates(journey_id, dados.get('updates'))
+        except StepBatchError as e:
+            return {'message': str(e), 'errors': e.errors}, 400
+
+
+# --- Dependências entre passos (grafo, caminho crítico e impacto de atrasos) ---
+@journey_ns.route('/<int:journey_id>/edges')
+class JourneyEdgeListResource(Resource):
+    def get(self, journey_id):
+        """Lista as dependências (arestas) entre os Passos da Jornada."""
+        db.session.query(Journey.id).filter(Journey.id == journey_id).first_or_404()
+        return list_step_edges(journey_id)
+
+    def post(self, journey_id):
+        """Cria a dependência from_step_id -> to_step_id (recusa ciclos com 409)."""
+        db.session.query(Journey.id).filter(Journey.id == journey_id).first_or_404()
+        dados = journey_ns.payload or {}
+        try:
+            from_step_id = int(dados['from_step_id'])
+            to_step_id = int(dados['to_step_id'])
+            lag_days = int(dados.get('lag_days') or 0)
+        except (KeyError, TypeError, ValueError):
+            return {'message': 'from_step_id e to_step_id (inteiros) são obrigatórios; lag_days é opcional'}, 400
+        try:
+            edge = add_step_edge(journey_id, from_step_id, to_step_id, lag_days)
+        except GraphCycleError as e:
+            return {'message': str(e), 'cycle': e.cycle}, 409
+        except StepGraphError as e:
+            return {'message': str(e)}, 400
+        return edge, 201
+
+
+@journey_ns.route('/<int:journey_id>/edges/<int:from_step_id>/<int:to_step_id>')
+class JourneyEdgeResource(Resource):
+    def delete(self, journey_id, from_step_id, to_step_id):
+        """Remove uma dependência."""
+        if not remove_step_edge(journey_id, from_step_id, to_step_id):
+            journey_ns.abort(404, 'Dependência não encontrada')
+        return '', 204
+
+
+@journey_ns.route('/<int:journey_id>/dependencies')
+class JourneyDependenciesResource(Resource):
+    def get(self, journey_id):
+        """Ordem topológica, caminho crítico (por date_start/date_end) e folga de cada Passo.
+
+        Se as dependências tiverem ciclo, retorna acyclic=false e o ciclo encontrado.
+        """
+        db.session.query(Journey.id).filter(Journey.id == journey_id).first_or_404()
+        return dependency_report(journey_id)
+
+
+impact_parser = journey_ns.parser()
+impact_parser.add_argument('slip_days', type=int, required=True, location='args',
+                           help='Dias de atraso no início do Passo')
+
+
+@journey_ns.route('/<int:journey_id>/steps/<int:step_id>/impact')
+class StepSlipImpactResource(Resource):
+    @journey_ns.expect(impact_parser)
+    def get(self, journey_id, step_id):
+        """Passos a jusante afetados (e em quantos dias) se o Passo atrasar slip_days."""
+        args = impact_parser.parse_args()
+        try:
+            impact = slip_impact(journey_id, step_id, args['slip_days'])
+        except GraphCycleError as e:
+            return {'message': str(e), 'cycle': e.cycle}, 409
+        if impact is None:
+            journey_ns.abort(404, 'Passo não encontrado nesta jornada')
+        return impact
+
+
+# --- Cópia profunda e instanciação de modelos (INSERT ... SELECT, ver journey_clone.py) ---
+def _clone_response(journey_id, template):
+    db.session.query(Journey.id).filter(Journey.id == journey_id).first_or_404()
+    dados = journey_ns.payload or {}
+    try:
+        options = clone_options(dados, template=template)
+    except JourneyCloneError as e:
+        return {'message': str(e)}, 400
+    if dados.get('async'):
+        # Jornadas muito grandes: a cópia roda no worker (acompanhe em /api/jobs/<id>)
+        try:
+            job = enqueue_job('clone_journey', {**dados, 'source_id': journey_id, 'template': template})
+        except JobError as e:
+            return {'message': str(e)}, 400
+        return accepted(job)
+    try:
+        summary = clone_journey(journey_id, **options)
+    except JourneyCloneError as e:
+        return {'message': str(e)}, 400
+    db.session.commit()
+    return summary, 201, {'Location': f"/api/journeys/{summary['journey_id']}"}
+
+
+@journey_ns.route('/<int:journey_id>/clone')
+class JourneyCloneResource(Resource):
+    def post(self, journey_id):
+        """Copia a Jornada com Passos, dependências e Custos (opcional: name, user_id, shift_days, include_costs, async)."""
+        return _clone_response(journey_id, template=False)
+
+
+@journey_ns.route('/<int:journey_id>/instantiate')
+class JourneyInstantiateResource(Resource):
+    def post(self, journey_id):
+        """Cria uma Jornada a partir deste modelo, com o primeiro Passo em start_date (obrigatório)."""
+        return _clone_response(journey_id, template=True)
@@ -0,0 +1,79 @@
+# backend/api/pacing_ns.py
+
+from flask_restx import Namespace, Resource, inputs
+
+from ..pacing import (DEFAULT_TOLERANCE, DEFAULT_WINDOW_DAYS, PACING_STATUSES, PacingUnavailable,
+                      pacing_curve, pacing_report, pacing_snapshot)
+
+pacing_ns = Namespace('pacing', description='Pacing de orçamento: esperado x realizado e projeção por Passo e Jornada')
+
+PACING_MAX_LIMIT = 10000
+
+pacing_parser = pacing_ns.parser()
+pacing_parser.add_argument('as_of', type=inputs.date_from_iso8601, location='args',
+                           help='Data de referência (YYYY-MM-DD; padrão: hoje, UTC)')
+pacing_parser.add_argument('journey_id', type=int, location='args')
+pacing_parser.add_argument('window_days', type=inputs.int_range(1, 90), default=DEFAULT_WINDOW_DAYS, location='args',
+                           help='Janela (dias) do burn rate')
+pacing_parser.add_argument('tolerance', type=float, default=DEFAULT_TOLERANCE, location='args',
+                           help='Desvio aceito de pacing_ratio antes de marcar under/over')
+
+pacing_steps_parser = pacing_parser.copy()
+pacing_steps_parser.add_argument('status', type=str, choices=PACING_STATUSES, location='args')
+pacing_steps_parser.add_argument('limit', type=inputs.int_range(1, PACING_MAX_LIMIT), default=500, location='args',
+                                 help='Passos devolvidos, do mais fora do ritmo para o menos')
+pacing_steps_parser.add_argument('source', type=str, default='live', choices=('live', 'snapshot'), location='args',
+                                 help="live: calcula agora; snapshot: último 'flask pace-steps'")
+
+
+@pacing_ns.route('/steps')
+class StepPacingResource(Resource):
+    @pacing_ns.expect(pacing_steps_parser)
+    def get(self):
+        """Pacing dos Passos ativos (esperado x realizado, burn rate e projeção de fim de voo)."""
+        args = pacing_steps_parser.parse_args()
+        if args['source'] == 'snapshot':
+            return {'steps': pacing_snapshot(args['journey_id'], args['status'], args['limit'])}
+        try:
+            report = pacing_report(args['as_of'], journey_id=args['journey_id'], status=args['status'],
+                                   limit=args['limit'], window_days=args['window_days'],
+                                   tolerance=args['tolerance'])
+        except PacingUnavailable as e:
+            return {'message': str(e)}, 501
+        del report['journeys']
+        return report
+
+
+@pacing_ns.route('/journeys')
+class JourneyPacingResource(Resource):
+    @pacing_ns.expect(pacing_parser)
+    def get(self):
+        """Totais de pacing por Jornada (soma dos Passos ativos)."""
+        args = pacing_parser.parse_args()
+        try:
+            report = pacing_report(args['as_of'], journey_id=args['journey_id'], limit=0,
+                                   window_days=args['window_days'], tolerance=args['tolerance'])
+        except PacingUnavailable as e:
+            return {'message': str(e)}, 501
+        del report['steps']
+        return report
+
+
+pacing_curve_parser = pacing_ns.parser()
+pacing_curve_parser.add_argument('as_of', type=inputs.date_from_iso8601, location='args',
+                                 help='Data de referência (YYYY-MM-DD; padrão: hoje, UTC)')
+
+
+@pacing_ns.route('/steps/<int:step_id>/curve')
+class StepPacingCurveResource(Resource):
+    @pacing_ns.expect(pacing_curve_parser)
+    def get(self, step_id):
+        """Curvas diárias acumuladas de gasto esperado x realizado de um Passo."""
+        args = pacing_curve_parser.parse_args()
+        try:
+            curve = pacing_curve(step_id, args['as_of'])
+        except PacingUnavailable as e:
+            return {'message': str(e)}, 501
+        if curve is None:
+            pacing_ns.abort(404, 'Passo não encontrado ou sem orçamento/datas de voo')
+        return curve
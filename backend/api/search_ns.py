@@ -0,0 +1,31 @@
+# backend/api/search_ns.py
+
+from flask_restx import Namespace, Resource, inputs
+
+from ..search import SEARCH_DEFAULT_LIMIT, SEARCH_MAX_LIMIT, SEARCH_MAX_OFFSET, SEARCH_TYPES, SearchError, search
+
+search_ns = Namespace('search', description='Busca textual em Jornadas, Passos e Custos')
+
+search_parser = search_ns.parser()
+search_parser.add_argument('q', type=str, required=True, location='args',
+                           help='Termos da busca (aceita "frase exata", OR e -exclusão no PostgreSQL)')
+search_parser.add_argument('types', type=str, action='split', location='args',
+                           help=f"Tipos separados por vírgula: {', '.join(SEARCH_TYPES)} (padrão: todos)")
+search_parser.add_argument('journey_id', type=int, location='args', help='Restringe a uma Jornada')
+search_parser.add_argument('limit', type=inputs.int_range(1, SEARCH_MAX_LIMIT), default=SEARCH_DEFAULT_LIMIT,
+                           location='args')
+search_parser.add_argument('offset', type=inputs.int_range(0, SEARCH_MAX_OFFSET), default=0, location='args',
+                           help="Use o 'next_offset' da página anterior")
+
+
+@search_ns.route('/')
+class SearchResource(Resource):
+    @search_ns.expect(search_parser)
+    def get(self):
+        """Resultados ranqueados por relevância (texto completo pt/en + nome aproximado)."""
+        args = search_parser.parse_args()
+        try:
+            return search(args['q'], types=args['types'] or SEARCH_TYPES, journey_id=args['journey_id'],
+                          limit=args['limit'], offset=args['offset'])
+        except SearchError as e:
+            search_ns.abort(400, str(e))
@@ -0,0 +1,35 @@
+# backend/api/system_ns.py
+
+from flask_restx import Namespace, Resource
+
+from ..extensions import journey_events, pool_metrics, replica_router, response_cache
+
+system_ns = Namespace('system', description='Diagnóstico e métricas internas do backend')
+
+
+@system_ns.route('/cache')
+class CacheStatsResource(Resource):
+    def get(self):
+        """Contadores do cache de respostas (hits, misses, evictions, invalidações)."""
+        return response_cache.stats()
+
+
+@system_ns.route('/pool')
+class PoolStatsResource(Resource):
+    def get(self):
+        """Estado do pool de conexões: em uso, overflow, tempo de espera e invalidações."""
+        return pool_metrics.snapshot()
+
+
+@system_ns.route('/replicas')
+class ReplicaStatusResource(Resource):
+    def get(self):
+        """Réplicas de leitura: saúde, atraso medido, leituras servidas e último erro."""
+        return replica_router.status()
+
+
+@system_ns.route('/live-events')
+class LiveEventsStatsResource(Resource):
+    def get(self):
+        """Canal SSE das jornadas: backend, assinantes, deltas publicados e notificações recebidas."""
+        return journey_events.stats()
@@ -0,0 +1,208 @@
+# backend/asgi.py
+# Modo de serviço assíncrono (ASGI) para as leituras de Jornadas
+#
+# Uso: uvicorn --factory backend.asgi:create_asgi_app --workers 2
+#
+# Serve os mesmos GETs de /api/journeys (listagem, item e grafo) com o engine
+# asyncio do SQLAlchemy (asyncpg / aiosqlite) e os mesmos modelos e consultas
+# (journey_queries.py, canvas.py). Um worker atende muitas conexões ao mesmo
+# tempo, pois não fica bloqueado durante cada round-trip ao banco.
+# Escritas continuam no app Flask (create_app), que mantém a invalidação do
+# cache de respostas; este modo não usa o cache, então sempre lê do banco.
+
+import hashlib
+import os
+import re
+from urllib.parse import parse_qs
+
+from dotenv import load_dotenv
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from . import serialization
+from .canvas import COST_MODES, assemble_canvas, canvas_statements
+from .journey_queries import (clamp_limit, journey_item_payload, journey_item_statement,
+                              journey_list_page, journey_list_statement)
+from .pool import POOL_PROFILES, _env
+
+ASYNC_DRIVERS = {
+    'postgresql': 'postgresql+asyncpg',
+    'sqlite': 'sqlite+aiosqlite',
+}
+
+
+def async_database_url(database_url):
+    """Troca o driver síncrono da DATABASE_URL pelo equivalente asyncio."""
+    if database_url.startswith('postgres://'):
+        database_url = database_url.replace('postgres://', 'postgresql://', 1)
+    scheme, sep, rest = database_url.partition('://')
+    dialect = scheme.split('+', 1)[0]
+    if dialect not in ASYNC_DRIVERS:
+        raise ValueError(f"Banco sem driver assíncrono configurado: {dialect!r}")
+    return f'{ASYNC_DRIVERS[dialect]}{sep}{rest}'
+
+
+def async_engine_options_from_env(database_url, environ=None):
+    """Opções do engine assíncrono a partir das mesmas variáveis DB_* do modo WSGI.
+
+    O pool é o AsyncAdaptedQueuePool padrão do SQLAlchemy; os parâmetros de
+    conexão do psycopg2 são traduzidos para os equivalentes do asyncpg.
+    """
+    environ = os.environ if environ is None else environ
+    profile_name = environ.get('DB_POOL_PROFILE', 'development')
+    if profile_name not in POOL_PROFILES:
+        raise ValueError(f"DB_POOL_PROFILE inválido: {profile_name!r}")
+    profile = POOL_PROFILES[profile_name]
+
+    options = {'pool_pre_ping': _env(environ, 'DB_POOL_PRE_PING', True, bool)}
+    if database_url.startswith('sqlite'):
+        return options
+
+    options.update({
+        # Com asyncio uma conexão só fica presa durante o round-trip, então o mesmo
+        # pool atende muito mais requisições simultâneas que um worker síncrono
+        'pool_size': _env(environ, 'DB_POOL_SIZE', profile['pool_size']),
+        'max_overflow': _env(environ, 'DB_MAX_OVERFLOW', profile['max_overflow']),
+        'pool_timeout': _env(environ, 'DB_POOL_TIMEOUT', profile['pool_timeout'], float),
+        'pool_recycle': _env(environ, 'DB_POOL_RECYCLE', profile['pool_recycle']),
+        'pool_use_lifo': True,
+    })
+    if database_url.startswith('postgresql'):
+        server_settings = {'application_name': environ.get('DB_APPLICATION_NAME', 'midaspipe') + '-asgi'}
+        statement_timeout = _env(environ, 'DB_STATEMENT_TIMEOUT_MS', profile['statement_timeout_ms'])
+        if statement_timeout:
+            server_settings['statement_timeout'] = str(statement_timeout)
+        connect_args = {
+            'timeout': _env(environ, 'DB_CONNECT_TIMEOUT', profile['connect_timeout']),
+            'server_settings': server_settings,
+        }
+        if profile_name == 'pgbouncer':
+            # PgBouncer em modo transaction não suporta prepared statements nomeados
+            connect_args['statement_cache_size'] = 0
+        options['connect_args'] = connect_args
+    return options
+
+
+class HTTPError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+        self.message = message
+
+
+def _int_arg(query, name, default=None):
+    values = query.get(name)
+    if not values or values[0] == '':
+        return default
+    try:
+        return int(values[0])
+    except ValueError:
+        raise HTTPError(400, f"Parâmetro '{name}' deve ser inteiro")
+
+
+def _str_arg(query, name, default=None):
+    values = query.get(name)
+    return values[0] if values else default
+
+
+class JourneyReadApp:
+    """App ASGI mínimo (sem framework) com as rotas de leitura de Jornadas."""
+
+    def __init__(self, database_url, engine_options=None):
+        self.engine = create_async_engine(database_url, **(engine_options or {}))
+        self.sessionmaker = async_sessionmaker(self.engine, expire_on_commit=False)
+        self.routes = [
+            (re.compile(r'^/api/journeys/?$'), self.journey_list),
+            (re.compile(r'^/api/journeys/(\d+)$'), self.journey_item),
+            (re.compile(r'^/api/journeys/(\d+)/graph$'), self.journey_graph),
+        ]
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            await self._lifespan(receive, send)
+            return
+        if scope['type'] != 'http':
+            return
+
+        status, payload, headers = 404, {'message': 'Rota não encontrada'}, []
+        try:
+            if scope['method'] not in ('GET', 'HEAD'):
+                raise HTTPError(405, 'Modo ASGI atende apenas leituras (GET)')
+            for pattern, handler in self.routes:
+                match = pattern.match(scope['path'])
+                if match:
+                    query = parse_qs(scope.get('query_string', b'').decode('latin-1'))
+                    status, payload = 200, await handler(query, *(int(g) for g in match.groups()))
+                    break
+        except HTTPError as e:
+            status, payload = e.status, {'message': e.message}
+
+        body = serialization.dumps(payload)
+        headers += [(b'content-type', b'application/json'), (b'content-length', str(len(body)).encode())]
+        if status == 200:
+            # Mesmo formato do ETag fraco do http_cache (hash do corpo)
+            etag = hashlib.sha1(body).hexdigest()[:20]
+            headers.append((b'etag', f'W/"{etag}"'.encode()))
+            if _request_header(scope, b'if-none-match') == f'W/"{etag}"'.encode():
+                status, body = 304, b''
+                headers = [h for h in headers if h[0] == b'etag']
+        await send({'type': 'http.response.start', 'status': status, 'headers': headers})
+        await send({'type': 'http.response.body', 'body': body if scope['method'] == 'GET' else b''})
+
+    async def _lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                await self.engine.dispose()
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+    async def journey_list(self, query):
+        limit = clamp_limit(_int_arg(query, 'limit'))
+        statement = journey_list_statement(
+            limit, cursor=_int_arg(query, 'cursor'), status=_str_arg(query, 'status'),
+            user_id=_int_arg(query, 'user_id'), name=_str_arg(query, 'name'),
+        )
+        async with self.sessionmaker() as session:
+            rows = (await session.execute(statement)).all()
+        return journey_list_page(rows, limit)
+
+    async def journey_item(self, query, journey_id):
+        async with self.sessionmaker() as session:
+            row = (await session.execute(journey_item_statement(journey_id))).first()
+        if row is None:
+            raise HTTPError(404, 'Jornada não encontrada')
+        return journey_item_payload(row)
+
+    async def journey_graph(self, query, journey_id):
+        costs = _str_arg(query, 'costs', 'list')
+        if costs not in COST_MODES:
+            raise HTTPError(400, f"Parâmetro 'costs' deve ser um de {', '.join(COST_MODES)}")
+        journey_stmt, steps_stmt, costs_stmt, edges_stmt = canvas_statements(journey_id, costs)
+        async with self.sessionmaker() as session:
+            journey = (await session.execute(journey_stmt)).first()
+            if journey is None:
+                raise HTTPError(404, 'Jornada não encontrada')
+            step_rows = (await session.execute(steps_stmt)).all()
+            cost_rows = (await session.execute(costs_stmt)).all() if step_rows and costs_stmt is not None else []
+            edge_rows = (await session.execute(edges_stmt)).all() if step_rows else []
+        return assemble_canvas(journey, step_rows, cost_rows, costs, edge_rows)
+
+
+def _request_header(scope, name):
+    for key, value in scope.get('headers', ()):
+        if key == name:
+            return value
+    return None
+
+
+def create_asgi_app():
+    """Factory do modo ASGI (mesma DATABASE_URL e variáveis DB_* do create_app)."""
+    load_dotenv()
+    database_url = os.getenv('DATABASE_URL')
+    if database_url is None:
+        raise ValueError("Variável de ambiente DATABASE_URL não definida!")
+    database_url = async_database_url(database_url)
+    serialization.configure(os.getenv('JSON_SERIALIZER', 'auto'))
+    return JourneyReadApp(database_url, async_engine_options_from_env(database_url))
@@ -0,0 +1,205 @@
+# backend/benchmarks.py
+# Suíte de benchmarks dos endpoints de Jornadas (flask bench-api)
+#
+# Cada cenário é uma requisição feita pelo test client do Flask, no mesmo processo:
+# mede a latência de ponta a ponta da app (roteamento, consultas, serialização),
+# sem rede nem servidor WSGI no meio (para isso, bench-serving). Por cenário ficam
+# registrados p50/p95/p99, statements SQL por requisição e quanto o RSS do processo
+# cresceu durante o cenário (o pico, ru_maxrss, é do processo inteiro e só mostraria
+# o pior cenário até ali). Cenários que escrevem (PUT) restauram a jornada ao final,
+# para não alterar a massa medida pelos outros nem pelas próximas execuções. Os
+# resultados vão para JSON e podem ser comparados com um baseline salvo antes: a
+# comparação aponta as regressões e o comando sai com erro.
+#
+# Rode sobre uma massa de dados conhecida (flask seed-data) e com CACHE_BACKEND=none
+# para medir o caminho até o banco; o baseline guarda o volume de dados, o banco e o
+# backend de cache, e a comparação avisa quando eles não batem.
+
+import datetime
+import gc
+import os
+import platform
+import time
+
+from sqlalchemy import event, func, select
+
+from .extensions import db
+from .models import Journey, Step
+from .seed import data_volume
+
+# (nome, método, caminho, corpo JSON); o caminho é formatado com pick_targets()
+BENCH_SCENARIOS = (
+    ('journeys.list', 'GET', '/api/journeys/?limit=50', None),
+    ('journeys.list.cursor', 'GET', '/api/journeys/?limit=50&cursor={cursor}', None),
+    ('journeys.list.user', 'GET', '/api/journeys/?user_id={user_id}', None),
+    ('journeys.list.name', 'GET', '/api/journeys/?name={name_prefix}', None),
+    ('journey.get', 'GET', '/api/journeys/{journey_id}', None),
+    ('journey.graph', 'GET', '/api/journeys/{journey_id}/graph', None),
+    ('journey.graph.totals', 'GET', '/api/journeys/{journey_id}/graph?costs=totals', None),
+    ('journey.budget', 'GET', '/api/journeys/{journey_id}/budget', None),
+    ('journey.dependencies', 'GET', '/api/journeys/{journey_id}/dependencies', None),
+    ('journey.export', 'GET', '/api/journeys/{journey_id}/export', None),
+    ('journey.put', 'PUT', '/api/journeys/{journey_id}', {'status': 'Active'}),
+)
+BENCH_SCENARIO_NAMES = tuple(name for name, *_rest in BENCH_SCENARIOS)
+
+DEFAULT_TOLERANCE = 0.25
+# Diferenças menores que isso não contam como regressão (ruído de medição)
+MIN_LATENCY_DELTA_MS = 1.0
+MIN_RSS_DELTA_MB = 16.0
+
+
+class BenchmarkError(RuntimeError):
+    """Sem dados para medir ou cenário respondendo com erro."""
+
+
+def pick_targets():
+    """Alvos determinísticos dos cenários: a maior jornada, o usuário com mais jornadas, etc."""
+    step_counts = (select(Step.journey_id, func.count().label('steps'))
+                   .group_by(Step.journey_id).subquery())
+    largest = db.session.execute(
+        select(Journey.id, Journey.name).join(step_counts, step_counts.c.journey_id == Journey.id)
+        .order_by(step_counts.c.steps.desc(), Journey.id).limit(1)
+    ).first()
+    if largest is None:
+        raise BenchmarkError('Nenhuma jornada com passos: gere dados com flask seed-data')
+    user_id = db.session.execute(
+        select(Journey.user_id).group_by(Journey.user_id).order_by(func.count().desc(), Journey.user_id).limit(1)
+    ).scalar()
+    journeys = db.session.execute(select(func.count()).select_from(Journey)).scalar()
+    cursor = db.session.execute(select(Journey.id).order_by(Journey.id.desc()).offset(journeys // 2).limit(1)).scalar()
+    return {'journey_id': largest.id, 'user_id': user_id, 'cursor': cursor,
+            'name_prefix': largest.name.split()[0]}
+
+
+def _percentile(sorted_values, q):
+    return sorted_values[min(len(sorted_values) - 1, int(q * len(sorted_values)))]
+
+
+def _rss_mb():
+    """RSS atual do processo (Linux, /proc); None em outros sistemas."""
+    gc.collect()
+    try:
+        with open('/proc/self/statm') as fh:
+            pages = int(fh.read().split()[1])
+    except (OSError, ValueError, IndexError):
+        return None
+    return pages * os.sysconf('SC_PAGE_SIZE') / (1024 * 1024)
+
+
+def _journey_row(journey_id):
+    return dict(db.session.execute(
+        select(Journey.__table__).where(Journey.__table__.c.id == journey_id)
+    ).mappings().one())
+
+
+def _restore_journey(row):
+    """Volta a jornada aos valores anteriores ao cenário (inclusive modificated_at)."""
+    table = Journey.__table__
+    db.session.execute(table.update().where(table.c.id == row['id'])
+                       .values({key: value for key, value in row.items() if key != 'id'}))
+    db.session.commit()
+
+
+def run_benchmarks(app, requests=200, warmup=20, scenarios=None, echo=None):
+    """Executa os cenários e devolve {'meta': ..., 'scenarios': {nome: métricas}}."""
+    targets = pick_targets()
+    selected = [s for s in BENCH_SCENARIOS if not scenarios or s[0] in scenarios]
+    client = app.test_client()
+    counter = {'count': 0}
+
+    def count_statement(*_args):
+        counter['count'] += 1
+
+    results = {}
+    event.listen(db.engine, 'before_cursor_execute', count_statement)
+    try:
+        for name, method, path, body in selected:
+            url = path.format(**targets)
+            latencies, statements = [], []
+            original = _journey_row(targets['journey_id']) if body is not None else None
+            db.session.rollback()
+            rss_before = _rss_mb()
+            try:
+                for index in range(warmup + requests):
+                    counter['count'] = 0
+                    started = time.perf_counter()
+                    response = client.open(url, method=method, json=body)
+                    response.get_data()  # Consome respostas em streaming (exportação)
+                    elapsed = (time.perf_counter() - started) * 1000
+                    response.close()
+                    if response.status_code >= 400:
+                        raise BenchmarkError(f'{name}: {method} {url} respondeu {response.status_code}')
+                    if index >= warmup:
+                        latencies.append(elapsed)
+                        statements.append(counter['count'])
+                rss_after = _rss_mb()
+            finally:
+                if original is not None:
+                    db.session.rollback()
+                    _restore_journey(original)
+            latencies.sort()
+            results[name] = {
+                'method': method, 'path': url,
+                'p50_ms': round(_percentile(latencies, 0.50), 3),
+                'p95_ms': round(_percentile(latencies, 0.95), 3),
+                'p99_ms': round(_percentile(latencies, 0.99), 3),
+                'mean_ms': round(sum(latencies) / len(latencies), 3),
+                'queries': round(sum(statements) / len(statements), 2),
+                'rss_growth_mb': round(rss_after - rss_before, 1) if rss_before is not None else None,
+            }
+            if echo:
+                echo(format_result(name, results[name]))
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', count_statement)
+        db.session.rollback()
+
+    meta = {
+        'dialect': db.engine.dialect.name,
+        'cache_backend': app.config.get('CACHE_BACKEND'),
+        'volume': data_volume(),
+        'targets': targets,
+        'requests': requests,
+        'python': platform.python_version(),
+        'recorded_at': datetime.datetime.now(datetime.timezone.utc).isoformat(timespec='seconds'),
+    }
+    return {'meta': meta, 'scenarios': results}
+
+
+def format_header():
+    return f"{'cenário':<22} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'queries':>8} {'+RSS MB':>8}"
+
+
+def format_result(name, result):
+    return (f"{name:<22} {result['p50_ms']:>8.2f} {result['p95_ms']:>8.2f} {result['p99_ms']:>8.2f} "
+            f"{result['queries']:>8.2f} {result['rss_growth_mb'] or 0:>8.1f}")
+
+
+def compare_to_baseline(results, baseline, tolerance=DEFAULT_TOLERANCE):
+    """Compara com o baseline; devolve (regressões, avisos) como listas de mensagens.
+
+    Regressão: p95 acima de baseline * (1 + tolerance) (e por mais de 1 ms), qualquer
+    statement SQL a mais por requisição, ou crescimento de RSS no cenário acima da
+    tolerância (e por mais de 16 MB).
+    """
+    regressions, warnings = [], []
+    for key in ('dialect', 'cache_backend', 'volume'):
+        if results['meta'].get(key) != baseline.get('meta', {}).get(key):
+            warnings.append(f"{key} diferente do baseline: {baseline.get('meta', {}).get(key)} -> "
+                            f"{results['meta'].get(key)}")
+    for name, current in results['scenarios'].items():
+        previous = baseline.get('scenarios', {}).get(name)
+        if previous is None:
+            warnings.append(f'{name}: sem baseline')
+            continue
+        if (current['p95_ms'] > previous['p95_ms'] * (1 + tolerance)
+                and current['p95_ms'] - previous['p95_ms'] > MIN_LATENCY_DELTA_MS):
+            regressions.append(f"{name}: p95 {previous['p95_ms']:.2f} -> {current['p95_ms']:.2f} ms")
+        if current['queries'] > previous['queries']:
+            regressions.append(f"{name}: queries por requisição {previous['queries']} -> {current['queries']}")
+        growth, previous_growth = current.get('rss_growth_mb'), previous.get('rss_growth_mb')
+        if (growth is not None and previous_growth is not None
+                and growth > max(previous_growth, 0) * (1 + tolerance)
+                and growth - previous_growth > MIN_RSS_DELTA_MB):
+            regressions.append(f"{name}: crescimento de RSS {previous_growth} -> {growth} MB")
+    return regressions, warnings
@@ -0,0 +1,228 @@
+# backend/cache.py
+# Cache de respostas da API: LRU em memória com TTL ou backend compatível com Redis
+
+import threading
+import time
+from collections import OrderedDict
+
+from . import serialization
+
+
+class LRUCacheBackend:
+    """LRU em memória do processo, com TTL por entrada. Seguro entre threads."""
+
+    def __init__(self, max_entries=1024, ttl=300):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self.evictions = 0
+
+    def get(self, key):
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return None
+            expires_at, value = item
+            if expires_at is not None and expires_at < time.monotonic():
+                del self._data[key]
+                self.evictions += 1
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value, ttl=None):
+        ttl = self.ttl if ttl is None else ttl
+        expires_at = time.monotonic() + ttl if ttl else None
+        with self._lock:
+            self._data[key] = (expires_at, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def delete(self, *keys):
+        with self._lock:
+            return sum(self._data.pop(key, None) is not None for key in keys)
+
+    def incr(self, key):
+        with self._lock:
+            expires_at, value = self._data.get(key, (None, 0))
+            self._data[key] = (expires_at, value + 1)
+            return value + 1
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+
+class RedisCacheBackend:
+    """Backend sobre um cliente compatível com Redis (redis-py, fakeredis ou similar).
+
+    Os valores são gravados como JSON; as remoções por LRU/TTL ficam a cargo do
+    servidor Redis (maxmemory-policy), então 'evictions' vem do INFO quando disponível.
+    """
+
+    def __init__(self, client, prefix='midaspipe:', ttl=300):
+        self.client = client
+        self.prefix = prefix
+        self.ttl = ttl
+
+    def get(self, key):
+        raw = self.client.get(self.prefix + key)
+        return None if raw is None else serialization.loads(raw)
+
+    def set(self, key, value, ttl=None):
+        ttl = self.ttl if ttl is None else ttl
+        raw = serialization.dumps(value)
+        if ttl:
+            self.client.setex(self.prefix + key, ttl, raw)
+        else:
+            self.client.set(self.prefix + key, raw)
+
+    def delete(self, *keys):
+        return self.client.delete(*[self.prefix + key for key in keys]) if keys else 0
+
+    def incr(self, key):
+        return self.client.incr(self.prefix + key)
+
+    def clear(self):
+        for key in self.client.scan_iter(self.prefix + '*'):
+            self.client.delete(key)
+
+    @property
+    def evictions(self):
+        try:
+            return int(self.client.info('stats').get('evicted_keys', 0))
+        except Exception:
+            return None
+
+
+class NullCacheBackend:
+    """Backend que nunca guarda nada (CACHE_BACKEND=none)."""
+    evictions = 0
+
+    def get(self, key):
+        return None
+
+    def set(self, key, value, ttl=None):
+        pass
+
+    def delete(self, *keys):
+        return 0
+
+    def incr(self, key):
+        return 0
+
+    def clear(self):
+        pass
+
+
+class ResponseCache:
+    """Cache de respostas com contadores de hit/miss/invalidação.
+
+    Segue o padrão das demais extensões: a instância é criada em extensions.py
+    e configurada em create_app via init_app(app). Configuração:
+
+    - CACHE_BACKEND: 'lru' (padrão), 'redis' ou 'none'
+    - CACHE_TTL: segundos de vida de cada entrada (padrão 300)
+    - CACHE_MAX_ENTRIES: limite do LRU em memória (padrão 2048)
+    - CACHE_REDIS_URL: URL do Redis quando CACHE_BACKEND='redis'
+    """
+
+    def __init__(self, app=None):
+        self.backend = NullCacheBackend()
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        # Quando devolve True, nada é gravado (ex.: leitura servida por réplica, ver replicas.py)
+        self.read_only = None
+        self._lock = threading.Lock()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app, client=None):
+        """Configura o backend. 'client' permite injetar um cliente Redis (ou substituto local)."""
+        kind = app.config.setdefault('CACHE_BACKEND', 'lru')
+        ttl = int(app.config.setdefault('CACHE_TTL', 300))
+        if kind == 'lru':
+            max_entries = int(app.config.setdefault('CACHE_MAX_ENTRIES', 2048))
+            self.backend = LRUCacheBackend(max_entries=max_entries, ttl=ttl)
+        elif kind == 'redis':
+            if client is None:
+                import redis  # Dependência opcional, só exigida com CACHE_BACKEND=redis
+                client = redis.Redis.from_url(app.config['CACHE_REDIS_URL'])
+            self.backend = RedisCacheBackend(client, ttl=ttl)
+        elif kind == 'none':
+            self.backend = NullCacheBackend()
+        else:
+            raise ValueError(f"CACHE_BACKEND inválido: {kind!r}")
+        app.extensions['response_cache'] = self
+
+    def _count(self, attr, amount=1):
+        with self._lock:
+            setattr(self, attr, getattr(self, attr) + amount)
+
+    def get(self, key):
+        value = self.backend.get(key)
+        self._count('hits' if value is not None else 'misses')
+        return value
+
+    def _writable(self):
+        return self.read_only is None or not self.read_only()
+
+    def set(self, key, value, ttl=None):
+        if self._writable():
+            self.backend.set(key, value, ttl)
+
+    def get_or_set(self, key, factory, ttl=None):
+        """Retorna o valor em cache ou calcula com factory() e guarda (None não é guardado)."""
+        value = self.get(key)
+        if value is None:
+            value = factory()
+            if value is not None:
+                self.set(key, value, ttl)
+        return value
+
+    def delete(self, *keys):
+        self._count('invalidations', len(keys))
+        return self.backend.delete(*keys)
+
+    def incr(self, key):
+        return self.backend.incr(key)
+
+    def clear(self):
+        self.backend.clear()
+
+    # --- Versões: tokens internos que compõem as chaves (não entram nos contadores) ---
+    def get_version(self, name):
+        """Contador de geração de 'name' (None se nunca incrementado).
+
+        Versões que vêm do banco (ex.: modificated_at) não são memorizadas aqui: no LRU,
+        que é por processo, a escrita feita em outro worker nunca chegaria a este.
+        """
+        return self.backend.get(f'version:{name}')
+
+    def drop_version(self, name):
+        self._count('invalidations')
+        self.backend.delete(f'version:{name}')
+
+    def bump_version(self, name):
+        """Incrementa um contador de geração; chaves da geração anterior deixam de ser lidas."""
+        self._count('invalidations')
+        return self.backend.incr(f'version:{name}')
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            'backend': type(self.backend).__name__,
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_ratio': round(self.hits / lookups, 4) if lookups else None,
+            'evictions': self.backend.evictions,
+            'invalidations': self.invalidations,
+            'entries': len(self.backend) if hasattr(self.backend, '__len__') else None,
+        }
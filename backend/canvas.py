@@ -0,0 +1,139 @@
+# backend/canvas.py
+# Carga do "grafo" completo de uma jornada (canvas) em número fixo de consultas
+
+import decimal
+
+from sqlalchemy import select
+
+from .extensions import db
+from .models import Journey, Step, Cost, CostRollup, StepEdge
+
+COST_MODES = ('list', 'totals', 'none')
+
+
+def canvas_statements(journey_id, costs='list'):
+    """Os SELECTs do canvas: jornada, passos, custos (ou None) e dependências.
+
+    Separados da execução para serem usados tanto pela sessão síncrona do
+    Flask quanto pela sessão assíncrona do modo ASGI (ver asgi.py).
+    """
+    if costs not in COST_MODES:
+        raise ValueError(f"Modo de custos inválido: {costs!r}")
+
+    journey_stmt = (
+        select(Journey.id, Journey.name, Journey.description, Journey.status,
+               Journey.user_id, Journey.created_at, Journey.modificated_at)
+        .where(Journey.id == journey_id)
+    )
+    steps_stmt = (
+        select(Step.id, Step.name, Step.description, Step.type, Step.channel, Step.budget,
+               Step.date_start, Step.date_end, Step.status, Step.pos_x, Step.pos_y,
+               Step.modificated_at)
+        .where(Step.journey_id == journey_id)
+        .order_by(Step.id)
+    )
+    if costs == 'list':
+        # Custos de todos os passos em uma única consulta (join pela jornada, sem IN gigante)
+        costs_stmt = (
+            select(Cost.id, Cost.step_id, Cost.description, Cost.value, Cost.cost_type,
+                   Cost.occoured_at, Cost.timePeriod_start, Cost.timePeriod_end)
+            .join(Step, Step.id == Cost.step_id)
+            .where(Step.journey_id == journey_id)
+            .order_by(Cost.step_id, Cost.id)
+        )
+    elif costs == 'totals':
+        # Totais pré-calculados em cost_rollups (ver rollups.py), sem varrer costs
+        costs_stmt = (
+            select(CostRollup.step_id, CostRollup.cost_type, CostRollup.total)
+            .where(CostRollup.journey_id == journey_id)
+        )
+    else:
+        costs_stmt = None
+    edges_stmt = (
+        select(StepEdge.from_step_id, StepEdge.to_step_id, StepEdge.lag_days)
+        .where(StepEdge.journey_id == journey_id)
+        .order_by(StepEdge.from_step_id, StepEdge.to_step_id)
+    )
+    return journey_stmt, steps_stmt, costs_stmt, edges_stmt
+
+
+def assemble_canvas(journey, step_rows, cost_rows, costs='list', edge_rows=()):
+    """Monta o payload do canvas a partir das linhas dos SELECTs de canvas_statements.
+
+    Decimal, datetime e date seguem como vieram do banco; a conversão para JSON
+    fica com o serializador (ver serialization.py).
+    """
+    steps = []
+    by_id = {}
+    for s in step_rows:
+        step = {
+            'id': s.id,
+            'nome': s.name,
+            'descricao': s.description,
+            'type': s.type,
+            'channel': s.channel,
+            'budget': s.budget,
+            'date_start': s.date_start,
+            'date_end': s.date_end,
+            'status': s.status,
+            'pos_x': s.pos_x,
+            'pos_y': s.pos_y,
+            'modificated_at': s.modificated_at,
+        }
+        if costs == 'list':
+            step['costs'] = []
+        elif costs == 'totals':
+            step['spent'] = decimal.Decimal(0)
+            step['spent_by_type'] = {}
+        steps.append(step)
+        by_id[s.id] = step
+
+    if costs == 'list':
+        for c in cost_rows:
+            by_id[c.step_id]['costs'].append({
+                'id': c.id,
+                'descricao': c.description,
+                'value': c.value,
+                'cost_type': c.cost_type,
+                'occoured_at': c.occoured_at,
+                'timePeriod_start': c.timePeriod_start,
+                'timePeriod_end': c.timePeriod_end,
+            })
+    elif costs == 'totals':
+        for t in cost_rows:
+            step = by_id[t.step_id]
+            step['spent_by_type'][t.cost_type] = t.total
+            step['spent'] += t.total
+
+    return {
+        'id': journey.id,
+        'nome': journey.name,
+        'descricao': journey.description,
+        'status': journey.status,
+        'user_id': journey.user_id,
+        'created_at': journey.created_at,
+        'modificated_at': journey.modificated_at,
+        'budget_total': sum((s['budget'] or 0 for s in steps), decimal.Decimal(0)),
+        'steps': steps,
+        'edges': [{'from_step_id': e.from_step_id, 'to_step_id': e.to_step_id, 'lag_days': e.lag_days}
+                  for e in edge_rows],
+    }
+
+
+def load_journey_canvas(journey_id, costs='list'):
+    """Monta o payload do canvas de uma jornada.
+
+    Usa no máximo 4 consultas, independentemente do número de passos e custos:
+    jornada, passos (projeção de colunas), custos de todos os passos de uma vez
+    (lista completa, ou totais por passo/cost_type lidos de cost_rollups) e as
+    dependências entre passos (step_edges).
+    Retorna None se a jornada não existir.
+    """
+    journey_stmt, steps_stmt, costs_stmt, edges_stmt = canvas_statements(journey_id, costs)
+    journey = db.session.execute(journey_stmt).first()
+    if journey is None:
+        return None
+    step_rows = db.session.execute(steps_stmt).all()
+    cost_rows = db.session.execute(costs_stmt) if step_rows and costs_stmt is not None else []
+    edge_rows = db.session.execute(edges_stmt) if step_rows else []
+    return assemble_canvas(journey, step_rows, cost_rows, costs, edge_rows)
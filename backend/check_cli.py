@@ -1,6 +1,12 @@
-
 # midaspipe/check_cli.py
+# Uso (da pasta raiz 'midaspipe/'):
+#   python -m backend.check_cli                  -> cria a app e confere os comandos CLI
+#   python -m backend.check_cli --importtime     -> tempo de import (-X importtime) e de cada fase do create_app
+#   python -m backend.check_cli --importtime --fast --top 20
+import argparse
+import json
 import os
+import subprocess
 import sys
 import click
 import traceback
@@ -9,48 +15,116 @@ import traceback
 # Isso pode ou não ser necessário dependendo do seu PYTHONPATH
 # sys.path.insert(0, os.path.abspath(os.path.dirname(__file__)))
 
-print("--- Iniciando check_cli.py ---")
-# Definir FLASK_APP programaticamente PODE ajudar se não estiver no ambiente
-# Mas idealmente o .env na raiz deve ser lido por load_dotenv em __init__
-# os.environ['FLASK_APP'] = 'backend'
-print(f"Verificando FLASK_APP no ambiente: {os.getenv('FLASK_APP')}")
-print(f"Diretório atual: {os.getcwd()}")
-
-try:
-    # Importa a factory do pacote backend
-    from backend import create_app
-    print("Factory 'create_app' importada com sucesso.")
-
-    # Cria a instância da aplicação
-    # create_app() deve carregar .env (que está na raiz agora)
-    app = create_app()
-    print("Instância da App criada com sucesso.")
-
-    # Verifica os comandos CLI registrados
-    print("\nComandos CLI registrados:")
-    # Acessa diretamente o objeto cli do Flask app
-    if hasattr(app, 'cli') and isinstance(app.cli, click.Group):
-         commands = list(app.cli.list_commands(None)) # Passar None como contexto é ok aqui
-         print(commands)
-         if 'db' in commands:
-             print("\n✅ SUCESSO: O grupo de comando 'db' FOI registrado!")
-         else:
-             print("\n❌ FALHA: O grupo de comando 'db' NÃO foi encontrado nos comandos registrados.")
-             print("   Isso geralmente significa que migrate.init_app(app, db) não foi chamado corretamente ou houve um erro antes disso.")
-    else:
-         print("Erro: Não foi possível acessar app.cli ou não é um click.Group.")
+
+def check_app():
+    print("--- Iniciando check_cli.py ---")
+    # Definir FLASK_APP programaticamente PODE ajudar se não estiver no ambiente
+    # Mas idealmente o .env na raiz deve ser lido por load_dotenv em create_app
+    # os.environ['FLASK_APP'] = 'backend'
+    print(f"Verificando FLASK_APP no ambiente: {os.getenv('FLASK_APP')}")
+    print(f"Diretório atual: {os.getcwd()}")
+
+    try:
+        # Importa a factory do pacote backend
+        from backend import create_app
+        print("Factory 'create_app' importada com sucesso.")
+
+        # Cria a instância da aplicação
+        # create_app() deve carregar .env (que está na raiz agora)
+        app = create_app()
+        print("Instância da App criada com sucesso.")
+
+        # Verifica os comandos CLI registrados
+        print("\nComandos CLI registrados:")
+        # Acessa diretamente o objeto cli do Flask app
+        if hasattr(app, 'cli') and isinstance(app.cli, click.Group):
+             commands = list(app.cli.list_commands(None)) # Passar None como contexto é ok aqui
+             print(commands)
+             if 'db' in commands:
+                 print("\n✅ SUCESSO: O grupo de comando 'db' FOI registrado!")
+             else:
+                 print("\n❌ FALHA: O grupo de comando 'db' NÃO foi encontrado nos comandos registrados.")
+                 print("   Isso geralmente significa que migrate.init_app(app, db) não foi chamado corretamente ou houve um erro antes disso.")
+        else:
+             print("Erro: Não foi possível acessar app.cli ou não é um click.Group.")
+
+
+    except ModuleNotFoundError as mnfe:
+        print(f"\nERRO: ModuleNotFoundError durante o import ou criação da app: {mnfe}")
+        print("Verifique se:")
+        print("  1. Você está rodando este script da pasta raiz 'midaspipe/'.")
+        print("  2. A estrutura 'backend/__init__.py' e 'backend/api/__init__.py' está correta.")
+        print("  3. O ambiente virtual está ativo e tem todas as dependências.")
+        traceback.print_exc()
+
+    except Exception as e:
+        print(f"\nERRO inesperado durante a criação ou inspeção da app: {e}")
+        traceback.print_exc()
+
+    print("\n--- Fim de check_cli.py ---")
 
 
-except ModuleNotFoundError as mnfe:
-    print(f"\nERRO: ModuleNotFoundError durante o import ou criação da app: {mnfe}")
-    print("Verifique se:")
-    print("  1. Você está rodando este script da pasta raiz 'midaspipe/'.")
-    print("  2. A estrutura 'backend/__init__.py' e 'backend/api/__init__.py' está correta.")
-    print("  3. O ambiente virtual está ativo e tem todas as dependências.")
-    traceback.print_exc()
+# Processo filho do diagnóstico (via -c: com -m o pacote backend já estaria importado
+# antes da medição): importa o pacote, cria a app e imprime os tempos em JSON no stdout
+_PROBE = """
+import json, time
+started = time.perf_counter()
+from backend import create_app
+imported = time.perf_counter()
+app = create_app()
+print(json.dumps({
+    'import_ms': round((imported - started) * 1000, 1),
+    'create_app': app.extensions['startup'].as_dict(),
+    'fast_startup': app.config['FAST_STARTUP'],
+}))
+"""
+
+
+def startup_report(fast=None, top=15, python=sys.executable):
+    """Roda o probe em um processo novo com -X importtime e resume import e init."""
+    from backend.startup import parse_importtime, summarize_importtime
+
+    env = dict(os.environ)
+    if fast is not None:
+        env['FAST_STARTUP'] = '1' if fast else '0'
+    result = subprocess.run([python, '-X', 'importtime', '-c', _PROBE],
+                            capture_output=True, text=True, env=env)
+    if result.returncode != 0:
+        raise RuntimeError(f"Falha ao criar a app no processo de diagnóstico:\n{result.stderr[-4000:]}")
+    report = json.loads(result.stdout.strip().splitlines()[-1])
+    report['imports'] = summarize_importtime(parse_importtime(result.stderr.splitlines()), top)
+    return report
+
+
+def print_startup_report(report, echo=print):
+    create = report['create_app']
+    echo(f"FAST_STARTUP={'1' if report['fast_startup'] else '0'}  "
+         f"import do pacote: {report['import_ms']} ms  create_app: {create['total_ms']} ms  "
+         f"(soma dos imports: {report['imports']['total_ms']} ms)")
+    echo('\nFases do create_app (ms):')
+    for phase, ms in create['phases'].items():
+        echo(f'  {phase:<12} {ms:>8.1f}')
+    echo('\nImport por pacote (tempo próprio, ms):')
+    for package, ms in report['imports']['packages']:
+        echo(f'  {package:<28} {ms:>8.1f}')
+    echo('\nMódulos mais caros (próprio / acumulado, ms):')
+    for name, self_ms, cumulative_ms in report['imports']['modules']:
+        echo(f'  {name:<48} {self_ms:>8.1f} {cumulative_ms:>9.1f}')
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Diagnóstico da criação da app MidasPipe')
+    parser.add_argument('--importtime', action='store_true',
+                        help='Mede import (-X importtime) e fases do create_app em um processo novo')
+    parser.add_argument('--fast', action='store_true', help='Com --importtime: força FAST_STARTUP=1')
+    parser.add_argument('--top', type=int, default=15, help='Com --importtime: linhas por tabela')
+    args = parser.parse_args(argv)
+
+    if args.importtime:
+        print_startup_report(startup_report(fast=True if args.fast else None, top=args.top))
+    else:
+        check_app()
 
-except Exception as e:
-    print(f"\nERRO inesperado durante a criação ou inspeção da app: {e}")
-    traceback.print_exc()
 
-print("\n--- Fim de check_cli.py ---")
\ No newline at end of file
+if __name__ == '__main__':
+    main()
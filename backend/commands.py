@@ -0,0 +1,1004 @@
+# backend/commands.py
+# Comandos CLI adicionais (registrados em create_app via register_commands)
+
+import sys
+import time
+from contextlib import contextmanager
+
+import click
+from flask.cli import with_appcontext
+from sqlalchemy import event, insert, text
+
+from .extensions import db
+from .cost_import import IMPORT_BATCH_SIZE, IMPORT_FORMATS, import_costs
+from .export import EXPORT_FORMATS, iter_export
+from .rollups import rebuild_cost_rollups
+
+
+@click.command('export-journeys')
+@click.option('--format', 'fmt', type=click.Choice(EXPORT_FORMATS), default='ndjson', show_default=True,
+              help='Formato de saída.')
+@click.option('--journey-id', type=int, default=None, help='Exporta apenas esta jornada.')
+@click.option('--user-id', type=int, default=None, help='Exporta apenas jornadas deste usuário.')
+@click.option('--batch-size', type=int, default=2000, show_default=True, help='Linhas por lote do cursor.')
+@click.option('--output', '-o', type=click.Path(dir_okay=False, writable=True), default=None,
+              help='Arquivo de saída (padrão: stdout).')
+@with_appcontext
+def export_journeys_command(fmt, journey_id, user_id, batch_size, output):
+    """Exporta Jornadas -> Passos -> Custos em NDJSON ou CSV (streaming)."""
+    chunks = iter_export(fmt, journey_id=journey_id, user_id=user_id, batch_size=batch_size)
+    if output is None:
+        for chunk in chunks:
+            sys.stdout.write(chunk)
+        return
+    with open(output, 'w', encoding='utf-8', newline='') as fh:
+        for chunk in chunks:
+            fh.write(chunk)
+    click.echo(f'Exportação gravada em {output}', err=True)
+
+
+@click.command('import-costs')
+@click.argument('source', type=click.File('r', encoding='utf-8-sig'))
+@click.option('--format', 'fmt', type=click.Choice(IMPORT_FORMATS), default=None,
+              help='Formato do arquivo (padrão: pela extensão).')
+@click.option('--batch-size', type=int, default=IMPORT_BATCH_SIZE, show_default=True,
+              help='Linhas por lote/transação.')
+@with_appcontext
+def import_costs_command(source, fmt, batch_size):
+    """Importa Custos em massa de um CSV/NDJSON (use - para stdin). Reimportar não duplica."""
+    if fmt is None:
+        fmt = 'ndjson' if source.name.endswith(('.ndjson', '.jsonl')) else 'csv'
+
+    def report_batch(info):
+        click.echo(f"lote {info['batch']}: {info['written']} gravadas, {info['rejected']} rejeitadas, "
+                   f"{info['rows_per_second']} linhas/s", err=True)
+
+    report = import_costs(source, fmt, batch_size=batch_size, on_batch=report_batch)
+    for rejection in report['rejected']:
+        click.echo(f"linha {rejection['line']}: {rejection['error']}", err=True)
+    click.echo(f"{report['rows_read']} lidas, {report['rows_written']} gravadas, "
+               f"{report['rows_rejected']} rejeitadas em {report['seconds']}s "
+               f"({report['rows_per_second']} linhas/s)")
+
+
+@click.command('rebuild-cost-rollups')
+@click.option('--journey-id', type=int, default=None, help='Recalcula apenas esta jornada.')
+@with_appcontext
+def rebuild_cost_rollups_command(journey_id):
+    """Recalcula a tabela cost_rollups a partir de costs (após cargas fora do ORM)."""
+    rebuild_cost_rollups(db.session.connection(), journey_id=journey_id)
+    db.session.commit()
+    click.echo('Rollups de custos recalculados.')
+
+
+@contextmanager
+def count_queries():
+    """Conta os statements SQL emitidos pelo engine dentro do bloco."""
+    counter = {'count': 0}
+
+    def _before_cursor_execute(*_args):
+        counter['count'] += 1
+
+    engine = db.engine
+    event.listen(engine, 'before_cursor_execute', _before_cursor_execute)
+    try:
+        yield counter
+    finally:
+        event.remove(engine, 'before_cursor_execute', _before_cursor_execute)
+
+
+@click.command('bench-journey-graph')
+@click.option('--steps', default='10,100,1000', show_default=True,
+              help='Quantidades de passos a medir, separadas por vírgula.')
+@click.option('--costs-per-step', default=5, show_default=True, help='Custos criados por passo.')
+@with_appcontext
+def bench_journey_graph_command(steps, costs_per_step):
+    """Mede consultas e tempo de load_journey_canvas conforme o número de passos cresce.
+
+    Os dados sintéticos são criados dentro de uma transação que é desfeita ao final.
+    """
+    from .canvas import load_journey_canvas
+    from .models import User, Journey, Step, Cost
+
+    sizes = [int(n) for n in steps.split(',') if n.strip()]
+    try:
+        user = User(email='bench-journey-graph@midaspipe.local')
+        db.session.add(user)
+        db.session.flush()
+        click.echo(f"{'steps':>8} {'costs':>8} {'mode':>7} {'queries':>8} {'ms':>9}")
+        for size in sizes:
+            journey = Journey(name=f'bench-{size}', user_id=user.id)
+            db.session.add(journey)
+            db.session.flush()
+            db.session.execute(insert(Step), [
+                {'name': f'step-{i}', 'type': 'Performance Campaign', 'journey_id': journey.id,
+                 'pos_x': i, 'pos_y': i, 'status': 'Planned'}
+                for i in range(size)
+            ])
+            step_ids = db.session.scalars(db.select(Step.id).where(Step.journey_id == journey.id)).all()
+            db.session.execute(insert(Cost), [
+                {'description': f'cost-{k}', 'value': 1, 'cost_type': 'Paid Media', 'step_id': step_id}
+                for step_id in step_ids for k in range(costs_per_step)
+            ])
+            db.session.flush()
+            journey_id = journey.id
+            rebuild_cost_rollups(db.session.connection(), journey_id=journey_id)
+            db.session.expire_all()
+            for mode in ('list', 'totals'):
+                with count_queries() as counter:
+                    started = time.perf_counter()
+                    load_journey_canvas(journey_id, costs=mode)
+                    elapsed_ms = (time.perf_counter() - started) * 1000
+                click.echo(f"{size:>8} {size * costs_per_step:>8} {mode:>7} {counter['count']:>8} {elapsed_ms:>9.1f}")
+    finally:
+        db.session.rollback()
+
+
+@click.command('bench-step-batch')
+@click.option('--steps', default=500, show_default=True, help='Passos no layout salvo a cada rodada.')
+@click.option('--rounds', default=20, show_default=True, help='Quantidade de lotes enviados.')
+@with_appcontext
+def bench_step_batch_command(steps, rounds):
+    """Teste de carga do PATCH em lote: salva um layout de N passos por requisição.
+
+    Cria uma jornada temporária, envia 'rounds' layouts completos (um round-trip
+    cada) pelo cliente de teste e remove os dados ao final.
+    """
+    from flask import current_app
+    from .models import User, Journey, Step
+
+    user = User(email='bench-step-batch@midaspipe.local')
+    db.session.add(user)
+    db.session.flush()
+    journey = Journey(name='bench-step-batch', user_id=user.id)
+    db.session.add(journey)
+    db.session.flush()
+    journey_id, user_id = journey.id, user.id
+    db.session.execute(insert(Step), [
+        {'name': f'step-{i}', 'type': 'Performance Campaign', 'journey_id': journey_id, 'status': 'Planned'}
+        for i in range(steps)
+    ])
+    step_ids = db.session.scalars(db.select(Step.id).where(Step.journey_id == journey_id)).all()
+    db.session.commit()
+
+    client = current_app.test_client()
+    latencies = []
+    statements = []
+    try:
+        for round_no in range(rounds):
+            payload = {'updates': [
+                {'id': step_id, 'pos_x': (i * 37 + round_no) % 2000, 'pos_y': (i * 53 + round_no) % 1200}
+                for i, step_id in enumerate(step_ids)
+            ]}
+            with count_queries() as counter:
+                started = time.perf_counter()
+                response = client.patch(f'/api/journeys/{journey_id}/steps', json=payload)
+                latencies.append((time.perf_counter() - started) * 1000)
+            statements.append(counter['count'])
+            if response.status_code != 200:
+                raise click.ClickException(f'PATCH falhou: {response.status_code} {response.get_data(as_text=True)}')
+    finally:
+        db.session.rollback()
+        db.session.execute(db.delete(Step).where(Step.journey_id == journey_id))
+        db.session.execute(db.delete(Journey).where(Journey.id == journey_id))
+        db.session.execute(db.delete(User).where(User.id == user_id))
+        db.session.commit()
+
+    latencies.sort()
+    pick = lambda q: latencies[min(len(latencies) - 1, int(q * len(latencies)))]
+    click.echo(f'{rounds} lotes de {steps} passos (1 requisição por lote)')
+    click.echo(f'latência ms: p50={pick(0.50):.1f} p95={pick(0.95):.1f} max={latencies[-1]:.1f}')
+    click.echo(f'statements SQL por lote: min={min(statements)} max={max(statements)}')
+
+
+async def _http_get_loop(host, port, path, deadline, latencies, errors):
+    """Cliente HTTP/1.1 keep-alive mínimo: repete GET path até o prazo."""
+    import asyncio
+    reader = writer = None
+    request = f'GET {path} HTTP/1.1\r\nHost: {host}\r\nAccept: application/json\r\n\r\n'.encode()
+    while time.perf_counter() < deadline:
+        started = time.perf_counter()
+        try:
+            if writer is None:
+                reader, writer = await asyncio.open_connection(host, port)
+            writer.write(request)
+            status_line = await reader.readline()
+            length, keep_alive = None, True
+            while True:
+                line = await reader.readline()
+                if line in (b'\r\n', b''):
+                    break
+                name, _, value = line.decode('latin-1').partition(':')
+                name = name.strip().lower()
+                if name == 'content-length':
+                    length = int(value)
+                elif name == 'connection' and value.strip().lower() == 'close':
+                    keep_alive = False
+            if length is None:
+                await reader.read()
+                keep_alive = False
+            else:
+                await reader.readexactly(length)
+            if not status_line.startswith(b'HTTP/1.1 200') and not status_line.startswith(b'HTTP/1.0 200'):
+                errors.append(status_line.decode('latin-1').strip() or 'conexão encerrada')
+            else:
+                latencies.append((time.perf_counter() - started) * 1000)
+            if not keep_alive:
+                writer.close()
+                reader = writer = None
+        except (OSError, asyncio.IncompleteReadError) as e:
+            errors.append(type(e).__name__)
+            if writer is not None:
+                writer.close()
+            reader = writer = None
+    if writer is not None:
+        writer.close()
+
+
+async def _drive_server(base_url, path, concurrency, duration):
+    import asyncio
+    from urllib.parse import urlsplit
+    url = urlsplit(base_url)
+    deadline = time.perf_counter() + duration
+    latencies, errors = [], []
+    await asyncio.gather(*(
+        _http_get_loop(url.hostname, url.port or 80, path, deadline, latencies, errors)
+        for _ in range(concurrency)
+    ))
+    return latencies, errors
+
+
+@click.command('bench-serving')
+@click.option('--wsgi-url', default='http://127.0.0.1:5000', show_default=True,
+              help='App Flask (ex.: gunicorn -w 4 "backend:create_app()").')
+@click.option('--asgi-url', default='http://127.0.0.1:8000', show_default=True,
+              help='Modo ASGI (ex.: uvicorn --factory backend.asgi:create_asgi_app --workers 4).')
+@click.option('--path', 'paths', multiple=True, default=['/api/journeys/?limit=50'], show_default=True,
+              help='Caminho(s) requisitados; pode repetir a opção.')
+@click.option('--concurrency', default='1,16,64,256', show_default=True,
+              help='Conexões simultâneas a medir, separadas por vírgula.')
+@click.option('--duration', default=10.0, show_default=True, help='Segundos por medição.')
+def bench_serving_command(wsgi_url, asgi_url, paths, concurrency, duration):
+    """Compara requisições/s e latência dos modos WSGI (Flask) e ASGI nos mesmos endpoints.
+
+    Os dois servidores devem estar rodando contra o mesmo banco e no mesmo hardware.
+    O cache de respostas do Flask deve ser desligado (CACHE_BACKEND=none) para que
+    ambos façam os mesmos round-trips ao banco.
+    """
+    import asyncio
+
+    levels = [int(n) for n in concurrency.split(',') if n.strip()]
+    click.echo(f"{'mode':>5} {'path':<32} {'conc':>5} {'req/s':>9} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'errors':>7}")
+    for path in paths:
+        for level in levels:
+            for mode, base_url in (('wsgi', wsgi_url), ('asgi', asgi_url)):
+                latencies, errors = asyncio.run(_drive_server(base_url, path, level, duration))
+                latencies.sort()
+                pick = lambda q: latencies[min(len(latencies) - 1, int(q * len(latencies)))] if latencies else 0.0
+                click.echo(f"{mode:>5} {path[:32]:<32} {level:>5} {len(latencies) / duration:>9.1f} "
+                           f"{pick(0.50):>8.1f} {pick(0.95):>8.1f} {pick(0.99):>8.1f} {len(errors):>7}")
+
+
+@click.command('bench-serialization')
+@click.option('--steps', default=10000, show_default=True, help='Passos no payload sintético do canvas.')
+@click.option('--costs-per-step', default=3, show_default=True, help='Custos por passo.')
+@click.option('--rounds', default=5, show_default=True, help='Repetições (vale a melhor).')
+def bench_serialization_command(steps, costs_per_step, rounds):
+    """Micro-benchmark: serializa um payload de canvas grande com json da stdlib e com orjson.
+
+    'stdlib+conv' reproduz o caminho antigo (conversão campo a campo de Decimal
+    e datetime antes do json.dumps); os demais recebem as linhas como vêm do banco.
+    """
+    import datetime
+    import decimal
+    import json
+    from . import serialization
+    from .canvas import assemble_canvas
+
+    now = datetime.datetime.now(datetime.timezone.utc)
+    Row = lambda **kw: type('Row', (), kw)
+    journey = Row(id=1, name='bench', description=None, status='Active', user_id=1,
+                  created_at=now, modificated_at=now)
+    step_rows = [Row(id=i, name=f'step-{i}', description='passo sintético', type='Performance Campaign',
+                     channel='Google Ads', budget=decimal.Decimal('1234.50'), date_start=now, date_end=now,
+                     status='Planned', pos_x=i, pos_y=i * 2, modificated_at=now)
+                 for i in range(steps)]
+    cost_rows = [Row(id=i * costs_per_step + k, step_id=i, description=f'cost-{k}', value=decimal.Decimal('99.90'),
+                     cost_type='Paid Media', occoured_at=now, timePeriod_start=now.date(), timePeriod_end=now.date())
+                 for i in range(steps) for k in range(costs_per_step)]
+    payload = assemble_canvas(journey, step_rows, cost_rows, 'list')
+
+    def convert(value):
+        if isinstance(value, dict):
+            return {k: convert(v) for k, v in value.items()}
+        if isinstance(value, list):
+            return [convert(v) for v in value]
+        if isinstance(value, decimal.Decimal):
+            return float(value)
+        if isinstance(value, (datetime.datetime, datetime.date)):
+            return value.isoformat()
+        return value
+
+    candidates = [
+        ('stdlib+conv', lambda: json.dumps(convert(payload)).encode('utf-8')),
+        ('stdlib', lambda: serialization.stdlib_dumps(payload)),
+    ]
+    if serialization.orjson is not None:
+        candidates.append(('orjson', lambda: serialization.orjson_dumps(payload)))
+    else:
+        click.echo('orjson não instalado: medindo apenas a stdlib', err=True)
+
+    click.echo(f'{steps} passos, {steps * costs_per_step} custos')
+    click.echo(f"{'serializer':>12} {'ms':>9} {'MB':>7} {'speedup':>8}")
+    baseline = None
+    for name, run in candidates:
+        best = float('inf')
+        for _ in range(rounds):
+            started = time.perf_counter()
+            body = run()
+            best = min(best, time.perf_counter() - started)
+        baseline = baseline or best
+        click.echo(f'{name:>12} {best * 1000:>9.1f} {len(body) / 1e6:>7.2f} {baseline / best:>7.1f}x')
+
+
+
+@click.command('pace-steps')
+@click.option('--as-of', type=click.DateTime(formats=['%Y-%m-%d']), default=None,
+              help='Data de referência (padrão: hoje, UTC).')
+@click.option('--window-days', default=7, show_default=True, help='Janela (dias) do burn rate.')
+@click.option('--tolerance', default=0.1, show_default=True, help='Desvio aceito antes de marcar under/over.')
+@with_appcontext
+def pace_steps_command(as_of, window_days, tolerance):
+    """Recalcula o pacing de todos os Passos ativos e grava o retrato em step_pacing.
+
+    Feito para rodar agendado (ex.: cron diário 'flask pace-steps' ou um Render Cron Job).
+    """
+    from .pacing import save_pacing_snapshot
+
+    summary = save_pacing_snapshot(as_of.date() if as_of else None, window_days=window_days, tolerance=tolerance)
+    counts = summary['counts']
+    seconds = summary['seconds']
+    click.echo(f"pacing em {summary['as_of']}: {summary['steps']} passos, {summary['costs']} grupos de custos; "
+               f"under={counts['under']} on_track={counts['on_track']} over={counts['over']}")
+    click.echo(f"tempo s: load={seconds['load']} compute={seconds['compute']} save={seconds['save']}")
+
+
+@click.command('bench-pacing')
+@click.option('--steps', default=100000, show_default=True, help='Passos ativos sintéticos.')
+@click.option('--costs-per-step', default=10, show_default=True, help='Grupos de custos por passo.')
+@click.option('--journeys', default=2000, show_default=True, help='Jornadas entre as quais os passos se dividem.')
+def bench_pacing_command(steps, costs_per_step, journeys):
+    """Mede o cálculo vetorizado de pacing (compute_pacing) sobre arrays sintéticos, sem banco."""
+    import datetime
+    from .pacing import PacingUnavailable, _require_numpy, compute_pacing, step_pacing_rows
+
+    try:
+        np = _require_numpy()
+    except PacingUnavailable as e:
+        raise click.ClickException(str(e))
+    rng = np.random.default_rng(42)
+    as_of = datetime.date.today()
+    today = np.datetime64(as_of, 'D').astype(np.int64)
+    start = today - rng.integers(0, 60, steps)
+    step_ids = np.arange(1, steps + 1)
+    inputs = {
+        'step_id': step_ids,
+        'journey_id': rng.integers(1, journeys + 1, steps),
+        'budget': rng.uniform(1000, 50000, steps).round(2),
+        'start': start,
+        'end': start + rng.integers(60, 120, steps),
+    }
+    cost_step = np.repeat(step_ids, costs_per_step)
+    cost_start = np.repeat(start, costs_per_step) + rng.integers(0, 60, steps * costs_per_step)
+    costs = {
+        'step_id': cost_step,
+        'start': cost_start,
+        'end': cost_start + rng.integers(0, 14, steps * costs_per_step),
+        'value': rng.uniform(10, 2000, steps * costs_per_step).round(2),
+    }
+
+    started = time.perf_counter()
+    result = compute_pacing(inputs, costs, as_of)
+    computed = time.perf_counter() - started
+    rows = step_pacing_rows(result)
+    converted = time.perf_counter() - started - computed
+    click.echo(f'{steps} passos, {steps * costs_per_step} grupos de custos, {len(result["journeys"]["journey_id"])} jornadas')
+    click.echo(f'compute_pacing: {computed * 1000:.1f} ms; conversão para {len(rows)} linhas: {converted * 1000:.1f} ms')
+
+
+
+@click.command('bench-step-graph')
+@click.option('--steps', default=10000, show_default=True, help='Passos da jornada sintética.')
+@click.option('--edges-per-step', default=2, show_default=True, help='Dependências de entrada por passo.')
+@with_appcontext
+def bench_step_graph_command(steps, edges_per_step):
+    """Mede carga (fria e em cache), ordem topológica, caminho crítico e impacto em um DAG grande.
+
+    Os dados sintéticos são criados dentro de uma transação que é desfeita ao final.
+    """
+    import datetime
+    import random
+    from .models import User, Journey, Step, StepEdge
+    from .step_graph import load_journey_graph, slip_impact
+
+    rng = random.Random(42)
+    base = datetime.datetime(2026, 1, 1, tzinfo=datetime.timezone.utc)
+    timings = []
+
+    def timed(label, fn):
+        started = time.perf_counter()
+        value = fn()
+        timings.append((label, (time.perf_counter() - started) * 1000))
+        return value
+
+    try:
+        user = User(email='bench-step-graph@midaspipe.local')
+        db.session.add(user)
+        db.session.flush()
+        journey = Journey(name='bench-step-graph', user_id=user.id)
+        db.session.add(journey)
+        db.session.flush()
+        journey_id = journey.id
+        offsets = [rng.randint(0, 300) for _ in range(steps)]
+        db.session.execute(insert(Step), [
+            {'name': f'step-{i}', 'type': 'Performance Campaign', 'journey_id': journey_id, 'status': 'Planned',
+             'date_start': base + datetime.timedelta(days=offsets[i]),
+             'date_end': base + datetime.timedelta(days=offsets[i] + rng.randint(1, 20))}
+            for i in range(steps)
+        ])
+        step_ids = db.session.scalars(db.select(Step.id).where(Step.journey_id == journey_id).order_by(Step.id)).all()
+        # Arestas sempre de um passo anterior para um posterior: DAG garantido
+        edges = {(step_ids[rng.randrange(i)], step_ids[i]) for i in range(1, steps) for _ in range(edges_per_step)}
+        db.session.execute(insert(StepEdge), [
+            {'from_step_id': a, 'to_step_id': b, 'journey_id': journey_id, 'lag_days': rng.randint(0, 3)}
+            for a, b in edges
+        ])
+        db.session.flush()
+
+        graph = timed('carga fria (versão + consulta + adjacência)', lambda: load_journey_graph(journey_id))
+        timed('carga em cache (versão + adjacência)', lambda: load_journey_graph(journey_id))
+        order = timed('ordem topológica', graph.topological_order)
+        path = timed('caminho crítico + folgas', lambda: graph.critical_path(order)[0])
+        impact = timed('impacto de atraso (recarga + 2 passes)', lambda: slip_impact(journey_id, step_ids[0], 5))
+        click.echo(f'{len(graph)} passos, {graph.edge_count} dependências; caminho crítico com {len(path)} passos; '
+                   f'{len(impact["affected"])} afetados pelo atraso do primeiro passo')
+        for label, ms in timings:
+            click.echo(f'{label:<45} {ms:>9.1f} ms')
+    finally:
+        db.session.rollback()
+
+
+def _bench_journey(name, steps, costs_per_step):
+    """Jornada sintética (passos em cadeia, custos e rollups) para os benchmarks; devolve o id. Não faz commit."""
+    import datetime
+    from .models import User, Journey, Step, StepEdge, Cost
+
+    base = datetime.datetime(2026, 1, 1, tzinfo=datetime.timezone.utc)
+    user = User(email=f'{name}@midaspipe.local')
+    db.session.add(user)
+    db.session.flush()
+    journey = Journey(name=name, user_id=user.id)
+    db.session.add(journey)
+    db.session.flush()
+    journey_id = journey.id
+    db.session.execute(insert(Step), [
+        {'name': f'step-{i}', 'type': 'Performance Campaign', 'journey_id': journey_id, 'status': 'Completed',
+         'date_start': base + datetime.timedelta(days=i % 300),
+         'date_end': base + datetime.timedelta(days=i % 300 + 7)}
+        for i in range(steps)
+    ])
+    step_ids = db.session.scalars(db.select(Step.id).where(Step.journey_id == journey_id).order_by(Step.id)).all()
+    db.session.execute(insert(StepEdge), [
+        {'from_step_id': a, 'to_step_id': b, 'journey_id': journey_id, 'lag_days': 0}
+        for a, b in zip(step_ids, step_ids[1:])
+    ])
+    if costs_per_step:
+        db.session.execute(insert(Cost), [
+            {'description': f'cost-{n}', 'value': 10 + n, 'cost_type': 'Paid Media', 'step_id': step_id,
+             'occoured_at': base, 'timePeriod_start': base.date(), 'timePeriod_end': base.date()}
+            for step_id in step_ids for n in range(costs_per_step)
+        ])
+    rebuild_cost_rollups(db.session.connection(), journey_id=journey_id)
+    db.session.flush()
+    return journey_id
+
+
+@click.command('bench-journey-clone')
+@click.option('--steps', default=10000, show_default=True, help='Passos da jornada sintética.')
+@click.option('--costs-per-step', default=2, show_default=True, help='Custos por passo.')
+@click.option('--orm', is_flag=True, help='Compara com a cópia objeto a objeto pelo ORM (lenta em jornadas grandes).')
+@with_appcontext
+def bench_journey_clone_command(steps, costs_per_step, orm):
+    """Mede a cópia profunda (INSERT ... SELECT) de uma jornada grande: tempo e número de statements.
+
+    Os dados sintéticos e as cópias são criados dentro de uma transação que é desfeita ao final.
+    """
+    import datetime
+    from .journey_clone import clone_journey
+    from .models import Journey, Step, StepEdge, Cost
+
+    def orm_clone(source_id):
+        source = db.session.get(Journey, source_id)
+        copy = Journey(name=f'{source.name} (cópia ORM)', user_id=source.user_id, status=source.status)
+        db.session.add(copy)
+        step_map = {}
+        for step in source.steps:
+            step_map[step.id] = Step(journey=copy, name=step.name, description=step.description, type=step.type,
+                                     channel=step.channel, budget=step.budget, status=step.status,
+                                     date_start=step.date_start, date_end=step.date_end,
+                                     pos_x=step.pos_x, pos_y=step.pos_y)
+            db.session.add(step_map[step.id])
+            for cost in step.costs:
+                db.session.add(Cost(step=step_map[step.id], description=cost.description, value=cost.value,
+                                    cost_type=cost.cost_type, occoured_at=cost.occoured_at,
+                                    timePeriod_start=cost.timePeriod_start, timePeriod_end=cost.timePeriod_end))
+        db.session.flush()
+        for edge in db.session.scalars(db.select(StepEdge).where(StepEdge.journey_id == source_id)):
+            db.session.add(StepEdge(from_step_id=step_map[edge.from_step_id].id, to_step_id=step_map[edge.to_step_id].id,
+                                    journey_id=copy.id, lag_days=edge.lag_days))
+        db.session.flush()
+
+    try:
+        journey_id = _bench_journey('bench-journey-clone', steps, costs_per_step)
+
+        for label, kwargs in (('clone (mesmas datas)', {}),
+                              ('clone (+30 dias)', {'shift_days': 30}),
+                              ('instanciar modelo (sem custos)', {'start_date': datetime.date(2027, 1, 1),
+                                                                  'include_costs': False, 'step_status': 'Planned'})):
+            started = time.perf_counter()
+            with count_queries() as counter:
+                summary = clone_journey(journey_id, **kwargs)
+            ms = (time.perf_counter() - started) * 1000
+            click.echo(f"{label:<32} {ms:>9.1f} ms  {counter['count']:>3} statements  "
+                       f"({summary['steps']} passos, {summary['edges']} dependências, {summary['costs']} custos)")
+        if orm:
+            db.session.expire_all()
+            started = time.perf_counter()
+            with count_queries() as counter:
+                orm_clone(journey_id)
+            ms = (time.perf_counter() - started) * 1000
+            click.echo(f"{'ORM objeto a objeto':<32} {ms:>9.1f} ms  {counter['count']:>3} statements")
+    finally:
+        db.session.rollback()
+
+
+@click.command('bench-journey-delete')
+@click.option('--steps', default=10000, show_default=True, help='Passos de cada jornada sintética.')
+@click.option('--costs-per-step', default=2, show_default=True, help='Custos por passo.')
+@click.option('--journeys', default=5, show_default=True, help='Jornadas removidas juntas no lote.')
+@with_appcontext
+def bench_journey_delete_command(steps, costs_per_step, journeys):
+    """Mede a remoção de jornadas grandes (uma e em lote): tempo, statements e se sobrou algum filho.
+
+    Os dados sintéticos são criados dentro de uma transação que é desfeita ao final.
+    """
+    from .journey_clone import clone_journey
+    from .journey_delete import delete_journeys
+    from .models import Cost, CostRollup, Step, StepEdge
+
+    def leftovers(journey_ids):
+        step_ids = db.select(Step.id).where(Step.journey_id.in_(journey_ids)).scalar_subquery()
+        return sum(db.session.execute(db.select(db.func.count()).select_from(model).where(where)).scalar()
+                   for model, where in ((Step, Step.journey_id.in_(journey_ids)),
+                                        (Cost, Cost.step_id.in_(step_ids)),
+                                        (StepEdge, StepEdge.journey_id.in_(journey_ids)),
+                                        (CostRollup, CostRollup.journey_id.in_(journey_ids))))
+
+    try:
+        source_id = _bench_journey('bench-journey-delete', steps, costs_per_step)
+        batch = [clone_journey(source_id)['journey_id'] for _ in range(journeys)]
+        statements, failures = [], []
+        for label, journey_ids in (('1 jornada', [source_id]), (f'{journeys} jornadas (lote)', batch)):
+            started = time.perf_counter()
+            with count_queries() as counter:
+                deleted = delete_journeys(journey_ids)
+            ms = (time.perf_counter() - started) * 1000
+            remaining = leftovers(journey_ids)
+            statements.append(counter['count'])
+            click.echo(f"{label:<20} {ms:>9.1f} ms  {counter['count']:>3} statements  "
+                       f"({len(deleted)} removidas, {remaining} linhas filhas restantes)")
+            if remaining:
+                failures.append(f'{label}: {remaining} linhas filhas restantes')
+        # O número de statements não pode crescer com o tamanho do lote
+        if statements[0] != statements[1]:
+            failures.append(f'{statements[0]} statements para 1 jornada e {statements[1]} para {journeys}')
+        if failures:
+            raise click.ClickException('; '.join(failures))
+    finally:
+        db.session.rollback()
+
+
+@click.command('seed-data')
+@click.option('--users', default=100, show_default=True, help='Usuários a criar.')
+@click.option('--journeys-per-user', default=10, show_default=True, help='Jornadas por usuário (média).')
+@click.option('--steps-per-journey', default=20, show_default=True, help='Passos por jornada (média).')
+@click.option('--costs-per-step', default=50, show_default=True, help='Custos por passo (média).')
+@click.option('--seed', default=42, show_default=True, help='Semente: a mesma seed gera os mesmos dados.')
+@click.option('--batch-size', default=10000, show_default=True, help='Linhas por INSERT em massa.')
+@with_appcontext
+def seed_data_command(users, journeys_per_user, steps_per_journey, costs_per_step, seed, batch_size):
+    """Gera dados sintéticos realistas (padrão: ~1M de custos) para benchmarks e testes de carga."""
+    from .seed import SeedError, seed_database
+
+    started = time.perf_counter()
+    try:
+        totals = seed_database(users, journeys_per_user, steps_per_journey, costs_per_step, seed=seed,
+                               batch_size=batch_size, echo=click.echo)
+    except SeedError as e:
+        raise click.ClickException(str(e))
+    elapsed = time.perf_counter() - started
+    click.echo(f"Gerados {totals['users']} usuários, {totals['journeys']} jornadas, {totals['steps']} passos, "
+               f"{totals['edges']} dependências e {totals['costs']} custos em {elapsed:.1f} s "
+               f"({totals['costs'] / elapsed:,.0f} custos/s)")
+
+
+@click.command('bench-api')
+@click.option('--requests', 'requests_', default=200, show_default=True, help='Requisições medidas por cenário.')
+@click.option('--warmup', default=20, show_default=True, help='Requisições descartadas antes de medir.')
+@click.option('--scenario', 'scenarios', multiple=True, help='Só estes cenários (repetível).')
+@click.option('--output', type=click.Path(dir_okay=False), help='Grava os resultados em JSON (ex.: novo baseline).')
+@click.option('--baseline', type=click.Path(exists=True, dir_okay=False),
+              help='Compara com um resultado salvo; sai com erro se houver regressão.')
+@click.option('--tolerance', default=0.25, show_default=True, help='Piora aceita no p95 e no RSS (0.25 = 25%).')
+@with_appcontext
+def bench_api_command(requests_, warmup, scenarios, output, baseline, tolerance):
+    """Mede os endpoints de Jornadas: p50/p95/p99, queries por requisição e crescimento de RSS.
+
+    Rode sobre uma massa conhecida (flask seed-data) e com CACHE_BACKEND=none.
+    """
+    import json
+    from flask import current_app
+    from .benchmarks import (BENCH_SCENARIO_NAMES, BenchmarkError, compare_to_baseline, format_header,
+                             run_benchmarks)
+
+    unknown = set(scenarios) - set(BENCH_SCENARIO_NAMES)
+    if unknown:
+        raise click.BadParameter(f"cenários desconhecidos: {', '.join(sorted(unknown))}", param_hint='--scenario')
+    if current_app.config.get('CACHE_BACKEND') != 'none':
+        click.echo(f"Aviso: CACHE_BACKEND={current_app.config.get('CACHE_BACKEND')}; leituras repetidas "
+                   f"vêm do cache de respostas", err=True)
+    click.echo(format_header())
+    try:
+        results = run_benchmarks(current_app._get_current_object(), requests_, warmup, scenarios, echo=click.echo)
+    except BenchmarkError as e:
+        raise click.ClickException(str(e))
+    if output:
+        with open(output, 'w', encoding='utf-8') as fh:
+            json.dump(results, fh, indent=2, ensure_ascii=False)
+        click.echo(f'Resultados gravados em {output}')
+    if baseline:
+        with open(baseline, encoding='utf-8') as fh:
+            regressions, warnings = compare_to_baseline(results, json.load(fh), tolerance)
+        for message in warnings:
+            click.echo(f'Aviso: {message}', err=True)
+        if regressions:
+            for message in regressions:
+                click.echo(f'REGRESSÃO: {message}', err=True)
+            sys.exit(1)
+        click.echo(f'Sem regressões em relação a {baseline} (tolerância {tolerance:.0%})')
+
+
+@click.command('partition-costs')
+@click.option('--partitions', type=int, required=True,
+              help='Partições HASH(step_id) de costs; 0 volta para uma tabela comum.')
+@click.option('--batch-size', default=5000, show_default=True, help='Linhas por lote do backfill (um commit por lote).')
+@click.option('--keep-old', is_flag=True, help='Mantém a tabela anterior como costs_unpartitioned.')
+@with_appcontext
+def partition_costs_command(partitions, batch_size, keep_old):
+    """Converte costs online para HASH(step_id) com N partições (PostgreSQL)."""
+    from .partitioning import PartitioningError, repartition_costs
+
+    try:
+        repartition_costs(db.engine, partitions, batch_size=batch_size, keep_old=keep_old, echo=click.echo)
+    except PartitioningError as e:
+        raise click.ClickException(str(e))
+
+
+def _sample_tenants(samples):
+    """(journey_id, step_id) das jornadas com mais custos: os maiores tenants primeiro."""
+    return db.session.execute(text("""
+        SELECT steps.journey_id, min(costs.step_id) AS step_id
+        FROM costs JOIN steps ON steps.id = costs.step_id
+        GROUP BY steps.journey_id
+        ORDER BY count(*) DESC, steps.journey_id
+        LIMIT :samples
+    """), {'samples': samples}).all()
+
+
+@click.command('costs-partitions')
+@click.option('--journey-id', type=int, default=None, help='Jornada usada na verificação (padrão: a com mais custos).')
+@with_appcontext
+def costs_partitions_command(journey_id):
+    """Mostra o layout de costs e verifica o partition pruning das consultas por passo/jornada."""
+    from .partitioning import PartitioningError, check_partition_pruning, costs_layout
+
+    connection = db.session.connection()
+    try:
+        layout = costs_layout(connection)
+    except PartitioningError as e:
+        raise click.ClickException(str(e))
+    click.echo(f'costs: {layout["partitions"] or "sem"} partições')
+    for name, rows, size in layout['tables']:
+        click.echo(f'  {name:<24} {max(rows, 0):>12} linhas (estimativa) {size / 2 ** 20:>10.1f} MiB')
+    tenants = _sample_tenants(1)
+    if journey_id is None and not tenants:
+        click.echo('Sem custos: nada a verificar.')
+        return
+    if journey_id is None:
+        journey_id, step_id = tenants[0]
+    else:
+        step_id = db.session.execute(text('SELECT min(id) FROM steps WHERE journey_id = :journey_id'),
+                                     {'journey_id': journey_id}).scalar()
+    results = check_partition_pruning(connection, step_id, journey_id)
+    db.session.rollback()
+    click.echo(f'\nPartition pruning (jornada {journey_id}, passo {step_id}):')
+    for result in results:
+        limit = 'informativa' if result['allowed'] is None else f'máximo {result["allowed"]}'
+        click.echo(f'  {result["query"]:<8} {result["scanned"]:>4}/{result["partitions"]} partições lidas '
+                   f'({limit}) {"ok" if result["ok"] else "FALHOU"}')
+    if not all(result['ok'] for result in results):
+        raise click.ClickException('Partition pruning não aconteceu em uma das consultas')
+
+
+@click.command('bench-costs-tenants')
+@click.option('--samples', default=50, show_default=True, help='Jornadas (tenants) medidas, as com mais custos.')
+@click.option('--rounds', default=5, show_default=True, help='Repetições por tenant (vale a mediana).')
+@with_appcontext
+def bench_costs_tenants_command(samples, rounds):
+    """Tempo por tenant (jornada) das consultas de costs; rode antes e depois do partition-costs."""
+    import statistics
+    from .partitioning import PartitioningError, costs_layout
+
+    queries = {
+        'custos do passo': ('SELECT * FROM costs WHERE step_id = :step_id', 'step'),
+        'custos da jornada': ('SELECT costs.* FROM costs JOIN steps ON steps.id = costs.step_id '
+                              'WHERE steps.journey_id = :journey_id', 'journey'),
+        'totais por tipo': ('SELECT costs.step_id, costs.cost_type, sum(costs.value) FROM costs '
+                            'JOIN steps ON steps.id = costs.step_id WHERE steps.journey_id = :journey_id '
+                            'GROUP BY costs.step_id, costs.cost_type', 'journey'),
+        'passos da jornada': ('SELECT * FROM costs WHERE step_id = ANY(:step_ids)', 'steps'),
+    }
+    try:
+        layout = costs_layout(db.session.connection())
+    except PartitioningError as e:
+        raise click.ClickException(str(e))
+    tenants = _sample_tenants(samples)
+    if not tenants:
+        raise click.ClickException('Sem custos para medir (rode import-costs ou um seed antes).')
+    step_ids = {journey_id: db.session.execute(text('SELECT id FROM steps WHERE journey_id = :journey_id'),
+                                               {'journey_id': journey_id}).scalars().all()
+                for journey_id, _step_id in tenants}
+    click.echo(f'costs: {layout["partitions"] or "sem"} partições; {len(tenants)} tenants, {rounds} rodadas')
+    for label, (sql, scope) in queries.items():
+        statement = text(sql)
+        medians = []
+        for journey_id, step_id in tenants:
+            params = {'step': {'step_id': step_id}, 'journey': {'journey_id': journey_id},
+                      'steps': {'step_ids': step_ids[journey_id]}}[scope]
+            elapsed = []
+            for _ in range(rounds):
+                started = time.perf_counter()
+                db.session.execute(statement, params).all()
+                elapsed.append((time.perf_counter() - started) * 1000)
+            medians.append(statistics.median(elapsed))
+        medians.sort()
+        p95 = medians[min(len(medians) - 1, int(len(medians) * 0.95))]
+        click.echo(f'{label:<20} p50 {statistics.median(medians):>8.2f} ms  p95 {p95:>8.2f} ms  '
+                   f'máx {medians[-1]:>8.2f} ms')
+    db.session.rollback()
+
+
+@click.command('jobs-worker')
+@click.option('--threads', default=1, show_default=True, envvar='JOBS_WORKER_THREADS',
+              help='Jobs simultâneos por processo (env JOBS_WORKER_THREADS).')
+@click.option('--processes', default=1, show_default=True, envvar='JOBS_WORKER_PROCESSES',
+              help='Processos de worker (env JOBS_WORKER_PROCESSES); outras máquinas podem rodar mais workers.')
+@click.option('--kind', 'kinds', multiple=True, help='Só estes tipos de job (repetível).')
+@click.option('--burst', is_flag=True, help='Sai quando a fila esvaziar (ex.: cron, CI).')
+@with_appcontext
+def jobs_worker_command(threads, processes, kinds, burst):
+    """Executa os jobs da fila (tabela jobs) até SIGINT/SIGTERM; o job em andamento termina antes de sair."""
+    from flask import current_app
+    from .jobs import JOB_KINDS, run_worker, run_worker_processes
+
+    unknown = set(kinds) - set(JOB_KINDS)
+    if unknown:
+        raise click.BadParameter(f"tipos desconhecidos: {', '.join(sorted(unknown))}", param_hint='--kind')
+    threads, processes = max(1, threads), max(1, processes)
+    click.echo(f"jobs-worker: {processes} processo(s) x {threads} thread(s); tipos: {', '.join(kinds) or 'todos'}")
+    if processes == 1:
+        run_worker(current_app._get_current_object(), threads, list(kinds) or None, burst)
+    else:
+        run_worker_processes(processes, threads, list(kinds) or None, burst)
+
+
+@click.command('startup-report')
+@click.option('--fast/--no-fast', default=None,
+              help='Força FAST_STARTUP no processo medido (padrão: o do ambiente).')
+@click.option('--top', default=15, show_default=True, help='Linhas por tabela.')
+def startup_report_command(fast, top):
+    """Tempo de import (-X importtime) e de cada fase do create_app, medido em um processo novo."""
+    from .check_cli import print_startup_report, startup_report
+
+    try:
+        report = startup_report(fast=fast, top=top)
+    except RuntimeError as e:
+        raise click.ClickException(str(e))
+    print_startup_report(report, echo=click.echo)
+
+
+@click.command('bench-journey-events')
+@click.option('--subscribers', default=100, show_default=True, help='Assinantes (streams SSE) da mesma jornada.')
+@click.option('--writes', default=50, show_default=True, help='Commits que alteram um passo da jornada.')
+@with_appcontext
+def bench_journey_events_command(subscribers, writes):
+    """Mede o fan-out dos deltas SSE: statements por escrita e latência do commit até cada assinante.
+
+    Roda as mesmas escritas sem assinantes e com N assinantes. A jornada sintética é
+    gravada (os eventos só saem no commit) e removida ao final.
+    """
+    import threading
+    from .extensions import journey_events
+    from .journey_delete import delete_journeys
+    from .models import Step, User
+    from .step_batch import apply_step_updates
+
+    journey_id = _bench_journey('bench-journey-events', writes, 0)
+    db.session.commit()
+    step_ids = db.session.scalars(db.select(Step.id).where(Step.journey_id == journey_id).order_by(Step.id)).all()
+    committed_at = {}
+    click.echo(f"backend {journey_events.backend}")
+    click.echo(f"{'assinantes':>10} {'stmt/escrita':>12} {'entregas':>9} {'deltas':>7} {'p50 ms':>8} {'p95 ms':>8}")
+    try:
+        for count in (0, subscribers):
+            committed_at.clear()
+            latencies, deltas = [], [0]
+            lock = threading.Lock()
+            subscriptions = [journey_events.subscribe(journey_id) for _ in range(count)]
+
+            def consume(subscription):
+                seen = 0
+                while seen < writes:
+                    change = subscription.wait(5)
+                    if change is None:
+                        return
+                    now = time.perf_counter()
+                    with lock:
+                        deltas[0] += 1
+                        for step_id in change.get('steps', ()):
+                            if step_id in committed_at:
+                                latencies.append((now - committed_at[step_id]) * 1000)
+                                seen += 1
+
+            threads = [threading.Thread(target=consume, args=(s,), daemon=True) for s in subscriptions]
+            for thread in threads:
+                thread.start()
+            with count_queries() as counter:
+                for index, step_id in enumerate(step_ids):
+                    committed_at[step_id] = time.perf_counter()
+                    apply_step_updates(journey_id, [{'id': step_id, 'pos_x': index + count}])
+            for thread in threads:
+                thread.join(10)
+            for subscription in subscriptions:
+                journey_events.unsubscribe(subscription)
+            latencies.sort()
+            p50 = latencies[len(latencies) // 2] if latencies else 0
+            p95 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))] if latencies else 0
+            click.echo(f"{count:>10} {counter['count'] / len(step_ids):>12.2f} {len(latencies):>9} {deltas[0]:>7} "
+                       f"{p50:>8.2f} {p95:>8.2f}")
+    finally:
+        db.session.rollback()
+        delete_journeys([journey_id])
+        db.session.execute(db.delete(User).where(User.email == 'bench-journey-events@midaspipe.local'))
+        db.session.commit()
+    click.echo(f"stats {journey_events.stats()}")
+
+
+@click.command('refresh-cost-snapshot')
+@click.option('--full', is_flag=True, help='Reexporta todos os custos em vez de só os alterados.')
+@click.option('--no-reconcile', is_flag=True, help='Não varre os ids do banco para remover custos apagados.')
+@click.option('--batch-size', default=50000, show_default=True, help='Linhas por lote do cursor.')
+@with_appcontext
+def refresh_cost_snapshot_command(full, no_reconcile, batch_size):
+    """Atualiza o snapshot colunar (Arrow) dos custos em COST_SNAPSHOT_DIR.
+
+    Incremental a partir da marca d'água; feito para rodar agendado (ex.: cron a cada 15 min).
+    """
+    from flask import current_app
+    from .cost_snapshot import CostSnapshotError, refresh_cost_snapshot
+
+    config = current_app.config
+    try:
+        summary = refresh_cost_snapshot(config['COST_SNAPSHOT_DIR'], full=full, reconcile=not no_reconcile,
+                                        overlap_seconds=config['COST_SNAPSHOT_OVERLAP_SECONDS'],
+                                        batch_size=batch_size, echo=click.echo)
+    except CostSnapshotError as e:
+        raise click.ClickException(str(e))
+    click.echo(f"{'completo' if summary['full'] else 'incremental'}: {summary['fetched']} exportados, "
+               f"{summary['deleted']} removidos, {len(summary['rewritten'])} meses reescritos; "
+               f"{summary['rows']} custos em {summary['partitions']} meses, marca d'água "
+               f"{summary['high_water_mark']} ({summary['seconds']} s)")
+
+
+# (nome, group_by, filtros) das consultas comparadas: SQL x snapshot
+SNAPSHOT_BENCH_QUERIES = (
+    ('total', (), {}),
+    ('mês', ('month',), {}),
+    ('canal', ('channel',), {}),
+    ('mês x tipo de custo', ('month', 'cost_type'), {}),
+    ('usuário', ('user_id',), {}),
+    ('canal filtrado, por mês', ('month',), {'channel': None}),
+)
+
+
+@click.command('bench-cost-snapshot')
+@click.option('--rounds', default=5, show_default=True, help='Repetições por consulta (vale a mediana).')
+@with_appcontext
+def bench_cost_snapshot_command(rounds):
+    """Compara agregações no banco (GROUP BY) com as mesmas no snapshot colunar.
+
+    Atualiza o snapshot antes (incremental) e confere que os dois lados devolvem os mesmos grupos e totais.
+    """
+    from flask import current_app
+    from .cost_snapshot import CostSnapshotError, query_cost_snapshot, query_costs_sql, refresh_cost_snapshot
+
+    config = current_app.config
+    directory = config['COST_SNAPSHOT_DIR']
+    try:
+        summary = refresh_cost_snapshot(directory, overlap_seconds=config['COST_SNAPSHOT_OVERLAP_SECONDS'])
+    except CostSnapshotError as e:
+        raise click.ClickException(str(e))
+    click.echo(f"snapshot: {summary['rows']} custos em {summary['partitions']} meses "
+               f"(refresh em {summary['seconds']} s, {summary['fetched']} exportados)")
+    channel = next((row['channel'] for row in query_cost_snapshot(directory, ('channel',))['rows']
+                    if row['channel']), None)
+
+    def median_ms(run):
+        timings = []
+        for _ in range(rounds):
+            started = time.perf_counter()
+            result = run()
+            timings.append((time.perf_counter() - started) * 1000)
+            db.session.rollback()
+        return sorted(timings)[len(timings) // 2], result
+
+    click.echo(f"{'consulta':<26} {'grupos':>7} {'SQL ms':>9} {'snapshot ms':>12} {'ganho':>7}  confere")
+    mismatches = 0
+    for name, group_by, filters in SNAPSHOT_BENCH_QUERIES:
+        filters = {key: channel if value is None else value for key, value in filters.items()}
+        sql_ms, expected = median_ms(lambda: query_costs_sql(group_by, **filters))
+        snapshot_ms, result = median_ms(lambda: query_cost_snapshot(directory, group_by, **filters)['rows'])
+        # Por chave do grupo: a ordem de NULLs e a collation de texto variam entre os bancos
+        same = ({tuple(row[key] for key in group_by): (row['costs'], round(row['spent'], 2)) for row in expected}
+                == {tuple(row[key] for key in group_by): (row['costs'], round(row['spent'], 2)) for row in result})
+        mismatches += not same
+        click.echo(f"{name:<26} {len(result):>7} {sql_ms:>9.1f} {snapshot_ms:>12.1f} "
+                   f"{sql_ms / max(snapshot_ms, 0.001):>6.1f}x  {'ok' if same else 'DIVERGE'}")
+    if mismatches:
+        raise click.ClickException(f'{mismatches} consulta(s) com resultado diferente do banco')
+
+
+def register_commands(app):
+    """Registra os comandos CLI do MidasPipe na app."""
+    app.cli.add_command(export_journeys_command)
+    app.cli.add_command(import_costs_command)
+    app.cli.add_command(rebuild_cost_rollups_command)
+    app.cli.add_command(bench_journey_graph_command)
+    app.cli.add_command(bench_step_batch_command)
+    app.cli.add_command(bench_serving_command)
+    app.cli.add_command(bench_serialization_command)
+    app.cli.add_command(pace_steps_command)
+    app.cli.add_command(bench_pacing_command)
+    app.cli.add_command(bench_step_graph_command)
+    app.cli.add_command(bench_journey_clone_command)
+    app.cli.add_command(bench_journey_delete_command)
+    app.cli.add_command(bench_journey_events_command)
+    app.cli.add_command(refresh_cost_snapshot_command)
+    app.cli.add_command(bench_cost_snapshot_command)
+    app.cli.add_command(seed_data_command)
+    app.cli.add_command(bench_api_command)
+    app.cli.add_command(startup_report_command)
+    app.cli.add_command(partition_costs_command)
+    app.cli.add_command(costs_partitions_command)
+    app.cli.add_command(bench_costs_tenants_command)
+    app.cli.add_command(jobs_worker_command)
@@ -0,0 +1,232 @@
+# backend/cost_import.py
+# Importação em massa de Custos (CSV ou NDJSON), em lotes e idempotente
+#
+# Cada lote é validado de uma vez, os step_id são conferidos com uma única
+# consulta, e as linhas válidas vão para um UPSERT executemany na chave natural
+# (step_id, cost_type, timePeriod_start, timePeriod_end, description), seguido
+# do recálculo dos rollups dos passos tocados. Cada lote tem sua própria
+# transação; rodar o mesmo arquivo de novo só atualiza os valores.
+
+import csv
+import datetime
+import json
+import time
+from collections import defaultdict
+from decimal import Decimal, InvalidOperation
+
+from sqlalchemy import func, select
+
+from .extensions import db
+from .journey_events import record_journey_change
+from .models import Cost, Step
+from .rollups import UPSERT_DIALECTS, rebuild_cost_rollups
+
+IMPORT_FORMATS = ('csv', 'ndjson')
+IMPORT_BATCH_SIZE = 5000
+MAX_REPORTED_REJECTIONS = 1000
+
+NATURAL_KEY = ('step_id', 'cost_type', 'timePeriod_start', 'timePeriod_end', 'description')
+
+_DESCRIPTION_MAX = Cost.__table__.c.description.type.length
+_COST_TYPE_MAX = Cost.__table__.c.cost_type.type.length
+_CENTS = Decimal('0.01')
+
+
+class CostRowError(ValueError):
+    """Linha de importação inválida."""
+
+
+def iter_raw_rows(stream, fmt):
+    """Lê o arquivo de texto linha a linha, sem carregá-lo inteiro."""
+    if fmt not in IMPORT_FORMATS:
+        raise ValueError(f"Formato de importação inválido: {fmt!r}")
+    if fmt == 'csv':
+        for line_no, raw in enumerate(csv.DictReader(stream), start=2):
+            yield line_no, raw
+        return
+    for line_no, line in enumerate(stream, start=1):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            raw = json.loads(line)
+        except json.JSONDecodeError as e:
+            yield line_no, CostRowError(f'JSON inválido: {e.msg}')
+            continue
+        yield line_no, raw if isinstance(raw, dict) else CostRowError('Linha não é um objeto JSON')
+
+
+def _blank(value):
+    return value is None or (isinstance(value, str) and not value.strip())
+
+
+def _parse_datetime(value):
+    parsed = value if isinstance(value, datetime.datetime) else datetime.datetime.fromisoformat(str(value).strip())
+    return parsed if parsed.tzinfo else parsed.replace(tzinfo=datetime.timezone.utc)
+
+
+def _parse_date(value):
+    return value if isinstance(value, datetime.date) else datetime.date.fromisoformat(str(value).strip()[:10])
+
+
+def clean_row(raw):
+    """Valida e normaliza uma linha bruta; levanta CostRowError com o motivo da rejeição."""
+    if isinstance(raw, CostRowError):
+        raise raw
+    try:
+        step_id = int(raw.get('step_id'))
+    except (TypeError, ValueError):
+        raise CostRowError('step_id ausente ou inválido')
+
+    cost_type = (raw.get('cost_type') or '').strip()
+    if not cost_type:
+        raise CostRowError('cost_type é obrigatório')
+    if len(cost_type) > _COST_TYPE_MAX:
+        raise CostRowError(f'cost_type excede {_COST_TYPE_MAX} caracteres')
+
+    description = (raw.get('description') or cost_type).strip()
+    if len(description) > _DESCRIPTION_MAX:
+        raise CostRowError(f'description excede {_DESCRIPTION_MAX} caracteres')
+
+    try:
+        value = Decimal(str(raw.get('value')).strip().replace(',', '.'))
+    except (InvalidOperation, AttributeError):
+        raise CostRowError('value ausente ou inválido')
+    if not value.is_finite():
+        raise CostRowError('value deve ser um número finito')
+
+    try:
+        occoured_at = None if _blank(raw.get('occoured_at')) else _parse_datetime(raw['occoured_at'])
+        period_start = None if _blank(raw.get('timePeriod_start')) else _parse_date(raw['timePeriod_start'])
+        period_end = None if _blank(raw.get('timePeriod_end')) else _parse_date(raw['timePeriod_end'])
+    except ValueError as e:
+        raise CostRowError(f'Data inválida: {e}')
+
+    # O período faz parte da chave natural, então é sempre preenchido
+    if period_start is None:
+        if occoured_at is None:
+            raise CostRowError('Informe occoured_at ou timePeriod_start')
+        period_start = occoured_at.date()
+    period_end = period_end or period_start
+    if period_end < period_start:
+        raise CostRowError('timePeriod_end anterior a timePeriod_start')
+    if occoured_at is None:
+        occoured_at = datetime.datetime.combine(period_start, datetime.time(), tzinfo=datetime.timezone.utc)
+
+    return {
+        'step_id': step_id,
+        'cost_type': cost_type,
+        'description': description,
+        'value': value.quantize(_CENTS),
+        'occoured_at': occoured_at,
+        'timePeriod_start': period_start,
+        'timePeriod_end': period_end,
+    }
+
+
+def _upsert_statement(dialect_name):
+    make_insert = UPSERT_DIALECTS.get(dialect_name)
+    if make_insert is None:
+        raise RuntimeError(f'Importação de custos não suportada no dialeto {dialect_name!r}')
+    table = Cost.__table__
+    stmt = make_insert(table)
+    return stmt.on_conflict_do_update(
+        index_elements=[table.c[name] for name in NATURAL_KEY],
+        set_={
+            'value': stmt.excluded.value,
+            'occoured_at': stmt.excluded.occoured_at,
+            'modificated_at': func.now(),
+        },
+    )
+
+
+def _import_batch(batch):
+    """Valida, resolve step_id e grava um lote em uma transação. Retorna (gravadas, rejeições)."""
+    valid = []
+    rejected = []
+    for line_no, raw in batch:
+        try:
+            valid.append((line_no, clean_row(raw)))
+        except CostRowError as e:
+            rejected.append({'line': line_no, 'error': str(e)})
+
+    # Uma única consulta por lote para conferir os passos referenciados (e achar suas jornadas)
+    step_ids = {row['step_id'] for _, row in valid}
+    known = dict(db.session.execute(select(Step.id, Step.journey_id).where(Step.id.in_(step_ids))).all()) if step_ids else {}
+
+    # Dentro do mesmo lote, a última linha de cada chave natural prevalece
+    rows = {}
+    for line_no, row in valid:
+        if row['step_id'] not in known:
+            rejected.append({'line': line_no, 'error': f"step_id {row['step_id']} não existe"})
+            continue
+        rows[tuple(row[name] for name in NATURAL_KEY)] = row
+
+    if rows:
+        try:
+            connection = db.session.connection()
+            connection.execute(_upsert_statement(connection.dialect.name), list(rows.values()))
+            touched = {row['step_id'] for row in rows.values()}
+            rebuild_cost_rollups(connection, step_ids=touched)
+            by_journey = defaultdict(list)
+            for step_id in touched:
+                by_journey[known[step_id]].append(step_id)
+            for journey_id, journey_steps in by_journey.items():
+                record_journey_change(journey_id, cost_steps=journey_steps)
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
+    return len(rows), sorted(rejected, key=lambda r: r['line'])
+
+
+def import_costs(stream, fmt, batch_size=IMPORT_BATCH_SIZE, on_batch=None):
+    """Importa custos de um stream de texto e devolve o relatório por lote.
+
+    on_batch, se informado, recebe o dicionário de cada lote assim que ele é gravado.
+    """
+    rejected = []
+    batches = []
+    totals = {'rows_read': 0, 'rows_written': 0, 'rows_rejected': 0}
+    started = time.perf_counter()
+
+    def flush(batch):
+        batch_started = time.perf_counter()
+        written, batch_rejected = _import_batch(batch)
+        rejected_count = len(batch_rejected)
+        # Guarda só as primeiras rejeições para o relatório não crescer sem limite
+        rejected.extend(batch_rejected[:MAX_REPORTED_REJECTIONS - len(rejected)])
+        seconds = time.perf_counter() - batch_started
+        info = {
+            'batch': len(batches) + 1,
+            'rows': len(batch),
+            'written': written,
+            'rejected': rejected_count,
+            'seconds': round(seconds, 4),
+            'rows_per_second': round(len(batch) / seconds, 1) if seconds else None,
+        }
+        batches.append(info)
+        totals['rows_written'] += written
+        totals['rows_rejected'] += rejected_count
+        if on_batch is not None:
+            on_batch(info)
+
+    batch = []
+    for item in iter_raw_rows(stream, fmt):
+        batch.append(item)
+        totals['rows_read'] += 1
+        if len(batch) >= batch_size:
+            flush(batch)
+            batch = []
+    if batch:
+        flush(batch)
+
+    seconds = time.perf_counter() - started
+    return {
+        **totals,
+        'seconds': round(seconds, 4),
+        'rows_per_second': round(totals['rows_read'] / seconds, 1) if seconds else None,
+        'batches': batches,
+        'rejected': rejected,
+        'rejected_truncated': totals['rows_rejected'] > len(rejected),
+    }
@@ -0,0 +1,404 @@
+# backend/cost_snapshot.py
+# Snapshot colunar dos custos (Arrow em disco) para consultas analíticas sem o banco
+#
+# Os custos, já com channel/type do passo e user_id da jornada, ficam em arquivos
+# Arrow IPC particionados pelo mês de occoured_at (UTC), no layout Hive
+# occoured_month=YYYY-MM/part-0.arrow. O formato é o IPC e não Parquet porque o
+# arquivo é lido por memory map, sem cópia nem descompressão: uma consulta só toca
+# as colunas e os meses que usa, e as agregações (filtro, group by, soma) rodam
+# vetorizadas no pyarrow.compute. channel, step_type e cost_type são dicionários.
+#
+# Atualização incremental: o manifest.json guarda a marca d'água (maior
+# coalesce(modificated_at, created_at) já exportado). Cada refresh busca só os
+# custos alterados depois dela (menos COST_SNAPSHOT_OVERLAP_SECONDS, para não
+# perder transações que fizeram commit fora de ordem) e os custos de passos ou
+# jornadas alterados (mudança de channel/type/dono), e reescreve apenas os meses
+# afetados, trocando as linhas pelo id. Custos apagados saem na reconciliação,
+# que compara os ids do snapshot com os do banco. Arquivos e manifest são gravados
+# em um .tmp e trocados com os.replace: leitores nunca veem um arquivo pela metade.
+
+import datetime
+import json
+import os
+import shutil
+import time
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - Windows: sem trava entre processos
+    fcntl = None
+
+from sqlalchemy import func, or_, select, union
+
+from .extensions import db
+from .models import Cost, Journey, Step
+
+# pyarrow (dependência opcional, pip install pyarrow) é importado no primeiro uso,
+# como o numpy em pacing.py
+pa = pc = ipc = None
+
+SNAPSHOT_FORMAT_VERSION = 1
+MANIFEST_FILE = 'manifest.json'
+LOCK_FILE = '.refresh.lock'
+PARTITION_KEY = 'occoured_month'
+PARTITION_FILE = 'part-0.arrow'
+DEFAULT_BATCH_SIZE = 50000
+DEFAULT_OVERLAP_SECONDS = 300
+SNAPSHOT_GROUP_BY = ('month', 'channel', 'step_type', 'cost_type', 'user_id', 'journey_id', 'step_id')
+SNAPSHOT_FILTERS = ('channel', 'step_type', 'cost_type', 'user_id', 'journey_id', 'step_id')
+
+
+class CostSnapshotError(RuntimeError):
+    """Snapshot indisponível no momento (ainda não gerado ou em atualização)."""
+
+
+class CostSnapshotUnavailable(CostSnapshotError):
+    """Snapshot pedido sem o pyarrow instalado."""
+
+
+class CostSnapshotBusy(CostSnapshotError):
+    """Outro processo já está atualizando o snapshot."""
+
+
+def _require_pyarrow():
+    global pa, pc, ipc
+    if pa is None:
+        try:
+            import pyarrow
+            import pyarrow.compute
+            import pyarrow.ipc
+        except ImportError:
+            raise CostSnapshotUnavailable('O snapshot de custos requer o pacote pyarrow instalado') from None
+        pa, pc, ipc = pyarrow, pyarrow.compute, pyarrow.ipc
+    return pa
+
+
+def _schema():
+    labels = pa.dictionary(pa.int32(), pa.string())
+    return pa.schema([
+        ('id', pa.int64()), ('journey_id', pa.int64()), ('user_id', pa.int64()), ('step_id', pa.int64()),
+        ('channel', labels), ('step_type', labels), ('cost_type', labels),
+        ('value', pa.decimal128(12, 2)), ('occoured_at', pa.timestamp('us', tz='UTC')),
+        ('period_start', pa.date32()), ('period_end', pa.date32()),
+    ])
+
+
+def _version(model):
+    """Versão de uma linha: modificated_at, ou created_at se nunca foi alterada."""
+    return func.coalesce(model.modificated_at, model.created_at)
+
+
+def _changed_costs(since):
+    """Custos a (re)exportar: todos, ou os alterados depois de since (inclusive via passo/jornada)."""
+    stmt = (
+        select(Cost.id, Step.journey_id, Journey.user_id, Cost.step_id, Step.channel, Step.type, Cost.cost_type,
+               Cost.value, Cost.occoured_at, Cost.timePeriod_start, Cost.timePeriod_end,
+               _version(Cost).label('version'))
+        .join(Step, Step.id == Cost.step_id)
+        .join(Journey, Journey.id == Step.journey_id)
+    )
+    if since is not None:
+        changed_steps = select(Step.id).where(or_(
+            _version(Step) > since,
+            Step.journey_id.in_(select(Journey.id).where(_version(Journey) > since)),
+        ))
+        # UNION e não OR: cada ramo usa o seu índice (ix_costs_changed_at e ix_costs_step_id);
+        # com OR o PostgreSQL cai numa varredura completa de costs
+        stmt = stmt.where(Cost.id.in_(union(
+            select(Cost.id).where(_version(Cost) > since),
+            select(Cost.id).where(Cost.step_id.in_(changed_steps)),
+        )))
+    return stmt
+
+
+def _batch_table(rows, schema):
+    # Datetimes sem fuso (SQLite) são lidos pelo pyarrow como UTC, que é como foram gravados
+    arrays = []
+    for field, values in zip(schema, zip(*rows)):
+        if pa.types.is_dictionary(field.type):
+            arrays.append(pa.array(values, pa.string()).dictionary_encode().cast(field.type))
+        else:
+            arrays.append(pa.array(values, field.type))
+    return pa.Table.from_arrays(arrays, schema=schema)
+
+
+def _fetch_changes(since, batch_size):
+    """Custos alterados agrupados por mês: ({mês: Table}, ids alterados, maior versão, linhas)."""
+    schema = _schema().append(pa.field('version', pa.timestamp('us', tz='UTC')))
+    by_month, ids, versions, fetched = {}, [], [], 0
+    # Core, sem o ORM: as linhas vão direto para colunas Arrow
+    result = db.session.connection().execute(_changed_costs(since).execution_options(yield_per=batch_size))
+    for rows in result.partitions():
+        table = _batch_table(rows, schema)
+        versions.append(pc.max(table['version']))
+        table = table.drop_columns(['version'])
+        fetched += table.num_rows
+        ids.append(table['id'])
+        months = pc.strftime(table['occoured_at'], format='%Y-%m')
+        for month in pc.unique(months).to_pylist():
+            by_month.setdefault(month, []).append(table.filter(pc.equal(months, month)))
+    changed = {month: pa.concat_tables(tables) for month, tables in by_month.items()}
+    high_water_mark = max((v.as_py() for v in versions if v.is_valid), default=None)
+    return changed, pa.chunked_array(ids, pa.int64()).combine_chunks(), high_water_mark, fetched
+
+
+def _live_ids(batch_size):
+    ids = db.session.connection().scalars(select(Cost.id).execution_options(yield_per=batch_size))
+    return pa.chunked_array([pa.array(chunk, pa.int64()) for chunk in ids.partitions()], pa.int64()).combine_chunks()
+
+
+# --- Arquivos ---
+def _partition_path(directory, month):
+    return os.path.join(directory, f'{PARTITION_KEY}={month}', PARTITION_FILE)
+
+
+def _read_partition(directory, month):
+    """Partição por memory map: os buffers das colunas apontam direto para o arquivo."""
+    with pa.memory_map(_partition_path(directory, month), 'r') as source:
+        return ipc.open_file(source).read_all()
+
+
+def _write_partition(directory, month, table):
+    path = _partition_path(directory, month)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    # O formato de arquivo IPC exige um único dicionário por coluna
+    table = table.unify_dictionaries().combine_chunks()
+    with pa.OSFile(f'{path}.tmp', 'wb') as sink, ipc.new_file(sink, table.schema) as writer:
+        writer.write_table(table)
+    os.replace(f'{path}.tmp', path)
+
+
+def _remove_partition(directory, month):
+    shutil.rmtree(os.path.dirname(_partition_path(directory, month)), ignore_errors=True)
+
+
+def read_manifest(directory):
+    """Manifest do snapshot (marca d'água, meses e linhas), ou None se ainda não foi gerado."""
+    try:
+        with open(os.path.join(directory, MANIFEST_FILE), encoding='utf-8') as fh:
+            return json.load(fh)
+    except FileNotFoundError:
+        return None
+
+
+def _write_manifest(directory, manifest):
+    path = os.path.join(directory, MANIFEST_FILE)
+    with open(f'{path}.tmp', 'w', encoding='utf-8') as fh:
+        json.dump(manifest, fh, indent=2, sort_keys=True)
+    os.replace(f'{path}.tmp', path)
+
+
+@contextmanager
+def _refresh_lock(directory):
+    if fcntl is None:
+        yield
+        return
+    with open(os.path.join(directory, LOCK_FILE), 'w') as fh:
+        try:
+            fcntl.flock(fh, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            raise CostSnapshotBusy('Outra atualização do snapshot de custos está em andamento') from None
+        try:
+            yield
+        finally:
+            fcntl.flock(fh, fcntl.LOCK_UN)
+
+
+# --- Atualização ---
+def refresh_cost_snapshot(directory, full=False, reconcile=True, overlap_seconds=DEFAULT_OVERLAP_SECONDS,
+                          batch_size=DEFAULT_BATCH_SIZE, echo=None):
+    """Atualiza o snapshot em directory e devolve um resumo.
+
+    full reexporta tudo (também quando não há snapshot ou o formato mudou);
+    reconcile=False pula a varredura dos ids que remove custos apagados.
+    """
+    _require_pyarrow()
+    os.makedirs(directory, exist_ok=True)
+    with _refresh_lock(directory):
+        started = time.perf_counter()
+        manifest = read_manifest(directory)
+        if manifest is None or manifest.get('format_version') != SNAPSHOT_FORMAT_VERSION:
+            full = True
+        previous_mark = None if full or not manifest.get('high_water_mark') \
+            else datetime.datetime.fromisoformat(manifest['high_water_mark'])
+        since = previous_mark - datetime.timedelta(seconds=overlap_seconds) if previous_mark else None
+
+        changed, changed_ids, high_water_mark, fetched = _fetch_changes(since, batch_size)
+        if echo:
+            echo(f'{fetched} custos alterados desde {since.isoformat() if since else "o início"} '
+                 f'em {len(changed)} meses')
+        live_ids = _live_ids(batch_size) if reconcile and not full else None
+        db.session.rollback()  # Fecha a transação de leitura
+
+        partitions = {} if full else dict(manifest['partitions'])
+        existing = {month: _read_partition(directory, month) for month in partitions}
+        # Linhas que saem do snapshot: as reexportadas (podem ter mudado de mês) e as que sumiram do banco
+        removed_ids, deleted = changed_ids, 0
+        if live_ids is not None and existing:
+            snapshot_ids = pa.chunked_array([table['id'] for table in existing.values()], pa.int64())
+            gone = snapshot_ids.filter(pc.invert(pc.is_in(snapshot_ids, value_set=live_ids))).combine_chunks()
+            deleted = len(gone)
+            removed_ids = pa.concat_arrays([changed_ids, gone])
+        rewritten = []
+        for month in sorted(set(partitions) | set(changed)):
+            incoming, current = changed.get(month), existing.get(month)
+            if current is not None:
+                drop = pc.is_in(current['id'], value_set=removed_ids)
+                if incoming is None and not pc.any(drop).as_py():
+                    continue  # Mês intacto: o arquivo fica como está
+                current = current.filter(pc.invert(drop))
+            pieces = [table for table in (current, incoming) if table is not None and table.num_rows]
+            if not pieces:
+                _remove_partition(directory, month)
+                partitions.pop(month, None)
+                continue
+            table = pa.concat_tables(pieces)
+            _write_partition(directory, month, table)
+            partitions[month] = table.num_rows
+            rewritten.append(month)
+        if full:
+            # Meses que existiam num snapshot anterior e não têm mais custos
+            for name in os.listdir(directory):
+                if name.startswith(f'{PARTITION_KEY}=') and name.split('=', 1)[1] not in partitions:
+                    shutil.rmtree(os.path.join(directory, name), ignore_errors=True)
+
+        if previous_mark and (high_water_mark is None or high_water_mark < previous_mark):
+            high_water_mark = previous_mark
+        now = datetime.datetime.now(datetime.timezone.utc).isoformat(timespec='seconds')
+        manifest = {
+            'format_version': SNAPSHOT_FORMAT_VERSION,
+            'high_water_mark': high_water_mark.isoformat() if high_water_mark else None,
+            'refreshed_at': now,
+            'full_refreshed_at': now if full else manifest.get('full_refreshed_at'),
+            'reconciled_at': now if full or live_ids is not None else manifest.get('reconciled_at'),
+            'rows': sum(partitions.values()),
+            'partitions': dict(sorted(partitions.items())),
+        }
+        _write_manifest(directory, manifest)
+    return {'full': full, 'fetched': fetched, 'deleted': deleted, 'rows': manifest['rows'],
+            'partitions': len(partitions), 'rewritten': rewritten,
+            'high_water_mark': manifest['high_water_mark'],
+            'seconds': round(time.perf_counter() - started, 3)}
+
+
+# --- Consultas ---
+def snapshot_status(directory):
+    """Resumo do manifest para a API, ou None se ainda não há snapshot."""
+    manifest = read_manifest(directory)
+    if manifest is None:
+        return None
+    partitions = manifest.get('partitions') or {}
+    return {'directory': directory, 'high_water_mark': manifest.get('high_water_mark'),
+            'refreshed_at': manifest.get('refreshed_at'), 'full_refreshed_at': manifest.get('full_refreshed_at'),
+            'reconciled_at': manifest.get('reconciled_at'), 'rows': manifest.get('rows'),
+            'months': len(partitions), 'month_from': min(partitions, default=None),
+            'month_to': max(partitions, default=None)}
+
+
+def _month(value, name):
+    try:
+        return datetime.datetime.strptime(value, '%Y-%m').strftime('%Y-%m') if value else None
+    except ValueError:
+        raise ValueError(f'{name} deve estar no formato YYYY-MM') from None
+
+
+def query_cost_snapshot(directory, group_by=('month',), month_from=None, month_to=None, **filters):
+    """Soma e contagem de custos agrupadas por group_by, lidas só do snapshot.
+
+    group_by: subconjunto de SNAPSHOT_GROUP_BY; filtros por igualdade em
+    SNAPSHOT_FILTERS. Meses fora de month_from..month_to (YYYY-MM) nem são abertos.
+    Cada mês é agregado separadamente e os parciais são somados no fim.
+    """
+    group_by = list(group_by)
+    invalid = [key for key in group_by if key not in SNAPSHOT_GROUP_BY]
+    if invalid or len(set(group_by)) != len(group_by):
+        raise ValueError(f"Agrupamento inválido: {', '.join(invalid) or 'colunas repetidas'} "
+                         f"(disponíveis: {', '.join(SNAPSHOT_GROUP_BY)})")
+    unknown = [key for key in filters if key not in SNAPSHOT_FILTERS]
+    if unknown:
+        raise ValueError(f"Filtro inválido: {', '.join(unknown)}")
+    month_from, month_to = _month(month_from, 'from'), _month(month_to, 'to')
+    _require_pyarrow()
+    manifest = read_manifest(directory)
+    if manifest is None:
+        raise CostSnapshotError("Snapshot de custos ainda não gerado (flask refresh-cost-snapshot)")
+
+    started = time.perf_counter()
+    months = [month for month in sorted(manifest['partitions'])
+              if (month_from is None or month >= month_from) and (month_to is None or month <= month_to)]
+    keys = [key for key in group_by if key != 'month']
+    partials = []
+    for month in months:
+        table = _read_partition(directory, month)
+        mask = None
+        for name, value in filters.items():
+            if value is not None:
+                condition = pc.equal(table[name], value)
+                mask = condition if mask is None else pc.and_(mask, condition)
+        if mask is not None:
+            table = table.filter(mask)
+        if not table.num_rows:
+            continue
+        if keys:
+            partial = table.group_by(keys).aggregate([('value', 'sum'), ('value', 'count')])
+        else:
+            partial = pa.table({'value_sum': [pc.sum(table['value']).as_py()], 'value_count': [table.num_rows]},
+                               schema=pa.schema([('value_sum', pa.decimal128(38, 2)), ('value_count', pa.int64())]))
+        for key in keys:
+            # Dicionários diferentes por arquivo: os parciais são combinados como texto
+            if pa.types.is_dictionary(partial.schema.field(key).type):
+                partial = partial.set_column(partial.schema.get_field_index(key), key,
+                                             partial[key].cast(pa.string()))
+        if 'month' in group_by:
+            partial = partial.append_column('month', pa.array([month] * partial.num_rows, pa.string()))
+        partials.append(partial)
+
+    rows = []
+    if partials:
+        combined = pa.concat_tables(partials)
+        if 'month' not in group_by and len(partials) > 1:
+            if keys:
+                combined = combined.group_by(keys).aggregate([('value_sum', 'sum'), ('value_count', 'sum')])
+                combined = combined.rename_columns([*keys, 'value_sum', 'value_count'])
+            else:
+                combined = pa.table({'value_sum': [pc.sum(combined['value_sum']).as_py()],
+                                     'value_count': [pc.sum(combined['value_count']).as_py()]})
+        if group_by:
+            combined = combined.sort_by([(key, 'ascending') for key in group_by])
+        for row in combined.to_pylist():
+            rows.append({**{key: row[key] for key in group_by},
+                         'spent': float(row['value_sum']), 'costs': row['value_count']})
+    return {
+        'group_by': group_by,
+        'rows': rows,
+        'total': round(sum(row['spent'] for row in rows), 2),
+        'costs': sum(row['costs'] for row in rows),
+        'months_scanned': len(months),
+        'high_water_mark': manifest.get('high_water_mark'),
+        'refreshed_at': manifest.get('refreshed_at'),
+        'query_ms': round((time.perf_counter() - started) * 1000, 3),
+    }
+
+
+def query_costs_sql(group_by=('month',), **filters):
+    """Mesma agregação de query_cost_snapshot feita no banco (referência do bench-cost-snapshot)."""
+    if db.session.get_bind().dialect.name == 'postgresql':
+        month = func.to_char(func.timezone('UTC', Cost.occoured_at), 'YYYY-MM')
+    else:
+        month = func.strftime('%Y-%m', Cost.occoured_at)
+    columns = {'month': month, 'channel': Step.channel, 'step_type': Step.type, 'cost_type': Cost.cost_type,
+               'user_id': Journey.user_id, 'journey_id': Step.journey_id, 'step_id': Cost.step_id}
+    keys = [columns[key].label(key) for key in group_by]
+    stmt = (
+        select(*keys, func.sum(Cost.value).label('spent'), func.count().label('costs'))
+        .join(Step, Step.id == Cost.step_id)
+        .join(Journey, Journey.id == Step.journey_id)
+        .group_by(*keys)
+        .order_by(*keys)
+    )
+    for name, value in filters.items():
+        if value is not None:
+            stmt = stmt.where(columns[name] == value)
+    return [{**{key: row[key] for key in group_by}, 'spent': float(row.spent or 0), 'costs': row.costs}
+            for row in db.session.execute(stmt).mappings()]
@@ -0,0 +1,113 @@
+# backend/export.py
+# Exportação em streaming da árvore Journey -> Step -> Cost (NDJSON ou CSV)
+
+import csv
+import datetime
+import decimal
+import io
+
+from sqlalchemy import select
+
+from . import serialization
+from .extensions import db
+from .models import Journey, Step, Cost
+
+EXPORT_FORMATS = ('ndjson', 'csv')
+EXPORT_MIMETYPES = {'ndjson': 'application/x-ndjson', 'csv': 'text/csv'}
+EXPORT_BATCH_SIZE = 2000
+
+# Colunas da linha "achatada" (uma linha por custo; passos sem custo saem com os campos de custo vazios)
+EXPORT_COLUMNS = (
+    ('journey_id', Journey.id),
+    ('journey_name', Journey.name),
+    ('journey_status', Journey.status),
+    ('user_id', Journey.user_id),
+    ('step_id', Step.id),
+    ('step_name', Step.name),
+    ('step_type', Step.type),
+    ('channel', Step.channel),
+    ('budget', Step.budget),
+    ('step_status', Step.status),
+    ('date_start', Step.date_start),
+    ('date_end', Step.date_end),
+    ('cost_id', Cost.id),
+    ('cost_description', Cost.description),
+    ('cost_value', Cost.value),
+    ('cost_type', Cost.cost_type),
+    ('occoured_at', Cost.occoured_at),
+    ('timePeriod_start', Cost.timePeriod_start),
+    ('timePeriod_end', Cost.timePeriod_end),
+)
+EXPORT_FIELDNAMES = [name for name, _ in EXPORT_COLUMNS]
+
+
+def _to_primitive(value):
+    """Converte Decimal/datetime/date para texto no CSV."""
+    if isinstance(value, decimal.Decimal):
+        return str(value)
+    if isinstance(value, (datetime.datetime, datetime.date)):
+        return value.isoformat()
+    return value
+
+
+def _decimal_as_text(value):
+    """Na exportação, Decimal sai como texto para não perder precisão; datas ficam com o serializador."""
+    if isinstance(value, decimal.Decimal):
+        return str(value)
+    return serialization.default(value)
+
+
+def build_export_query(journey_id=None, user_id=None):
+    """Monta o SELECT achatado, ordenado para que cada jornada saia contígua."""
+    query = (
+        select(*[column.label(name) for name, column in EXPORT_COLUMNS])
+        .select_from(Journey)
+        .outerjoin(Step, Step.journey_id == Journey.id)
+        .outerjoin(Cost, Cost.step_id == Step.id)
+        .order_by(Journey.id, Step.id, Cost.id)
+    )
+    if journey_id is not None:
+        query = query.where(Journey.id == journey_id)
+    if user_id is not None:
+        query = query.where(Journey.user_id == user_id)
+    return query
+
+
+def iter_export_rows(journey_id=None, user_id=None, batch_size=EXPORT_BATCH_SIZE):
+    """Itera as linhas usando cursor do lado do servidor (yield_per), em memória constante."""
+    query = build_export_query(journey_id, user_id).execution_options(
+        stream_results=True, yield_per=batch_size
+    )
+    result = db.session.execute(query)
+    try:
+        for row in result:
+            yield dict(row._mapping)
+    finally:
+        result.close()
+
+
+def iter_ndjson(rows):
+    """Gera uma linha JSON por registro."""
+    for row in rows:
+        yield serialization.dumps(row, default=_decimal_as_text).decode('utf-8') + '\n'
+
+
+def iter_csv(rows):
+    """Gera o cabeçalho e depois um bloco CSV por registro, reaproveitando o buffer."""
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=EXPORT_FIELDNAMES)
+    writer.writeheader()
+    yield buffer.getvalue()
+    for row in rows:
+        buffer.seek(0)
+        buffer.truncate()
+        writer.writerow({name: _to_primitive(value) for name, value in row.items()})
+        yield buffer.getvalue()
+
+
+def iter_export(fmt, journey_id=None, user_id=None, batch_size=EXPORT_BATCH_SIZE):
+    """Ponto de entrada único: devolve um gerador de trechos de texto no formato pedido."""
+    if fmt not in EXPORT_FORMATS:
+        raise ValueError(f"Formato de exportação inválido: {fmt!r}")
+    rows = iter_export_rows(journey_id, user_id, batch_size)
+    return iter_ndjson(rows) if fmt == 'ndjson' else iter_csv(rows)
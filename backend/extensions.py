@@ -1,14 +1,23 @@
 # backend/extensions.py
 
 from flask_sqlalchemy import SQLAlchemy
-from flask_migrate import Migrate
 from flask_restx import Api
 from flask_cors import CORS
+from .cache import ResponseCache
+from .pool import PoolMetrics
+from .metrics import RequestMetrics
+from .replicas import ReplicaRouter, RoutingSession
+from .journey_events import JourneyEventBroker
 
 # Defina as instâncias aqui, sem associá-las à 'app' ainda
-db = SQLAlchemy()
-migrate = Migrate()
+db = SQLAlchemy(session_options={'class_': RoutingSession}) # Sessão que lê das réplicas nos GETs
+# Migrate: criado em create_app (o import do Flask-Migrate/Alembic custa ~150 ms; ver FAST_STARTUP)
 cors = CORS() # Definimos CORS aqui também para consistência
+response_cache = ResponseCache() # Cache de respostas (configurado via CACHE_* na factory)
+pool_metrics = PoolMetrics() # Métricas do pool de conexões do SQLAlchemy
+request_metrics = RequestMetrics() # Latência por rota, SQL por requisição e /metrics
+replica_router = ReplicaRouter() # Réplicas de leitura (DATABASE_REPLICA_URLS) para os GETs da API
+journey_events = JourneyEventBroker() # Deltas das jornadas via SSE (memória ou LISTEN/NOTIFY)
 rest_api = Api(
     version='1.0',
     title='MidasPipe API',
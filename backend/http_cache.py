@@ -0,0 +1,141 @@
+# backend/http_cache.py
+# Validadores HTTP (ETag / Last-Modified), respostas 304 e compressão gzip/brotli
+#
+# Duas camadas:
+# - @conditional(validator) em um método de Resource: o validador calcula a
+#   versão do recurso com uma consulta barata ao banco e, se o cliente já
+#   tem essa versão, responde 304 sem executar o handler nem serializar nada.
+# - init_app(app): after_request para todos os namespaces; gera ETag fraco a
+#   partir do corpo para GETs JSON que não passaram por @conditional, responde
+#   304 quando possível e comprime respostas grandes conforme Accept-Encoding.
+
+import datetime
+import functools
+import gzip
+import hashlib
+
+from flask import Response, request
+from werkzeug.datastructures import ETags
+from werkzeug.http import http_date
+
+try:  # Dependência opcional: sem ela, só gzip é oferecido
+    import brotli
+except ImportError:  # pragma: no cover - depende do ambiente
+    brotli = None
+
+COMPRESSIBLE_MIMETYPES = ('application/json', 'application/x-ndjson', 'text/csv', 'text/html', 'text/plain')
+
+
+def make_etag(*parts):
+    """ETag (sem aspas) a partir das partes que identificam a versão do recurso."""
+    return hashlib.sha1('|'.join(str(p) for p in parts).encode()).hexdigest()[:20]
+
+
+def _not_modified(etag, last_modified):
+    """True se os cabeçalhos condicionais do cliente já cobrem esta versão."""
+    if request.if_none_match:
+        return etag is not None and request.if_none_match.contains_weak(etag)
+    if last_modified is not None and request.if_modified_since is not None:
+        return _as_utc(last_modified).replace(microsecond=0) <= request.if_modified_since
+    return False
+
+
+def _validator_headers(etag, last_modified):
+    headers = {}
+    if etag is not None:
+        headers['ETag'] = ETags(weak_etags=[etag]).to_header()
+    if last_modified is not None:
+        headers['Last-Modified'] = _http_date(last_modified)
+    return headers
+
+
+def _as_utc(value):
+    """Datas sem fuso (ex.: SQLite) são tratadas como UTC."""
+    return value.replace(tzinfo=datetime.timezone.utc) if value.tzinfo is None else value
+
+
+def _http_date(value):
+    return http_date(_as_utc(value))
+
+
+def conditional(validator):
+    """Decorador para GETs de Resource: 304 antes de executar o handler.
+
+    validator(*args, **kwargs) recebe os mesmos argumentos do método e retorna
+    (etag, last_modified) ou None quando não há como validar (ex.: recurso
+    inexistente, deixando o handler responder 404). A query string entra no
+    ETag, pois parâmetros diferentes geram representações diferentes.
+    """
+    def decorator(method):
+        @functools.wraps(method)
+        def wrapper(*args, **kwargs):
+            validators = validator(*args[1:], **kwargs)
+            if validators is None:
+                return method(*args, **kwargs)
+            etag, last_modified = validators
+            etag = make_etag(etag, request.query_string.decode())
+            headers = _validator_headers(etag, last_modified)
+            if _not_modified(etag, last_modified):
+                return Response(status=304, headers=headers)
+
+            result = method(*args, **kwargs)
+            if isinstance(result, Response):
+                result.headers.extend(headers)
+                return result
+            if isinstance(result, tuple):
+                data, code, *rest = result + (None,) * (3 - len(result))
+                return data, code, {**(rest[0] or {}), **headers}
+            return result, 200, headers
+        return wrapper
+    return decorator
+
+
+def _choose_encoding(accept_encoding):
+    if brotli is not None and accept_encoding['br']:
+        return 'br'
+    if accept_encoding['gzip']:
+        return 'gzip'
+    return None
+
+
+def init_app(app):
+    """Registra ETag genérico, 304 e compressão para todas as rotas da app.
+
+    Configuração: COMPRESS_MIN_SIZE (bytes, padrão 1024), COMPRESS_LEVEL (gzip,
+    padrão 6), COMPRESS_BROTLI_QUALITY (padrão 5), HTTP_ETAGS (padrão True).
+    """
+    app.config.setdefault('COMPRESS_MIN_SIZE', 1024)
+    app.config.setdefault('COMPRESS_LEVEL', 6)
+    app.config.setdefault('COMPRESS_BROTLI_QUALITY', 5)
+    app.config.setdefault('HTTP_ETAGS', True)
+
+    @app.after_request
+    def _conditional_and_compress(response):
+        if response.direct_passthrough or response.is_streamed:
+            return response
+
+        if (app.config['HTTP_ETAGS'] and request.method in ('GET', 'HEAD')
+                and response.status_code == 200 and response.mimetype == 'application/json'
+                and 'ETag' not in response.headers):
+            response.set_etag(make_etag(response.get_data()), weak=True)
+            response.make_conditional(request)
+
+        if (response.status_code < 200 or response.status_code in (204, 304)
+                or 'Content-Encoding' in response.headers
+                or response.mimetype not in COMPRESSIBLE_MIMETYPES):
+            return response
+        response.vary.add('Accept-Encoding')
+        body = response.get_data()
+        if len(body) < app.config['COMPRESS_MIN_SIZE']:
+            return response
+        encoding = _choose_encoding(request.accept_encodings)
+        if encoding is None:
+            return response
+
+        if encoding == 'br':
+            compressed = brotli.compress(body, quality=app.config['COMPRESS_BROTLI_QUALITY'])
+        else:
+            compressed = gzip.compress(body, compresslevel=app.config['COMPRESS_LEVEL'])
+        response.set_data(compressed)
+        response.headers['Content-Encoding'] = encoding
+        return response
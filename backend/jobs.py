@@ -0,0 +1,490 @@
+# backend/jobs.py
+# Fila de jobs no próprio banco, para operações pesadas fora da requisição
+#
+# Importação de custos, exportação de jornadas, recálculo de rollups e retrato de
+# pacing podem levar minutos; a API enfileira um Job (tabela jobs) e responde 202,
+# e 'flask jobs-worker' executa. Sem broker externo:
+# - claim_job: SELECT ... FOR UPDATE SKIP LOCKED (PostgreSQL) + UPDATE condicional,
+#   então vários processos/threads de worker nunca pegam o mesmo job;
+# - heartbeat: o worker renova heartbeat_at enquanto o job roda; um job sem sinal
+#   por JOBS_LEASE_SECONDS (worker morto) volta para a fila (requeue_expired_jobs);
+# - falhas: nova tentativa com backoff exponencial (JOBS_BACKOFF_SECONDS * 2^n, com
+#   jitter) até max_attempts; JobError (pedido inválido) falha de vez;
+# - progresso: a operação informa contadores, gravados em outra conexão para ficarem
+#   visíveis em GET /api/jobs/<id> enquanto a transação da operação está aberta;
+# - saída: arquivos grandes (exportações) vão para JOBS_OUTPUT_DIR em disco, em
+#   pedaços, e o job guarda só o caminho; GET /api/jobs/<id>/output lê de lá.
+# No SQLite (desenvolvimento) não há SKIP LOCKED: o UPDATE condicional basta para um processo.
+
+import datetime
+import io
+import json
+import logging
+import os
+import random
+import signal
+import socket
+import threading
+import time
+
+from flask import current_app
+from sqlalchemy import select, update
+
+from .extensions import db
+from .models import Job
+
+logger = logging.getLogger(__name__)
+
+JOB_STATUSES = ('queued', 'running', 'succeeded', 'failed', 'cancelled')
+FINISHED_STATUSES = ('succeeded', 'failed', 'cancelled')
+BACKOFF_MAX_SECONDS = 3600
+PROGRESS_MIN_INTERVAL = 1.0  # Segundos entre gravações de progresso (a última sempre é gravada)
+
+# tipo -> (função(context) -> resultado, validate(payload) -> payload normalizado, exige arquivo de entrada)
+JOB_KINDS = {}
+
+
+class JobError(ValueError):
+    """Pedido de job inválido (mensagem para o cliente); no worker, falha sem nova tentativa."""
+
+
+def job_kind(name, validate=None, needs_input=False):
+    """Registra a função que executa um tipo de job."""
+    def register(run):
+        JOB_KINDS[name] = (run, validate, needs_input)
+        return run
+    return register
+
+
+def _utcnow():
+    return datetime.datetime.now(datetime.timezone.utc)
+
+
+def _json_safe(value):
+    # date/Decimal dos relatórios viram texto na coluna JSON
+    return json.loads(json.dumps(value, default=str))
+
+
+def enqueue_job(kind, payload=None, input_data=None, max_attempts=None):
+    """Valida e grava um job na fila (commit); retorna o Job."""
+    if kind not in JOB_KINDS:
+        raise JobError(f"Tipo de job desconhecido: {kind!r} (disponíveis: {', '.join(sorted(JOB_KINDS))})")
+    _run, validate, needs_input = JOB_KINDS[kind]
+    if needs_input and not input_data:
+        raise JobError(f'O job {kind} exige um arquivo de entrada no corpo da requisição')
+    payload = dict(payload or {})
+    if validate is not None:
+        payload = validate(payload)
+    max_input = current_app.config['JOBS_MAX_INPUT_BYTES']
+    if input_data is not None and len(input_data) > max_input:
+        raise JobError(f'Arquivo de entrada maior que o limite de {max_input} bytes (JOBS_MAX_INPUT_BYTES)')
+    job = Job(kind=kind, status='queued', payload=_json_safe(payload), input_data=input_data,
+              max_attempts=max(1, max_attempts or current_app.config['JOBS_MAX_ATTEMPTS']),
+              attempts=0, run_at=_utcnow())
+    db.session.add(job)
+    db.session.commit()
+    return job
+
+
+def cancel_job(job_id):
+    """Cancela um job ainda na fila; retorna False se ele já começou ou terminou."""
+    cancelled = db.session.execute(
+        update(Job).where(Job.id == job_id, Job.status == 'queued')
+        .values(status='cancelled', finished_at=_utcnow())
+    ).rowcount
+    db.session.commit()
+    return bool(cancelled)
+
+
+def job_summary(job):
+    """Estado do job para a API (sem os arquivos de entrada/saída)."""
+    return {
+        'id': job.id,
+        'kind': job.kind,
+        'status': job.status,
+        'payload': job.payload,
+        'progress': job.progress,
+        'result': job.result,
+        'error': job.error,
+        'attempts': job.attempts,
+        'max_attempts': job.max_attempts,
+        'has_output': job.output_mimetype is not None,
+        'run_at': job.run_at,
+        'created_at': job.created_at,
+        'started_at': job.started_at,
+        'finished_at': job.finished_at,
+    }
+
+
+def list_jobs(status=None, kind=None, limit=50):
+    query = select(Job).order_by(Job.id.desc()).limit(limit)
+    if status:
+        query = query.where(Job.status == status)
+    if kind:
+        query = query.where(Job.kind == kind)
+    return [job_summary(job) for job in db.session.scalars(query)]
+
+
+# --- Worker ---
+def requeue_expired_jobs(lease_seconds):
+    """Jobs 'running' sem heartbeat há mais de lease_seconds: voltam para a fila ou falham."""
+    now = _utcnow()
+    expired = (Job.status == 'running', Job.heartbeat_at < now - datetime.timedelta(seconds=lease_seconds))
+    message = f'Worker sem heartbeat por mais de {lease_seconds}s'
+    requeued = db.session.execute(
+        update(Job).where(*expired, Job.attempts < Job.max_attempts)
+        .values(status='queued', locked_by=None, run_at=now, error=message)
+    ).rowcount
+    failed = db.session.execute(
+        update(Job).where(*expired).values(status='failed', locked_by=None, finished_at=now, error=message)
+    ).rowcount
+    db.session.commit()
+    return requeued + failed
+
+
+def claim_job(worker_id, kinds=None):
+    """Pega o próximo job pronto da fila (status running, attempts + 1); None se não houver."""
+    now = _utcnow()
+    query = (select(Job.id).where(Job.status == 'queued', Job.run_at <= now)
+             .order_by(Job.run_at, Job.id).limit(1).with_for_update(skip_locked=True))
+    if kinds:
+        query = query.where(Job.kind.in_(kinds))
+    job_id = db.session.scalars(query).first()
+    if job_id is None:
+        db.session.rollback()
+        return None
+    claimed = db.session.execute(
+        update(Job).where(Job.id == job_id, Job.status == 'queued')
+        .values(status='running', attempts=Job.attempts + 1, locked_by=worker_id,
+                started_at=now, heartbeat_at=now, progress=None)
+    ).rowcount
+    db.session.commit()
+    return db.session.get(Job, job_id) if claimed else None
+
+
+class JobContext:
+    """O que a função de um job recebe: payload, arquivo de entrada, progresso e saída."""
+
+    def __init__(self, job, worker_id, engine):
+        self.job_id = job.id
+        self.kind = job.kind
+        self.payload = job.payload or {}
+        self.attempt = job.attempts
+        self._job = job
+        self._worker_id = worker_id
+        self._engine = engine
+        self._last_progress = 0.0
+        self.output = None  # Colunas output_* do Job
+
+    @property
+    def input_data(self):
+        return self._job.input_data
+
+    def progress(self, force=False, **fields):
+        """Grava o progresso (limitado a um por PROGRESS_MIN_INTERVAL, salvo com force)."""
+        now = time.monotonic()
+        if not force and now - self._last_progress < PROGRESS_MIN_INTERVAL:
+            return
+        self._last_progress = now
+        _touch(self._engine, self.job_id, self._worker_id, progress=_json_safe(fields))
+
+    def set_output(self, data, mimetype, filename):
+        self.output = {'output_data': data, 'output_path': None,
+                       'output_mimetype': mimetype, 'output_filename': filename}
+
+    def set_output_file(self, path, mimetype, filename):
+        """Saída já gravada em disco; path é relativo a JOBS_OUTPUT_DIR."""
+        self.output = {'output_data': None, 'output_path': path,
+                       'output_mimetype': mimetype, 'output_filename': filename}
+
+
+def _touch(engine, job_id, worker_id, **values):
+    # Conexão própria: visível na API mesmo com a transação do job aberta
+    try:
+        with engine.begin() as connection:
+            connection.execute(
+                update(Job).where(Job.id == job_id, Job.locked_by == worker_id)
+                .values(heartbeat_at=_utcnow(), **values)
+            )
+    except Exception:
+        logger.warning('Não foi possível atualizar o job %s', job_id, exc_info=True)
+
+
+def _heartbeat(engine, job_id, worker_id, interval, stop):
+    while not stop.wait(interval):
+        _touch(engine, job_id, worker_id)
+
+
+def _backoff_seconds(attempt, base):
+    return min(BACKOFF_MAX_SECONDS, base * 2 ** (attempt - 1)) * random.uniform(0.8, 1.2)
+
+
+def run_job(job, worker_id):
+    """Executa um job já reservado por claim_job e grava o resultado ou agenda a nova tentativa."""
+    config = current_app.config
+    engine = db.engine
+    job_id, kind, attempts, max_attempts = job.id, job.kind, job.attempts, job.max_attempts
+    context = JobContext(job, worker_id, engine)
+    stop = threading.Event()
+    heartbeat = threading.Thread(target=_heartbeat, daemon=True,
+                                 args=(engine, job_id, worker_id, max(1, config['JOBS_LEASE_SECONDS'] / 3), stop))
+    heartbeat.start()
+    started = time.perf_counter()
+    try:
+        if kind not in JOB_KINDS:
+            raise JobError(f'Tipo de job desconhecido: {kind!r}')
+        result = JOB_KINDS[kind][0](context)
+    except Exception as e:
+        db.session.rollback()
+        now = _utcnow()
+        error = f'{type(e).__name__}: {e}'
+        if isinstance(e, JobError) or attempts >= max_attempts:
+            values = {'status': 'failed', 'finished_at': now}
+            logger.error('Job %s (%s) falhou: %s', job_id, kind, error, exc_info=not isinstance(e, JobError))
+        else:
+            delay = _backoff_seconds(attempts, config['JOBS_BACKOFF_SECONDS'])
+            values = {'status': 'queued', 'run_at': now + datetime.timedelta(seconds=delay)}
+            logger.warning('Job %s (%s) falhou na tentativa %s/%s; nova tentativa em %.0fs: %s',
+                           job_id, kind, attempts, max_attempts, delay, error)
+        values.update(error=error, locked_by=None)
+    else:
+        values = {'status': 'succeeded', 'finished_at': _utcnow(), 'locked_by': None, 'error': None,
+                  'result': _json_safe({**(result or {}), 'job_seconds': round(time.perf_counter() - started, 3)})}
+        if context.output is not None:
+            values.update(context.output)
+    finally:
+        stop.set()
+        heartbeat.join()
+    # locked_by: um job devolvido à fila por lease expirado não é sobrescrito por este worker
+    db.session.execute(update(Job).where(Job.id == job_id, Job.locked_by == worker_id).values(**values))
+    db.session.commit()
+    return values['status']
+
+
+def work(app, worker_id, stop, kinds=None, burst=False):
+    """Laço de um worker (uma thread): reserva e executa jobs até 'stop' (ou a fila esvaziar, com burst)."""
+    with app.app_context():
+        poll_interval = app.config['JOBS_POLL_INTERVAL']
+        lease_seconds = app.config['JOBS_LEASE_SECONDS']
+        last_requeue = 0.0
+        while not stop.is_set():
+            try:
+                if time.monotonic() - last_requeue > lease_seconds / 2:
+                    requeue_expired_jobs(lease_seconds)
+                    last_requeue = time.monotonic()
+                job = claim_job(worker_id, kinds)
+                if job is None:
+                    if burst:
+                        return
+                    stop.wait(poll_interval)
+                    continue
+                logger.info('Worker %s: job %s (%s), tentativa %s', worker_id, job.id, job.kind, job.attempts)
+                run_job(job, worker_id)
+            except Exception:
+                # Erro do próprio laço (ex.: banco fora do ar): espera e tenta de novo
+                db.session.rollback()
+                logger.exception('Worker %s: erro ao buscar jobs', worker_id)
+                stop.wait(poll_interval)
+            finally:
+                db.session.remove()
+
+
+def run_worker(app, threads=1, kinds=None, burst=False):
+    """Roda 'threads' workers neste processo até SIGINT/SIGTERM; o job em andamento termina antes de sair."""
+    stop = threading.Event()
+    if threading.current_thread() is threading.main_thread():
+        for signum in (signal.SIGINT, signal.SIGTERM):
+            signal.signal(signum, lambda *_args: stop.set())
+    base = f'{socket.gethostname()}:{os.getpid()}'
+    workers = [threading.Thread(target=work, args=(app, f'{base}:{index}', stop, kinds, burst), daemon=True)
+               for index in range(threads)]
+    for worker in workers:
+        worker.start()
+    while any(worker.is_alive() for worker in workers):
+        for worker in workers:
+            worker.join(0.5)
+    return len(workers)
+
+
+def _worker_process(threads, kinds, burst):
+    from . import create_app
+    run_worker(create_app(fast_startup=True), threads, kinds, burst)
+
+
+def run_worker_processes(processes, threads=1, kinds=None, burst=False):
+    """Sobe 'processes' processos de worker (spawn), cada um com 'threads' threads, e espera todos."""
+    import multiprocessing
+
+    spawn = multiprocessing.get_context('spawn')
+    children = [spawn.Process(target=_worker_process, args=(threads, kinds, burst)) for _ in range(processes)]
+    for child in children:
+        child.start()
+
+    def forward(signum, _frame):
+        for child in children:
+            if child.is_alive():
+                os.kill(child.pid, signum)
+
+    for signum in (signal.SIGINT, signal.SIGTERM):
+        signal.signal(signum, forward)
+    for child in children:
+        child.join()
+    return [child.exitcode for child in children]
+
+
+# --- Tipos de job ---
+def _validate_import(payload):
+    from .cost_import import IMPORT_BATCH_SIZE, IMPORT_FORMATS
+
+    if payload.get('format') not in IMPORT_FORMATS:
+        raise JobError(f"payload.format deve ser um de: {', '.join(IMPORT_FORMATS)}")
+    return {'format': payload['format'], 'batch_size': max(1, int(payload.get('batch_size') or IMPORT_BATCH_SIZE))}
+
+
+@job_kind('import_costs', validate=_validate_import, needs_input=True)
+def _import_costs_job(context):
+    from .cost_import import import_costs
+
+    stream = io.TextIOWrapper(io.BytesIO(context.input_data), encoding='utf-8-sig', newline='')
+    totals = {'rows_written': 0, 'rows_rejected': 0}
+
+    def report_batch(info):
+        totals['rows_written'] += info['written']
+        totals['rows_rejected'] += info['rejected']
+        context.progress(batches=info['batch'], **totals)
+
+    report = import_costs(stream, context.payload['format'], batch_size=context.payload['batch_size'],
+                          on_batch=report_batch)
+    context.progress(force=True, batches=len(report['batches']), **totals)
+    return report
+
+
+def _optional_id(payload, key):
+    value = payload.get(key)
+    if value is not None and (isinstance(value, bool) or not isinstance(value, int)):
+        raise JobError(f'payload.{key} deve ser um inteiro')
+    return value
+
+
+def _validate_export(payload):
+    from .export import EXPORT_FORMATS
+
+    fmt = payload.get('format', 'ndjson')
+    if fmt not in EXPORT_FORMATS:
+        raise JobError(f"payload.format deve ser um de: {', '.join(EXPORT_FORMATS)}")
+    return {'format': fmt, 'journey_id': _optional_id(payload, 'journey_id'), 'user_id': _optional_id(payload, 'user_id')}
+
+
+@job_kind('export_journeys', validate=_validate_export)
+def _export_journeys_job(context):
+    from .export import EXPORT_MIMETYPES, iter_export
+
+    payload = context.payload
+    scope = f"journey-{payload['journey_id']}" if payload['journey_id'] else 'journeys'
+    filename = f"{scope}.{payload['format']}"
+    output_dir = current_app.config['JOBS_OUTPUT_DIR']
+    os.makedirs(output_dir, exist_ok=True)
+    # Grava em pedaços num .part e só renomeia no fim: a memória não cresce com a exportação
+    path = f'job-{context.job_id}-{filename}'
+    partial = os.path.join(output_dir, f'{path}.part')
+    written = 0
+    try:
+        with open(partial, 'wb') as fh:
+            for chunk in iter_export(payload['format'], journey_id=payload['journey_id'], user_id=payload['user_id']):
+                data = chunk.encode('utf-8')
+                fh.write(data)
+                written += len(data)
+                context.progress(bytes=written)
+        os.replace(partial, os.path.join(output_dir, path))
+    except BaseException:
+        if os.path.exists(partial):
+            os.remove(partial)
+        raise
+    context.progress(force=True, bytes=written)
+    context.set_output_file(path, EXPORT_MIMETYPES[payload['format']], filename)
+    db.session.rollback()  # Fecha a transação de leitura do cursor
+    return {'bytes': written}
+
+
+def _validate_journey_scope(payload):
+    return {'journey_id': _optional_id(payload, 'journey_id')}
+
+
+@job_kind('rebuild_cost_rollups', validate=_validate_journey_scope)
+def _rebuild_cost_rollups_job(context):
+    from .rollups import rebuild_cost_rollups
+
+    rebuild_cost_rollups(db.session.connection(), journey_id=context.payload['journey_id'])
+    db.session.commit()
+    return {'journey_id': context.payload['journey_id']}
+
+
+def _validate_pacing(payload):
+    from .pacing import DEFAULT_TOLERANCE, DEFAULT_WINDOW_DAYS
+
+    try:
+        as_of = datetime.date.fromisoformat(payload['as_of']) if payload.get('as_of') else None
+        return {'as_of': as_of.isoformat() if as_of else None,
+                'window_days': int(payload.get('window_days') or DEFAULT_WINDOW_DAYS),
+                'tolerance': float(payload.get('tolerance', DEFAULT_TOLERANCE))}
+    except (TypeError, ValueError) as e:
+        raise JobError(f'payload de pacing inválido: {e}')
+
+
+@job_kind('pace_steps', validate=_validate_pacing)
+def _pace_steps_job(context):
+    from .pacing import PacingUnavailable, save_pacing_snapshot
+
+    payload = context.payload
+    as_of = datetime.date.fromisoformat(payload['as_of']) if payload['as_of'] else None
+    try:
+        return save_pacing_snapshot(as_of, window_days=payload['window_days'], tolerance=payload['tolerance'])
+    except PacingUnavailable as e:
+        raise JobError(str(e))  # Sem NumPy, tentar de novo não adianta
+
+
+def _validate_cost_snapshot(payload):
+    return {'full': bool(payload.get('full')), 'reconcile': bool(payload.get('reconcile', True))}
+
+
+@job_kind('refresh_cost_snapshot', validate=_validate_cost_snapshot)
+def _refresh_cost_snapshot_job(context):
+    from .cost_snapshot import CostSnapshotUnavailable, refresh_cost_snapshot
+
+    config = current_app.config
+    try:
+        # CostSnapshotBusy (outro refresh em andamento) volta para a fila com backoff
+        return refresh_cost_snapshot(config['COST_SNAPSHOT_DIR'], full=context.payload['full'],
+                                     reconcile=context.payload['reconcile'],
+                                     overlap_seconds=config['COST_SNAPSHOT_OVERLAP_SECONDS'])
+    except CostSnapshotUnavailable as e:
+        raise JobError(str(e))  # Sem pyarrow, tentar de novo não adianta
+
+
+def _validate_clone(payload):
+    from .journey_clone import JourneyCloneError, clone_options
+
+    template = bool(payload.get('template'))
+    try:
+        clone_options(payload, template=template)
+    except JourneyCloneError as e:
+        raise JobError(str(e))
+    cleaned = {key: payload.get(key) for key in ('name', 'user_id', 'shift_days', 'start_date', 'include_costs', 'status')
+               if payload.get(key) is not None}
+    source_id = _optional_id(payload, 'source_id')
+    if source_id is None:
+        raise JobError('payload.source_id é obrigatório')
+    return {'source_id': source_id, 'template': template, **cleaned}
+
+
+@job_kind('clone_journey', validate=_validate_clone)
+def _clone_journey_job(context):
+    from .journey_clone import JourneyCloneError, clone_journey, clone_options
+
+    payload = context.payload
+    try:
+        summary = clone_journey(payload['source_id'], **clone_options(payload, template=payload['template']))
+    except JourneyCloneError as e:
+        raise JobError(str(e))
+    db.session.commit()
+    return summary
@@ -0,0 +1,191 @@
+# backend/journey_clone.py
+# Cópia profunda de Jornadas (Journey -> Step -> Cost) e instanciação de modelos, em SQL
+#
+# Copiar pelo ORM (relationships com cascade) emite um INSERT por objeto. Aqui a
+# árvore inteira é copiada com INSERT ... SELECT, em um número constante de
+# statements, qualquer que seja o tamanho da jornada:
+#   1. jornada nova (INSERT ... SELECT ... RETURNING id);
+#   2. mapa old_id -> new_id dos passos em uma tabela temporária: no PostgreSQL
+#      os ids novos vêm da sequence (nextval), no SQLite de um deslocamento
+#      acima do maior id atual (um só escritor por vez);
+#   3. passos, custos, dependências (step_edges) e rollups copiados com JOIN no
+#      mapa, que troca as FKs no próprio banco; as datas são deslocadas em SQL.
+# Tudo na transação da sessão: ou a cópia inteira aparece, ou nada.
+
+import datetime
+
+from sqlalchemy import column, func, insert, literal, literal_column, select, table, text
+
+from .extensions import db
+from .journey_events import record_journey_created
+from .models import Cost, CostRollup, Journey, Step, StepEdge, User
+
+STEP_MAP = 'clone_step_map'
+# Colunas preenchidas pelo banco na cópia (id novo, carimbos de criação/alteração)
+SKIPPED_COLUMNS = ('id', 'created_at', 'modificated_at', 'version')
+
+_step_map = table(STEP_MAP, column('old_id'), column('new_id'))
+
+
+class JourneyCloneError(ValueError):
+    """Pedido de cópia inválido (mensagem para o cliente)."""
+
+
+def _copied_columns(model, *exclude):
+    return [c for c in model.__table__.c if c.name not in SKIPPED_COLUMNS + exclude]
+
+
+def _shift(col, days, dialect):
+    """Coluna deslocada em 'days' dias (DateTime ou Date), calculada no banco."""
+    if not days:
+        return col
+    is_date = not isinstance(col.type, db.DateTime)
+    if dialect == 'sqlite':
+        return (func.date if is_date else func.datetime)(col, f'{days:+d} days')
+    if is_date:
+        return col + literal(days)
+    return col + literal(datetime.timedelta(days=days), db.Interval)
+
+
+def _shift_for_start(journey_id, start_date):
+    """Dias entre o início do primeiro passo da jornada e start_date."""
+    first = db.session.execute(select(func.min(Step.date_start)).where(Step.journey_id == journey_id)).scalar()
+    if first is None:
+        return 0
+    if isinstance(first, str):  # SQLite devolve o texto cru em agregações
+        first = datetime.datetime.fromisoformat(first)
+    return (start_date - first.date()).days
+
+
+def clone_options(data, template=False):
+    """Valida o corpo de clone/instantiate e devolve os kwargs de clone_journey.
+
+    Instanciar um modelo exige start_date, volta os passos para 'Planned' e, por
+    padrão, não copia os custos (os do modelo são de outra execução).
+    """
+    data = data or {}
+    options = {'include_costs': data.get('include_costs', not template)}
+    if not isinstance(options['include_costs'], bool):
+        raise JourneyCloneError("'include_costs' deve ser true ou false")
+    for key in ('name', 'status'):
+        if data.get(key) is not None and (not isinstance(data[key], str) or not data[key].strip()):
+            raise JourneyCloneError(f"'{key}' deve ser um texto não vazio")
+    for key in ('user_id', 'shift_days'):
+        if data.get(key) is not None and (isinstance(data[key], bool) or not isinstance(data[key], int)):
+            raise JourneyCloneError(f"'{key}' deve ser um inteiro")
+    if data.get('start_date') is not None:
+        try:
+            options['start_date'] = datetime.date.fromisoformat(data['start_date'])
+        except (TypeError, ValueError):
+            raise JourneyCloneError("'start_date' deve ser uma data YYYY-MM-DD")
+    elif template:
+        raise JourneyCloneError("'start_date' é obrigatório ao instanciar um modelo")
+    options.update(name=data.get('name'), user_id=data.get('user_id'), shift_days=data.get('shift_days') or 0,
+                   journey_status=data.get('status') or ('Active' if template else None),
+                   step_status='Planned' if template else None)
+    return options
+
+
+def clone_journey(source_id, name=None, user_id=None, shift_days=0, start_date=None, include_costs=True,
+                  journey_status=None, step_status=None):
+    """Copia a jornada source_id com passos, dependências e (opcional) custos; devolve o resumo.
+
+    start_date alinha o primeiro passo a essa data (tem precedência sobre shift_days);
+    journey_status/step_status substituem os status copiados. Não faz commit.
+    """
+    session = db.session
+    dialect = session.get_bind().dialect.name
+    source = session.execute(
+        select(Journey.name, Journey.user_id).where(Journey.id == source_id)
+    ).first()
+    if source is None:
+        raise JourneyCloneError(f'Jornada {source_id} não encontrada')
+    # Dono inexistente viraria IntegrityError da FK no INSERT ... SELECT
+    if user_id and session.execute(select(User.id).where(User.id == user_id)).first() is None:
+        raise JourneyCloneError(f'Usuário {user_id} não encontrado')
+    if start_date is not None:
+        shift_days = _shift_for_start(source_id, start_date)
+    shift_days = int(shift_days or 0)
+
+    # 1. Jornada
+    journey_columns = _copied_columns(Journey)
+    overrides = {
+        'name': literal(name or f'{source.name} (cópia)'),
+        'user_id': literal(user_id or source.user_id),
+        'status': literal(journey_status) if journey_status else None,
+    }
+    new_journey_id = session.execute(
+        insert(Journey).from_select(
+            [c.name for c in journey_columns],
+            select(*[overrides.get(c.name) if overrides.get(c.name) is not None else c for c in journey_columns])
+            .where(Journey.id == source_id)
+        ).returning(Journey.id)
+    ).scalar_one()
+    record_journey_created(new_journey_id, session=session)
+
+    # 2. Mapa de ids dos passos
+    session.execute(text(f'DROP TABLE IF EXISTS {STEP_MAP}'))
+    session.execute(text(f'CREATE TEMPORARY TABLE {STEP_MAP} (old_id INTEGER PRIMARY KEY, new_id INTEGER NOT NULL)'))
+    if dialect == 'postgresql':
+        new_id = "nextval(pg_get_serial_sequence('steps', 'id'))"
+        source_ids = 'SELECT id FROM steps WHERE journey_id = :source_id ORDER BY id'
+        session.execute(text(f'INSERT INTO {STEP_MAP} (old_id, new_id) SELECT id, {new_id} FROM ({source_ids}) AS s'),
+                        {'source_id': source_id})
+    else:
+        session.execute(text(
+            f'INSERT INTO {STEP_MAP} (old_id, new_id) '
+            f'SELECT id, id + (SELECT max(id) FROM steps) - (SELECT min(id) FROM steps WHERE journey_id = :source_id) + 1 '
+            f'FROM steps WHERE journey_id = :source_id'
+        ), {'source_id': source_id})
+
+    # 3. Passos, custos, dependências e rollups
+    step_columns = _copied_columns(Step, 'journey_id')
+    step_values = {
+        'date_start': _shift(Step.date_start, shift_days, dialect),
+        'date_end': _shift(Step.date_end, shift_days, dialect),
+        'status': literal(step_status) if step_status else Step.status,
+    }
+    steps = session.execute(
+        insert(Step).from_select(
+            ['id', 'journey_id'] + [c.name for c in step_columns],
+            select(_step_map.c.new_id, literal(new_journey_id), *[step_values.get(c.name, c) for c in step_columns])
+            .select_from(Step).join(_step_map, _step_map.c.old_id == Step.id)
+        )
+    ).rowcount
+
+    edges = session.execute(
+        insert(StepEdge).from_select(
+            ['from_step_id', 'to_step_id', 'journey_id', 'lag_days'],
+            select(literal_column('from_map.new_id'), literal_column('to_map.new_id'), literal(new_journey_id),
+                   StepEdge.lag_days)
+            .select_from(StepEdge)
+            .join(_step_map.alias('from_map'), literal_column('from_map.old_id') == StepEdge.from_step_id)
+            .join(_step_map.alias('to_map'), literal_column('to_map.old_id') == StepEdge.to_step_id)
+        )
+    ).rowcount
+
+    costs = 0
+    if include_costs:
+        cost_columns = _copied_columns(Cost, 'step_id')
+        cost_values = {name: _shift(getattr(Cost, name), shift_days, dialect)
+                       for name in ('occoured_at', 'timePeriod_start', 'timePeriod_end')}
+        costs = session.execute(
+            insert(Cost).from_select(
+                ['step_id'] + [c.name for c in cost_columns],
+                select(_step_map.c.new_id, *[cost_values.get(c.name, c) for c in cost_columns])
+                .select_from(Cost).join(_step_map, _step_map.c.old_id == Cost.step_id)
+            )
+        ).rowcount
+        # Rollups da origem valem para a cópia (mesmos custos); sem recálculo sobre costs
+        session.execute(
+            insert(CostRollup).from_select(
+                ['step_id', 'cost_type', 'journey_id', 'total', 'cost_count'],
+                select(_step_map.c.new_id, CostRollup.cost_type, literal(new_journey_id),
+                       CostRollup.total, CostRollup.cost_count)
+                .select_from(CostRollup).join(_step_map, _step_map.c.old_id == CostRollup.step_id)
+            )
+        )
+    session.execute(text(f'DROP TABLE {STEP_MAP}'))
+
+    return {'journey_id': new_journey_id, 'source_id': source_id, 'shift_days': shift_days,
+            'steps': steps, 'edges': edges, 'costs': costs}
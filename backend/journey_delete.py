@@ -0,0 +1,55 @@
+# backend/journey_delete.py
+# Remoção de Jornadas (Journey -> Step -> Cost) sem carregar a árvore no ORM
+#
+# db.session.delete(journey) com cascade="all, delete-orphan" carrega cada passo e
+# cada custo na sessão e emite um DELETE por objeto. As FKs filhas são ON DELETE
+# CASCADE (steps.journey_id, costs.step_id, step_edges, cost_rollups, step_pacing)
+# e as relationships usam passive_deletes, então um único DELETE em journeys basta
+# quando o banco aplica as FKs. O SQLite só aplica com PRAGMA foreign_keys=ON; sem
+# ele os filhos são removidos antes, um DELETE por tabela — número constante de
+# statements em qualquer caso.
+
+from sqlalchemy import delete, select
+
+from .extensions import db
+from .journey_events import record_journey_change
+from .models import Cost, CostRollup, Journey, Step, StepEdge, StepPacing
+
+MAX_BULK_DELETE = 1000
+# DELETEs em massa: nada é carregado nem sincronizado na sessão
+_BULK = {'synchronize_session': False}
+
+
+class JourneyDeleteError(ValueError):
+    """Pedido de remoção inválido (mensagem para o cliente)."""
+
+
+def _enforces_cascade(connection):
+    if connection.dialect.name != 'sqlite':
+        return True
+    return bool(connection.exec_driver_sql('PRAGMA foreign_keys').scalar())
+
+
+def delete_journeys(journey_ids):
+    """Remove as jornadas e tudo que depende delas; devolve os ids removidos. Não faz commit."""
+    journey_ids = sorted(set(journey_ids))
+    if not journey_ids:
+        return []
+    if len(journey_ids) > MAX_BULK_DELETE:
+        raise JourneyDeleteError(f'No máximo {MAX_BULK_DELETE} jornadas por lote')
+
+    session = db.session
+    if not _enforces_cascade(session.connection()):
+        step_ids = select(Step.id).where(Step.journey_id.in_(journey_ids)).scalar_subquery()
+        session.execute(delete(Cost).where(Cost.step_id.in_(step_ids)), execution_options=_BULK)
+        session.execute(delete(CostRollup).where(CostRollup.journey_id.in_(journey_ids)), execution_options=_BULK)
+        session.execute(delete(StepPacing).where(StepPacing.journey_id.in_(journey_ids)), execution_options=_BULK)
+        session.execute(delete(StepEdge).where(StepEdge.journey_id.in_(journey_ids)), execution_options=_BULK)
+        session.execute(delete(Step).where(Step.journey_id.in_(journey_ids)), execution_options=_BULK)
+    deleted = session.scalars(
+        delete(Journey).where(Journey.id.in_(journey_ids)).returning(Journey.id),
+        execution_options=_BULK,
+    ).all()
+    for journey_id in deleted:
+        record_journey_change(journey_id, journey='deleted')
+    return sorted(deleted)
@@ -0,0 +1,372 @@
+# backend/journey_events.py
+# Alterações de Jornadas em tempo real (Server-Sent Events), sem polling
+#
+# GET /api/journeys/<id>/events mantém a conexão aberta e envia um evento 'change'
+# a cada commit que altera a jornada, seus passos, custos ou dependências. O evento
+# é um delta com ids: "steps" (passos alterados), "cost_steps" (passos cujos custos
+# mudaram), "edges" (dependências mudaram) e "journey" ('updated' ou 'deleted'); o
+# canvas recarrega só o que mudou. "reload": true pede recarga completa (delta grande
+# demais para uma notificação ou eventos possivelmente perdidos numa reconexão).
+#
+# As alterações são anotadas na sessão durante a transação (after_flush para o ORM,
+# record_journey_change() nos caminhos em massa). No commit, cada jornada alterada (ou
+# criada) ganha uma versão nova em journeys.version, na mesma transação: é dela que
+# saem os ETags e as chaves de cache, então nenhuma escrita passa despercebida, mesmo
+# duas no mesmo segundo. Depois o delta é publicado:
+# - 'memory': fan-out no próprio processo, no after_commit.
+# - 'postgres': NOTIFY journey_events dentro da transação (só é entregue se ela fizer
+#   commit). Cada processo mantém uma única conexão em LISTEN e repassa as
+#   notificações aos seus assinantes; vale para vários workers e para o worker de jobs.
+# N assinantes de uma jornada custam uma notificação por commit e nenhuma consulta:
+# depois da checagem de existência o stream não usa o banco. Cada assinante guarda só
+# o delta pendente já fundido, então um cliente lento não acumula fila.
+#
+# Cada stream ocupa uma thread do servidor enquanto estiver aberto: para muitos
+# assinantes, use workers com threads (gunicorn --threads) ou gevent.
+
+import json
+import logging
+import select as io_select
+import threading
+import time
+from collections import defaultdict
+
+from sqlalchemy import create_engine, event, func, select, text
+from sqlalchemy.engine import make_url
+from sqlalchemy.pool import NullPool
+
+CHANNEL = 'journey_events'
+LIVE_EVENTS_BACKENDS = ('auto', 'memory', 'postgres', 'none')
+# O payload do NOTIFY é limitado a 8000 bytes; acima disso o delta vira "reload"
+MAX_PAYLOAD_BYTES = 7900
+# Intervalo sugerido ao EventSource para reconectar
+RETRY_MS = 3000
+LISTENER_READY_TIMEOUT = 5.0
+
+# Chaves em session.info: deltas por jornada, passos com custos alterados pelo ORM, jornadas
+# criadas (ganham versão, sem evento) e deltas prontos
+_CHANGES = 'journey_changes'
+_COST_STEPS = 'journey_cost_steps'
+_CREATED = 'journey_created'
+_READY = 'journey_events_ready'
+
+logger = logging.getLogger(__name__)
+
+
+class LiveEventsError(RuntimeError):
+    """Canal desativado, listener indisponível ou limite de assinantes atingido."""
+
+
+def merge_changes(current, change):
+    """Funde dois deltas da mesma jornada (as listas de ids viram a união)."""
+    merged = dict(current or {})
+    for key in ('steps', 'cost_steps'):
+        if change.get(key):
+            merged[key] = sorted(set(merged.get(key, ())) | set(change[key]))
+    for key in ('edges', 'reload'):
+        if change.get(key):
+            merged[key] = True
+    if change.get('journey') and merged.get('journey') != 'deleted':
+        merged['journey'] = change['journey']
+    return merged
+
+
+def record_journey_change(journey_id, journey=None, steps=(), cost_steps=(), edges=False, session=None):
+    """Anota uma alteração na transação atual: publicada no commit, descartada no rollback.
+
+    Para escritas que não passam pelo unit of work do ORM (UPDATE/DELETE/INSERT em massa);
+    o que o ORM grava é detectado sozinho no after_flush.
+    """
+    if session is None:
+        from .extensions import db
+        session = db.session
+    change = {'journey': journey, 'steps': list(steps), 'cost_steps': list(cost_steps), 'edges': edges}
+    changes = session.info.setdefault(_CHANGES, {})
+    changes[journey_id] = merge_changes(changes.get(journey_id), change)
+
+
+def record_journey_created(journey_id, session=None):
+    """Jornada inserida fora do ORM (INSERT ... SELECT): recebe uma versão no commit."""
+    if session is None:
+        from .extensions import db
+        session = db.session
+    session.info.setdefault(_CREATED, set()).add(journey_id)
+
+
+def bump_journey_versions(session, journey_ids):
+    """Dá às jornadas uma versão nova, maior que todas as já atribuídas.
+
+    Valores novos (e não version + 1) fazem count/sum/max(version) de qualquer conjunto
+    de jornadas mudar a cada escrita nele: a listagem usa isso como chave de cache.
+    """
+    from .models import JOURNEY_VERSION_SEQUENCE, Journey
+
+    if not journey_ids:
+        return
+    table = Journey.__table__
+    if session.connection().dialect.name == 'postgresql':
+        fresh = JOURNEY_VERSION_SEQUENCE.next_value()
+    else:
+        # SQLite serializa as escritas: max + 1 não colide com outra transação
+        fresh = select(func.coalesce(func.max(table.c.version), 0) + 1).scalar_subquery()
+    # modificated_at explícito: a troca de versão não conta como edição da jornada (onupdate)
+    session.execute(table.update().where(table.c.id.in_(sorted(journey_ids)))
+                    .values(version=fresh, modificated_at=table.c.modificated_at))
+
+
+def _event_payload(journey_id, change):
+    payload = json.dumps({'journey_id': journey_id, **change}, separators=(',', ':'))
+    if len(payload.encode()) > MAX_PAYLOAD_BYTES:
+        reload = {'reload': True, **({'journey': change['journey']} if change.get('journey') else {})}
+        payload = json.dumps({'journey_id': journey_id, **reload}, separators=(',', ':'))
+    return payload
+
+
+class Subscription:
+    """Assinante de uma jornada: guarda só o delta pendente, já fundido."""
+
+    def __init__(self, journey_id):
+        self.journey_id = journey_id
+        self._pending = None
+        self._condition = threading.Condition()
+
+    def push(self, change):
+        with self._condition:
+            self._pending = merge_changes(self._pending, change)
+            self._condition.notify()
+
+    def wait(self, timeout):
+        """Delta acumulado desde a última chamada; None se nada mudou dentro de timeout."""
+        with self._condition:
+            if self._pending is None:
+                self._condition.wait(timeout)
+            change, self._pending = self._pending, None
+            return change
+
+
+class JourneyEventBroker:
+    """Extensão que publica os deltas das jornadas e mantém os assinantes deste processo.
+
+    Configuração: LIVE_EVENTS_BACKEND ('auto' = postgres no PostgreSQL, senão memory;
+    'memory', 'postgres' ou 'none'), LIVE_EVENTS_HEARTBEAT_SECONDS (padrão 15) e
+    LIVE_EVENTS_MAX_SUBSCRIBERS (padrão 1000 streams por processo).
+    """
+
+    def __init__(self):
+        self.backend = 'none'
+        self.heartbeat_seconds = 15.0
+        self.max_subscribers = 1000
+        self.published = 0
+        self.notifications = 0
+        self.delivered = 0
+        self.reconnects = 0
+        self._subscribers = defaultdict(set)
+        self._count = 0
+        self._lock = threading.Lock()
+        self._database_url = None
+        self._listener = None
+        self._listener_ready = threading.Event()
+
+    def init_app(self, app):
+        from .extensions import db
+
+        backend = app.config.setdefault('LIVE_EVENTS_BACKEND', 'auto')
+        if backend not in LIVE_EVENTS_BACKENDS:
+            raise ValueError(f"LIVE_EVENTS_BACKEND inválido: {backend!r}")
+        url = make_url(app.config['SQLALCHEMY_DATABASE_URI'])
+        if backend == 'auto':
+            backend = 'postgres' if url.get_backend_name() == 'postgresql' else 'memory'
+        if backend == 'postgres' and (url.get_backend_name(), url.get_driver_name()) != ('postgresql', 'psycopg2'):
+            raise ValueError('LIVE_EVENTS_BACKEND=postgres requer PostgreSQL com o driver psycopg2')
+        self.backend = backend
+        self.heartbeat_seconds = float(app.config.setdefault('LIVE_EVENTS_HEARTBEAT_SECONDS', 15))
+        self.max_subscribers = int(app.config.setdefault('LIVE_EVENTS_MAX_SUBSCRIBERS', 1000))
+        self._database_url = url
+        app.extensions['journey_events'] = self
+
+        for name, listener in (('after_flush', self._after_flush), ('before_commit', self._before_commit),
+                               ('after_commit', self._after_commit),
+                               ('after_transaction_end', self._after_transaction_end)):
+            if not event.contains(db.session, name, listener):
+                event.listen(db.session, name, listener)
+
+    # --- Coleta na transação ---
+    def _after_flush(self, session, flush_context):
+        from .models import Cost, Journey, Step, StepEdge
+
+        for objects, action in ((session.new, 'created'), (session.dirty, 'updated'), (session.deleted, 'deleted')):
+            for obj in objects:
+                if not isinstance(obj, (Journey, Step, StepEdge, Cost)):
+                    continue
+                if action == 'updated' and not session.is_modified(obj, include_collections=False):
+                    continue
+                if isinstance(obj, Journey):
+                    # Jornada nova ainda não tem assinantes: só ganha versão
+                    if action == 'created':
+                        record_journey_created(obj.id, session=session)
+                    else:
+                        record_journey_change(obj.id, journey=action, session=session)
+                elif isinstance(obj, Step):
+                    record_journey_change(obj.journey_id, steps=[obj.id], session=session)
+                elif isinstance(obj, StepEdge):
+                    record_journey_change(obj.journey_id, edges=True, session=session)
+                else:
+                    # A jornada do custo é resolvida uma vez só, no commit
+                    session.info.setdefault(_COST_STEPS, set()).add(obj.step_id)
+
+    def _before_commit(self, session):
+        session.flush()  # O flush do próprio commit vem depois deste evento
+        cost_steps = session.info.pop(_COST_STEPS, None)
+        if cost_steps:
+            from .models import Step
+
+            by_journey = defaultdict(list)
+            for step_id, journey_id in session.execute(select(Step.id, Step.journey_id).where(Step.id.in_(cost_steps))):
+                by_journey[journey_id].append(step_id)
+            for journey_id, step_ids in by_journey.items():
+                record_journey_change(journey_id, cost_steps=step_ids, session=session)
+        changes = session.info.get(_CHANGES) or {}
+        bump_journey_versions(session, {journey_id for journey_id, change in changes.items()
+                                         if change.get('journey') != 'deleted'} | session.info.pop(_CREATED, set()))
+        if self.backend == 'none' or not changes:
+            return
+        payloads = [_event_payload(journey_id, change) for journey_id, change in changes.items()]
+        if self.backend == 'postgres':
+            # Um statement para todas as jornadas; o PostgreSQL só entrega se a transação fizer commit
+            session.connection().execute(
+                text('SELECT pg_notify(:channel, payload) FROM unnest(CAST(:payloads AS text[])) AS payload'),
+                {'channel': CHANNEL, 'payloads': payloads},
+            )
+        else:
+            session.info[_READY] = payloads
+        self.published += len(payloads)
+
+    def _after_commit(self, session):
+        for payload in session.info.pop(_READY, ()):
+            self._dispatch_payload(payload)
+
+    def _after_transaction_end(self, session, transaction):
+        if transaction.parent is None:
+            for key in (_CHANGES, _COST_STEPS, _CREATED, _READY):
+                session.info.pop(key, None)
+
+    # --- Entrega aos assinantes deste processo ---
+    def _dispatch_payload(self, payload):
+        change = json.loads(payload)
+        journey_id = change.pop('journey_id')
+        with self._lock:
+            subscribers = list(self._subscribers.get(journey_id, ()))
+        for subscription in subscribers:
+            subscription.push(change)
+        self.delivered += len(subscribers)
+
+    def _broadcast_reload(self):
+        with self._lock:
+            subscribers = [s for group in self._subscribers.values() for s in group]
+        for subscription in subscribers:
+            subscription.push({'reload': True})
+
+    def subscribe(self, journey_id):
+        if self.backend == 'none':
+            raise LiveEventsError('Canal de eventos desativado (LIVE_EVENTS_BACKEND=none)')
+        if self.backend == 'postgres':
+            self._ensure_listener()
+            if not self._listener_ready.wait(LISTENER_READY_TIMEOUT):
+                raise LiveEventsError('Listener do PostgreSQL indisponível')
+        with self._lock:
+            if self._count >= self.max_subscribers:
+                raise LiveEventsError(f'Limite de {self.max_subscribers} assinantes atingido neste processo')
+            subscription = Subscription(journey_id)
+            self._subscribers[journey_id].add(subscription)
+            self._count += 1
+        return subscription
+
+    def unsubscribe(self, subscription):
+        """Remove o assinante (pode ser chamado mais de uma vez)."""
+        with self._lock:
+            group = self._subscribers.get(subscription.journey_id)
+            if group is None or subscription not in group:
+                return
+            group.discard(subscription)
+            self._count -= 1
+            if not group:
+                del self._subscribers[subscription.journey_id]
+
+    def event_stream(self, subscription):
+        """Gera o text/event-stream do assinante até a jornada ser removida ou o cliente sair."""
+        journey_id = subscription.journey_id
+        try:
+            # 'ready': a partir daqui nenhuma alteração se perde; o cliente carrega o estado atual
+            yield f'retry: {RETRY_MS}\nevent: ready\ndata: {json.dumps({"journey_id": journey_id})}\n\n'
+            sequence = 0
+            while True:
+                change = subscription.wait(self.heartbeat_seconds)
+                if change is None:
+                    # Comentário SSE: mantém proxies abertos e detecta clientes que saíram
+                    yield ': keepalive\n\n'
+                    continue
+                sequence += 1
+                data = json.dumps({'journey_id': journey_id, **change}, separators=(',', ':'))
+                yield f'id: {sequence}\nevent: change\ndata: {data}\n\n'
+                if change.get('journey') == 'deleted':
+                    return
+        finally:
+            self.unsubscribe(subscription)
+
+    # --- LISTEN no PostgreSQL (uma conexão por processo) ---
+    def _ensure_listener(self):
+        with self._lock:
+            if self._listener is None or not self._listener.is_alive():
+                self._listener_ready.clear()
+                self._listener = threading.Thread(target=self._listen_forever, name='journey-events-listener',
+                                                  daemon=True)
+                self._listener.start()
+
+    def _listen_forever(self):
+        # Conexão fora do pool da app: fica presa em LISTEN enquanto o processo viver
+        engine = create_engine(self._database_url, poolclass=NullPool)
+        delay = 1.0
+        while True:
+            connection = None
+            try:
+                connection = engine.raw_connection()
+                driver = connection.driver_connection
+                driver.autocommit = True
+                with driver.cursor() as cursor:
+                    cursor.execute(f'LISTEN {CHANNEL}')
+                if self._listener_ready.is_set():
+                    # Reconexão: o que foi publicado durante a queda não chegou
+                    self.reconnects += 1
+                    self._broadcast_reload()
+                self._listener_ready.set()
+                delay = 1.0
+                while True:
+                    io_select.select([driver], [], [], 60)
+                    driver.poll()
+                    while driver.notifies:
+                        self.notifications += 1
+                        self._dispatch_payload(driver.notifies.pop(0).payload)
+            except Exception:
+                logger.warning('Listener de %s caiu; reconectando em %.0fs', CHANNEL, delay, exc_info=True)
+                if connection is not None:
+                    try:
+                        connection.invalidate()
+                    except Exception:
+                        pass
+                time.sleep(delay)
+                delay = min(delay * 2, 30.0)
+
+    def stats(self):
+        with self._lock:
+            journeys = len(self._subscribers)
+            subscribers = self._count
+        return {
+            'backend': self.backend,
+            'subscribers': subscribers,
+            'journeys': journeys,
+            'published': self.published,
+            'notifications': self.notifications,
+            'delivered': self.delivered,
+            'reconnects': self.reconnects,
+            'listener_alive': bool(self._listener and self._listener.is_alive()),
+        }
@@ -0,0 +1,76 @@
+# backend/journey_queries.py
+# Consultas de leitura de Jornadas compartilhadas entre a API Flask e o modo ASGI
+
+from sqlalchemy import func, select
+
+from .models import Journey
+
+LIST_DEFAULT_LIMIT = 50
+LIST_MAX_LIMIT = 200
+
+
+def clamp_limit(limit):
+    return max(1, min(limit or LIST_DEFAULT_LIMIT, LIST_MAX_LIMIT))
+
+
+def journey_list_statement(limit, cursor=None, status=None, user_id=None, name=None):
+    """SELECT de uma página da listagem (keyset em id, mais recentes primeiro).
+
+    Projeção: seleciona só as colunas devolvidas, sem hidratar objetos Journey
+    (evita carregar a coluna Text 'description' de cada linha). Busca limit + 1
+    linhas para saber se existe próxima página sem um COUNT(*).
+    """
+    query = select(Journey.id, Journey.name, Journey.status, Journey.user_id, Journey.created_at)
+    return _list_filters(query, cursor, status, user_id, name).order_by(Journey.id.desc()).limit(limit + 1)
+
+
+def journey_list_version_statement(limit=None, cursor=None, status=None, user_id=None, name=None):
+    """Versão do conjunto listado: count, sum e max de journeys.version com os mesmos filtros.
+
+    Cada commit dá às jornadas que altera (ou cria) uma versão maior que todas as
+    anteriores, então qualquer escrita no conjunto muda o trio: serve de chave de cache
+    válida em todos os workers, sem contador no cache.
+    """
+    query = select(func.count(), func.coalesce(func.sum(Journey.version), 0), func.max(Journey.version))
+    return _list_filters(query, cursor, status, user_id, name)
+
+
+def _list_filters(query, cursor, status, user_id, name):
+    if user_id is not None:
+        query = query.where(Journey.user_id == user_id)
+    if status:
+        query = query.where(Journey.status == status)
+    if name:
+        # LIKE com prefixo fixo pode usar o índice B-tree de 'name'
+        prefix = name.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+        query = query.where(Journey.name.like(f'{prefix}%', escape='\\'))
+    if cursor is not None:
+        # Keyset: continua a partir do último id visto.
+        # 'id' é serial, então a ordem coincide com a de created_at e usa a PK.
+        query = query.where(Journey.id < cursor)
+    return query
+
+
+def journey_list_page(rows, limit):
+    """Payload da página a partir das linhas de journey_list_statement."""
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    items = [{
+        'id': r.id,
+        'nome': r.name,
+        'status': r.status,
+        'user_id': r.user_id,
+        'created_at': r.created_at,
+    } for r in rows]
+    return {
+        'items': items,
+        'next_cursor': rows[-1].id if has_more else None,
+    }
+
+
+def journey_item_statement(journey_id):
+    return select(Journey.id, Journey.name, Journey.description, Journey.status).where(Journey.id == journey_id)
+
+
+def journey_item_payload(row):
+    return {'id': row.id, 'nome': row.name, 'descricao': row.description, 'status': row.status}
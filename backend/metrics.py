@@ -0,0 +1,247 @@
+# backend/metrics.py
+# Instrumentação estilo Prometheus: latência por rota, status, tamanho de payload,
+# statements SQL por requisição e log de consultas lentas
+
+import logging
+import re
+import threading
+import time
+from collections import defaultdict
+
+from flask import Response, g, has_request_context, request
+from sqlalchemy import event
+
+logger = logging.getLogger('midaspipe.sql')
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+OVERHEAD_BUCKETS = (0.00001, 0.000025, 0.00005, 0.0001, 0.00025, 0.0005, 0.001)
+
+_STRING_LITERAL = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_LITERAL = re.compile(r'\b\d+(?:\.\d+)?\b')
+_PARAM = r'(?:\?|%\([^)]*\)s|%s|:\w+|__\[POSTCOMPILE_\w+\])'
+_PARAM_LIST = re.compile(r'([(\[])\s*' + _PARAM + r'(?:\s*,\s*' + _PARAM + r')*\s*[)\]]')
+_WHITESPACE = re.compile(r'\s+')
+
+
+def normalize_statement(statement):
+    """Remove literais e listas de parâmetros para agrupar statements equivalentes."""
+    statement = _STRING_LITERAL.sub('?', statement)
+    statement = _NUMBER_LITERAL.sub('?', statement)
+    statement = _PARAM_LIST.sub(lambda m: '(...)' if m.group(1) == '(' else '[...]', statement)
+    return _WHITESPACE.sub(' ', statement).strip()
+
+
+class Histogram:
+    """Histograma cumulativo com rótulos, no formato de exposição do Prometheus."""
+
+    def __init__(self, name, documentation, buckets, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.buckets = tuple(buckets)
+        self.labelnames = tuple(labelnames)
+        self._series = {}
+
+    def observe(self, value, labels=()):
+        series = self._series.get(labels)
+        if series is None:
+            series = self._series[labels] = [[0] * len(self.buckets), 0.0, 0]
+        counts = series[0]
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                counts[i] += 1
+        series[1] += value
+        series[2] += 1
+
+    def expose(self):
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} histogram']
+        for labels, (counts, total, count) in sorted(self._series.items()):
+            base = _format_labels(self.labelnames, labels)
+            for bound, bucket_count in zip(self.buckets, counts):
+                lines.append(f'{self.name}_bucket{_format_labels(self.labelnames + ("le",), labels + (_fmt(bound),))} {bucket_count}')
+            lines.append(f'{self.name}_bucket{_format_labels(self.labelnames + ("le",), labels + ("+Inf",))} {count}')
+            lines.append(f'{self.name}_sum{base} {_fmt(total)}')
+            lines.append(f'{self.name}_count{base} {count}')
+        return lines
+
+
+class Counter:
+    """Contador monotônico com rótulos."""
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = defaultdict(int)
+
+    def inc(self, labels=(), amount=1):
+        self._values[labels] += amount
+
+    def expose(self):
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} counter']
+        for labels, value in sorted(self._values.items()):
+            lines.append(f'{self.name}{_format_labels(self.labelnames, labels)} {_fmt(value)}')
+        return lines
+
+
+def _fmt(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(names, values):
+    if not names:
+        return ''
+    return '{' + ','.join(f'{n}="{_escape(v)}"' for n, v in zip(names, values)) + '}'
+
+
+class RequestMetrics:
+    """Extensão que instrumenta a app e o engine do SQLAlchemy.
+
+    Configuração: METRICS_ENABLED (padrão True), METRICS_PATH (padrão '/metrics')
+    e SLOW_QUERY_MS (padrão 200; 0 desativa o log de consultas lentas).
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        route_labels = ('method', 'route')
+        self.request_duration = Histogram(
+            'midaspipe_http_request_duration_seconds', 'Latência das requisições HTTP por rota.',
+            LATENCY_BUCKETS, route_labels)
+        self.requests = Counter(
+            'midaspipe_http_requests_total', 'Requisições HTTP por rota e status.', route_labels + ('status',))
+        self.response_size = Histogram(
+            'midaspipe_http_response_size_bytes', 'Tamanho do corpo das respostas por rota.',
+            SIZE_BUCKETS, route_labels)
+        self.request_statements = Histogram(
+            'midaspipe_db_statements_per_request', 'Statements SQL emitidos por requisição.',
+            QUERY_COUNT_BUCKETS, route_labels)
+        self.request_sql_time = Histogram(
+            'midaspipe_db_time_per_request_seconds', 'Tempo total em SQL por requisição.',
+            LATENCY_BUCKETS, route_labels)
+        self.statement_duration = Histogram(
+            'midaspipe_db_statement_duration_seconds', 'Duração de cada statement SQL.', LATENCY_BUCKETS)
+        self.slow_statements = Counter(
+            'midaspipe_db_slow_statements_total', 'Statements acima de SLOW_QUERY_MS.')
+        self.overhead = Histogram(
+            'midaspipe_metrics_overhead_seconds', 'Custo da própria instrumentação por requisição.',
+            OVERHEAD_BUCKETS)
+        self.enabled = False
+        self.slow_query_seconds = 0.2
+
+    def init_app(self, app):
+        self.enabled = app.config.setdefault('METRICS_ENABLED', True)
+        if not self.enabled:
+            return
+        self.slow_query_seconds = app.config.setdefault('SLOW_QUERY_MS', 200) / 1000.0
+        app.extensions['request_metrics'] = self
+
+        app.before_request(self._before_request)
+        app.after_request(self._after_request)
+        app.add_url_rule(app.config.setdefault('METRICS_PATH', '/metrics'), 'metrics', self.exposition_view)
+
+        from .extensions import db
+        with app.app_context():
+            engines = list(db.engines.values())  # Primário e réplicas de leitura (replicas.py)
+        for engine in engines:
+            event.listen(engine, 'before_cursor_execute', self._before_cursor_execute)
+            event.listen(engine, 'after_cursor_execute', self._after_cursor_execute)
+
+    # --- Hooks da requisição ---
+    def _before_request(self):
+        started = time.perf_counter()
+        g._metrics = {'started': started, 'statements': 0, 'sql_time': 0.0, 'overhead': 0.0}
+        g._metrics['overhead'] += time.perf_counter() - started
+
+    def _after_request(self, response):
+        state = g.pop('_metrics', None)
+        if state is None:
+            return response
+        hook_started = time.perf_counter()
+        duration = hook_started - state['started']
+        route = request.url_rule.rule if request.url_rule is not None else 'unmatched'
+        labels = (request.method, route)
+        size = response.calculate_content_length()
+        with self._lock:
+            self.request_duration.observe(duration, labels)
+            self.requests.inc(labels + (str(response.status_code),))
+            if size is not None:
+                self.response_size.observe(size, labels)
+            self.request_statements.observe(state['statements'], labels)
+            self.request_sql_time.observe(state['sql_time'], labels)
+            overhead = state['overhead'] + (time.perf_counter() - hook_started)
+            self.overhead.observe(overhead)
+        response.headers['Server-Timing'] = (
+            f"app;dur={duration * 1000:.2f}, db;dur={state['sql_time'] * 1000:.2f};desc=\"{state['statements']} stmts\""
+        )
+        return response
+
+    # --- Hooks do SQLAlchemy ---
+    # O início fica no contexto de execução do statement: se ele falhar, vai embora junto
+    # (uma pilha em conn.info ficaria com a entrada do erro e desalinharia as medições seguintes)
+    def _before_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        if context is not None:
+            context._metrics_started = time.perf_counter()
+
+    def _after_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        finished = time.perf_counter()
+        started = getattr(context, '_metrics_started', None)
+        if started is None:
+            return
+        elapsed = finished - started
+        with self._lock:
+            self.statement_duration.observe(elapsed)
+        if has_request_context():
+            state = g.get('_metrics')
+            if state is not None:
+                state['statements'] += 1
+                state['sql_time'] += elapsed
+        if self.slow_query_seconds and elapsed >= self.slow_query_seconds:
+            with self._lock:
+                self.slow_statements.inc()
+            logger.warning('Consulta lenta (%.1f ms): %s', elapsed * 1000, normalize_statement(statement))
+        if has_request_context() and g.get('_metrics') is not None:
+            g._metrics['overhead'] += time.perf_counter() - finished
+
+    # --- Exposição ---
+    def render(self):
+        """Texto no formato de exposição do Prometheus (inclui o pool de conexões)."""
+        with self._lock:
+            lines = []
+            for metric in (self.requests, self.request_duration, self.response_size, self.request_statements,
+                           self.request_sql_time, self.statement_duration, self.slow_statements, self.overhead):
+                lines.extend(metric.expose())
+        lines.extend(self._pool_lines())
+        return '\n'.join(lines) + '\n'
+
+    @staticmethod
+    def _pool_lines():
+        from .extensions import pool_metrics
+        primary = pool_metrics.snapshot()
+        # Um rótulo bind por engine: 'primary' e cada réplica de leitura
+        snapshots = {'primary': primary, **primary.get('binds', {})}
+        families = {}
+
+        def add(name, kind, bind, value):
+            family = families.setdefault(name, [f'# TYPE {name} {kind}'])
+            family.append(f'{name}{{bind="{bind}"}} {value}')
+
+        for bind, snapshot in snapshots.items():
+            for key in ('size', 'checked_out', 'checked_in', 'overflow'):
+                if key in snapshot:
+                    add(f'midaspipe_db_pool_{key}', 'gauge', bind, snapshot[key])
+            for key, value in snapshot['counters'].items():
+                add(f'midaspipe_db_pool_{key}_total', 'counter', bind, value)
+            wait = snapshot.get('wait')
+            if wait is not None:
+                add('midaspipe_db_pool_wait_max_seconds', 'gauge', bind, wait['max_ms'] / 1000)
+                add('midaspipe_db_pool_timeouts_total', 'counter', bind, wait['timeouts'])
+        return [line for family in families.values() for line in family]
+
+    def exposition_view(self):
+        return Response(self.render(), content_type='text/plain; version=0.0.4; charset=utf-8',
+                        headers={'Cache-Control': 'no-store'})
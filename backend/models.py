@@ -18,14 +18,24 @@ class User(db.Model): # Renomeado de Usuario
     def __repr__(self):
         return f'<User {self.email}>'
 
+# Fonte das versões de jornada no PostgreSQL (ver journey_events.bump_journey_versions)
+JOURNEY_VERSION_SEQUENCE = db.Sequence('journeys_version_seq', metadata=db.metadata)
+
 class Journey(db.Model): # Renomeado de Jornada
     __tablename__ = 'journeys' # Renomeado de jornadas
+    # Índices compostos para a listagem paginada (filtro + keyset em id)
+    __table_args__ = (
+        db.Index('ix_journeys_user_id_id', 'user_id', 'id'),
+        db.Index('ix_journeys_status_id', 'status', 'id'),
+    )
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(150), nullable=False, index=True)
     description = db.Column(db.Text, nullable=True)
     created_at = db.Column(db.DateTime(timezone=True), server_default=func.now())
     modificated_at = db.Column(db.DateTime(timezone=True), onupdate=func.now())
     status = db.Column(db.String(50), nullable=False, default='Active') # Status em inglês
+    # Trocada a cada commit que altera a jornada, seus passos, custos ou dependências (ETag, chaves de cache)
+    version = db.Column(db.BigInteger, nullable=False, server_default='0')
 
     # FK atualizada para 'users.id'
     user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False, index=True)
@@ -35,7 +45,9 @@ class Journey(db.Model): # Renomeado de Jornada
     creator = db.relationship('User', back_populates='journeys')
 
     # Relacionamento atualizado ('Step', back_populates='journey')
-    steps = db.relationship('Step', back_populates='journey', lazy=True, cascade="all, delete-orphan")
+    # passive_deletes: o banco remove os passos (ON DELETE CASCADE), sem carregá-los (ver journey_delete.py)
+    steps = db.relationship('Step', back_populates='journey', lazy=True, cascade="all, delete-orphan",
+                            passive_deletes=True)
 
     def __repr__(self):
         return f'<Journey {self.id}: {self.name}>'
@@ -59,19 +71,25 @@ class Step(db.Model): # Renomeado de Passo
     modificated_at = db.Column(db.DateTime(timezone=True), onupdate=func.now())
 
     # FK atualizada para 'journeys.id'
-    journey_id = db.Column(db.Integer, db.ForeignKey('journeys.id'), nullable=False, index=True)
+    journey_id = db.Column(db.Integer, db.ForeignKey('journeys.id', ondelete='CASCADE'), nullable=False, index=True)
 
     # Relacionamento atualizado ('Journey', back_populates='steps')
     journey = db.relationship('Journey', back_populates='steps')
 
     # Relacionamento atualizado ('Cost', back_populates='step')
-    costs = db.relationship('Cost', back_populates='step', lazy='dynamic', cascade="all, delete-orphan")
+    costs = db.relationship('Cost', back_populates='step', lazy='dynamic', cascade="all, delete-orphan",
+                            passive_deletes=True)
 
     def __repr__(self):
         return f'<Step {self.id}: {self.name} ({self.typo})>'
 
 class Cost(db.Model): # Renomeado de Custo
     __tablename__ = 'costs' # Renomeado de custos
+    # Chave natural usada pela importação em massa (UPSERT idempotente, ver cost_import.py)
+    __table_args__ = (
+        db.Index('uq_costs_natural_key', 'step_id', 'cost_type', 'timePeriod_start', 'timePeriod_end',
+                 'description', unique=True),
+    )
     id = db.Column(db.Integer, primary_key=True)
     description = db.Column(db.String(255), nullable=False)
     value = db.Column(db.Numeric(12, 2), nullable=False)
@@ -82,7 +100,7 @@ class Cost(db.Model): # Renomeado de Custo
     timePeriod_end = db.Column(db.Date, nullable=True)
 
     # FK atualizada para 'steps.id'
-    step_id = db.Column(db.Integer, db.ForeignKey('steps.id'), nullable=False, index=True)
+    step_id = db.Column(db.Integer, db.ForeignKey('steps.id', ondelete='CASCADE'), nullable=False, index=True)
 
     # Relacionamento atualizado ('Step', back_populates='costs')
     # Nome do atributo pode ser 'step' ou 'related_step'
@@ -92,4 +110,85 @@ class Cost(db.Model): # Renomeado de Custo
     modificated_at = db.Column(db.DateTime(timezone=True), onupdate=func.now())
 
     def __repr__(self):
-        return f'<Cost {self.id}: {self.cost_type} - {self.value}>'
\ No newline at end of file
+        return f'<Cost {self.id}: {self.cost_type} - {self.value}>'
+
+class CostRollup(db.Model):
+    """Total gasto por passo e cost_type, mantido incrementalmente (ver rollups.py)."""
+    __tablename__ = 'cost_rollups'
+    step_id = db.Column(db.Integer, db.ForeignKey('steps.id', ondelete='CASCADE'), primary_key=True)
+    cost_type = db.Column(db.String(50), primary_key=True)
+    # Desnormalizado de steps.journey_id para agregar por jornada sem join
+    journey_id = db.Column(db.Integer, db.ForeignKey('journeys.id', ondelete='CASCADE'), nullable=False, index=True)
+    total = db.Column(db.Numeric(14, 2), nullable=False, default=0)
+    cost_count = db.Column(db.Integer, nullable=False, default=0)
+
+    def __repr__(self):
+        return f'<CostRollup step={self.step_id} {self.cost_type}: {self.total}>'
+
+class StepEdge(db.Model):
+    """Dependência entre Passos: to_step começa depois que from_step termina (+ lag_days). Ver step_graph.py."""
+    __tablename__ = 'step_edges'
+    __table_args__ = (
+        db.CheckConstraint('from_step_id <> to_step_id', name='ck_step_edges_no_self_loop'),
+    )
+    from_step_id = db.Column(db.Integer, db.ForeignKey('steps.id', ondelete='CASCADE'), primary_key=True)
+    to_step_id = db.Column(db.Integer, db.ForeignKey('steps.id', ondelete='CASCADE'), primary_key=True, index=True)
+    # Desnormalizado de steps.journey_id: o grafo da jornada é carregado sem join
+    journey_id = db.Column(db.Integer, db.ForeignKey('journeys.id', ondelete='CASCADE'), nullable=False, index=True)
+    lag_days = db.Column(db.Integer, nullable=False, default=0)
+    created_at = db.Column(db.DateTime(timezone=True), server_default=func.now())
+
+    def __repr__(self):
+        return f'<StepEdge {self.from_step_id} -> {self.to_step_id} (+{self.lag_days}d)>'
+
+class StepPacing(db.Model):
+    """Último cálculo de pacing de cada passo ativo (gravado por 'flask pace-steps', ver pacing.py)."""
+    __tablename__ = 'step_pacing'
+    step_id = db.Column(db.Integer, db.ForeignKey('steps.id', ondelete='CASCADE'), primary_key=True)
+    # Sem FK própria: remover a jornada já remove os passos e, em cascata, estas linhas.
+    # Uma FK a menos reduz pela metade as checagens na regravação em massa do retrato
+    journey_id = db.Column(db.Integer, nullable=False, index=True)
+    as_of = db.Column(db.Date, nullable=False)
+    budget = db.Column(db.Numeric(12, 2), nullable=False)
+    expected_spend = db.Column(db.Numeric(14, 2), nullable=False)
+    actual_spend = db.Column(db.Numeric(14, 2), nullable=False)
+    burn_rate = db.Column(db.Numeric(14, 2), nullable=False) # Gasto médio diário na janela recente
+    projected_spend = db.Column(db.Numeric(14, 2), nullable=False) # Projeção no fim do voo
+    pacing_ratio = db.Column(db.Float, nullable=True) # realizado / esperado
+    status = db.Column(db.String(20), nullable=False, index=True) # under, on_track, over
+    computed_at = db.Column(db.DateTime(timezone=True), server_default=func.now())
+
+    def __repr__(self):
+        return f'<StepPacing step={self.step_id} {self.status}: {self.actual_spend}/{self.expected_spend}>'
+
+class Job(db.Model):
+    """Operação pesada executada em segundo plano por 'flask jobs-worker' (ver jobs.py)."""
+    __tablename__ = 'jobs'
+    __table_args__ = (
+        # Fila: próximos jobs prontos (status + run_at), lidos com FOR UPDATE SKIP LOCKED
+        db.Index('ix_jobs_status_run_at', 'status', 'run_at'),
+    )
+    id = db.Column(db.Integer, primary_key=True)
+    kind = db.Column(db.String(50), nullable=False, index=True) # import_costs, export_journeys, ...
+    status = db.Column(db.String(20), nullable=False, default='queued') # queued, running, succeeded, failed, cancelled
+    payload = db.Column(db.JSON, nullable=True) # Parâmetros da operação
+    # Arquivo de entrada (ex.: CSV da importação) e de saída (ex.: exportação); deferred: fora das listagens
+    input_data = db.deferred(db.Column(db.LargeBinary, nullable=True))
+    output_data = db.deferred(db.Column(db.LargeBinary, nullable=True))
+    output_path = db.Column(db.String(500), nullable=True) # Saída gravada em disco, relativa a JOBS_OUTPUT_DIR
+    output_mimetype = db.Column(db.String(100), nullable=True)
+    output_filename = db.Column(db.String(200), nullable=True)
+    progress = db.Column(db.JSON, nullable=True) # Último progresso informado pela operação
+    result = db.Column(db.JSON, nullable=True) # Relatório final
+    error = db.Column(db.Text, nullable=True) # Erro da última tentativa
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    max_attempts = db.Column(db.Integer, nullable=False, default=3)
+    run_at = db.Column(db.DateTime(timezone=True), nullable=False) # Não roda antes disso (backoff das novas tentativas)
+    locked_by = db.Column(db.String(120), nullable=True) # Worker que está com o job
+    heartbeat_at = db.Column(db.DateTime(timezone=True), nullable=True) # Sem sinal por JOBS_LEASE_SECONDS: volta para a fila
+    created_at = db.Column(db.DateTime(timezone=True), server_default=func.now())
+    started_at = db.Column(db.DateTime(timezone=True), nullable=True)
+    finished_at = db.Column(db.DateTime(timezone=True), nullable=True)
+
+    def __repr__(self):
+        return f'<Job {self.id} {self.kind}: {self.status}>'
@@ -0,0 +1,373 @@
+# backend/pacing.py
+# Pacing de orçamento dos passos: gasto esperado x realizado, burn rate e projeção de fim de voo
+#
+# Tudo é calculado em lote com NumPy: duas consultas trazem as colunas de
+# todos os passos ativos e dos seus custos (já somados por período no banco),
+# cada métrica é uma operação vetorizada sobre arrays e os totais por passo e
+# por jornada saem de np.bincount, sem laço Python por objeto.
+#
+# Modelo: o orçamento do passo é distribuído linearmente entre date_start e
+# date_end (esperado). Custos com timePeriod_start..timePeriod_end contam
+# pró-rata pelos dias já decorridos, como em analytics.py. O burn rate é o
+# gasto médio diário na janela recente e a projeção é realizado + burn rate x
+# dias restantes.
+
+import csv
+import datetime
+import io
+import time
+
+from sqlalchemy import Date, delete, func, insert, select, type_coerce
+
+from .analytics import cost_period_bounds
+from .extensions import db
+from .models import Cost, Step, StepPacing
+
+# numpy (dependência opcional, pip install numpy) é importado no primeiro cálculo:
+# custa ~80 ms e não deve pesar no boot de workers que não servem pacing
+np = None
+
+CLOSED_STEP_STATUSES = ('Completed', 'Cancelled')
+PACING_STATUSES = ('under', 'on_track', 'over')
+DEFAULT_WINDOW_DAYS = 7
+DEFAULT_TOLERANCE = 0.1
+
+
+class PacingUnavailable(RuntimeError):
+    """Pacing pedido sem o NumPy instalado."""
+
+
+def _require_numpy():
+    global np
+    if np is None:
+        try:
+            import numpy
+        except ImportError:
+            raise PacingUnavailable('Pacing requer o pacote numpy instalado') from None
+        np = numpy
+    return np
+
+
+def _utc_day(column, dialect):
+    """Dia (UTC) de uma coluna timestamptz, calculado no banco."""
+    if dialect == 'postgresql':
+        return func.timezone('UTC', column).cast(Date)
+    return type_coerce(func.date(column), Date)
+
+
+def _cost_bounds(dialect):
+    if dialect == 'postgresql':
+        # Mesma expressão dos índices de analytics (ix_costs_step_id_period)
+        return cost_period_bounds()
+    start = func.coalesce(Cost.timePeriod_start, _utc_day(Cost.occoured_at, dialect))
+    return start, func.coalesce(Cost.timePeriod_end, start)
+
+
+def _days(values):
+    """Sequência de date -> array int64 de dias desde 1970-01-01."""
+    return np.array(values, dtype='datetime64[D]').astype(np.int64)
+
+
+def load_pacing_inputs(as_of, journey_id=None, step_id=None, active_only=True):
+    """Carrega as colunas de passos e custos como arrays (2 consultas).
+
+    Passos: com orçamento e voo definido; com active_only, só os que estão em voo
+    em as_of e não foram concluídos/cancelados. Custos: somados no banco por
+    (passo, início, fim) e limitados aos que começaram até as_of.
+    """
+    _require_numpy()
+    dialect = db.session.get_bind().dialect.name
+    start_day = _utc_day(Step.date_start, dialect)
+    end_day = _utc_day(Step.date_end, dialect)
+    conditions = [Step.budget > 0, Step.date_start.isnot(None), Step.date_end.isnot(None), end_day >= start_day]
+    if active_only:
+        conditions += [Step.status.notin_(CLOSED_STEP_STATUSES), start_day <= as_of, end_day >= as_of]
+    if journey_id is not None:
+        conditions.append(Step.journey_id == journey_id)
+    if step_id is not None:
+        conditions.append(Step.id == step_id)
+
+    step_rows = db.session.execute(
+        select(Step.id, Step.journey_id, Step.budget, start_day.label('start'), end_day.label('end'))
+        .where(*conditions)
+        .order_by(Step.id)
+    ).all()
+    cost_start, cost_end = _cost_bounds(dialect)
+    cost_rows = db.session.execute(
+        select(Cost.step_id, cost_start.label('period_start'), cost_end.label('period_end'),
+               func.sum(Cost.value).label('value'))
+        .join(Step, Step.id == Cost.step_id)
+        .where(*conditions, cost_start <= as_of)
+        .group_by(Cost.step_id, 'period_start', 'period_end')
+    ).all()
+
+    step_cols = list(zip(*step_rows)) or [(), (), (), (), ()]
+    cost_cols = list(zip(*cost_rows)) or [(), (), (), ()]
+    steps = {
+        'step_id': np.array(step_cols[0], dtype=np.int64),
+        'journey_id': np.array(step_cols[1], dtype=np.int64),
+        'budget': np.array(step_cols[2], dtype=np.float64),
+        'start': _days(step_cols[3]),
+        'end': _days(step_cols[4]),
+    }
+    costs = {
+        'step_id': np.array(cost_cols[0], dtype=np.int64),
+        'start': _days(cost_cols[1]),
+        'end': _days(cost_cols[2]),
+        'value': np.array(cost_cols[3], dtype=np.float64),
+    }
+    return steps, costs
+
+
+def compute_pacing(steps, costs, as_of, window_days=DEFAULT_WINDOW_DAYS, tolerance=DEFAULT_TOLERANCE):
+    """Métricas de pacing por passo e por jornada, vetorizadas sobre todos os passos.
+
+    'steps' deve vir ordenado por step_id (como em load_pacing_inputs).
+    """
+    _require_numpy()
+    today = _days([as_of])[0]
+    n = len(steps['step_id'])
+
+    flight = steps['end'] - steps['start'] + 1
+    elapsed = np.clip(today - steps['start'] + 1, 0, flight)
+    remaining = flight - elapsed
+    expected = steps['budget'] * elapsed / flight
+
+    # Cada custo contribui com a fração do seu período já decorrida até as_of
+    idx = np.searchsorted(steps['step_id'], costs['step_id'])
+    cost_days = costs['end'] - costs['start'] + 1
+    daily = costs['value'] / cost_days
+    elapsed_cost = np.clip(np.minimum(costs['end'], today) - costs['start'] + 1, 0, None)
+    actual = np.bincount(idx, weights=daily * elapsed_cost, minlength=n)
+
+    # Burn rate: gasto na janela [as_of - window + 1, as_of]; no início do voo a janela encolhe
+    window_start = np.maximum(today - window_days + 1, steps['start'])[idx]
+    in_window = np.clip(np.minimum(costs['end'], today) - np.maximum(costs['start'], window_start) + 1, 0, None)
+    window_spend = np.bincount(idx, weights=daily * in_window, minlength=n)
+    burn_rate = window_spend / np.clip(np.minimum(elapsed, window_days), 1, None)
+    projected = actual + burn_rate * remaining
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        ratio = np.where(expected > 0, actual / expected, np.nan)
+    status = np.full(n, 'on_track', dtype=object)
+    status[ratio > 1 + tolerance] = 'over'
+    status[ratio < 1 - tolerance] = 'under'
+
+    journey_ids, journey_idx = np.unique(steps['journey_id'], return_inverse=True)
+    rollup = lambda values: np.bincount(journey_idx, weights=values, minlength=len(journey_ids))
+    journeys = {
+        'journey_id': journey_ids,
+        'steps': np.bincount(journey_idx, minlength=len(journey_ids)),
+        'budget': rollup(steps['budget']),
+        'expected': rollup(expected),
+        'actual': rollup(actual),
+        'burn_rate': rollup(burn_rate),
+        'projected': rollup(projected),
+    }
+    with np.errstate(divide='ignore', invalid='ignore'):
+        journeys['ratio'] = np.where(journeys['expected'] > 0, journeys['actual'] / journeys['expected'], np.nan)
+
+    return {
+        'step_id': steps['step_id'], 'journey_id': steps['journey_id'], 'budget': steps['budget'],
+        'flight_days': flight, 'elapsed_days': elapsed, 'remaining_days': remaining,
+        'expected': expected, 'actual': actual, 'burn_rate': burn_rate, 'projected': projected,
+        'ratio': ratio, 'status': status, 'journeys': journeys,
+    }
+
+
+def _ratio_list(values):
+    return [None if v != v else v for v in np.round(values, 4).tolist()]  # NaN -> None
+
+
+def _money_list(values):
+    return np.round(values, 2).tolist()
+
+
+def step_pacing_rows(result, order=None):
+    """Converte os arrays do resultado em dicts (uma linha por passo), na ordem pedida."""
+    order = np.arange(len(result['step_id'])) if order is None else order
+    columns = zip(
+        result['step_id'][order].tolist(), result['journey_id'][order].tolist(),
+        _money_list(result['budget'][order]), _money_list(result['expected'][order]),
+        _money_list(result['actual'][order]), _money_list(result['burn_rate'][order]),
+        _money_list(result['projected'][order]), _ratio_list(result['ratio'][order]),
+        result['status'][order].tolist(), result['elapsed_days'][order].tolist(),
+        result['remaining_days'][order].tolist(),
+    )
+    return [{
+        'step_id': step_id, 'journey_id': journey_id, 'budget': budget,
+        'expected_spend': expected, 'actual_spend': actual, 'burn_rate': burn_rate,
+        'projected_spend': projected, 'projected_variance': round(projected - budget, 2),
+        'pacing_ratio': ratio, 'status': status, 'elapsed_days': elapsed, 'remaining_days': remaining,
+    } for (step_id, journey_id, budget, expected, actual, burn_rate, projected, ratio, status,
+           elapsed, remaining) in columns]
+
+
+def journey_pacing_rows(result):
+    journeys = result['journeys']
+    columns = zip(
+        journeys['journey_id'].tolist(), journeys['steps'].tolist(), _money_list(journeys['budget']),
+        _money_list(journeys['expected']), _money_list(journeys['actual']),
+        _money_list(journeys['burn_rate']), _money_list(journeys['projected']), _ratio_list(journeys['ratio']),
+    )
+    return [{
+        'journey_id': journey_id, 'active_steps': count, 'budget': budget, 'expected_spend': expected,
+        'actual_spend': actual, 'burn_rate': burn_rate, 'projected_spend': projected,
+        'projected_variance': round(projected - budget, 2), 'pacing_ratio': ratio,
+    } for journey_id, count, budget, expected, actual, burn_rate, projected, ratio in columns]
+
+
+def pacing_report(as_of=None, journey_id=None, step_id=None, status=None, limit=None,
+                  window_days=DEFAULT_WINDOW_DAYS, tolerance=DEFAULT_TOLERANCE):
+    """Pacing dos passos ativos e totais por jornada em as_of (padrão: hoje, UTC).
+
+    Os passos saem do mais fora do ritmo para o mais no ritmo (|pacing_ratio - 1|);
+    limit=0 devolve só as contagens e os totais por jornada.
+    """
+    as_of = as_of or datetime.datetime.now(datetime.timezone.utc).date()
+    steps, costs = load_pacing_inputs(as_of, journey_id=journey_id, step_id=step_id)
+    result = compute_pacing(steps, costs, as_of, window_days=window_days, tolerance=tolerance)
+
+    order = np.argsort(-np.nan_to_num(np.abs(result['ratio'] - 1), nan=-1.0), kind='stable')
+    if status is not None:
+        order = order[result['status'][order] == status]
+    counts = {name: int((result['status'] == name).sum()) for name in PACING_STATUSES}
+    return {
+        'as_of': as_of,
+        'window_days': window_days,
+        'tolerance': tolerance,
+        'counts': counts,
+        'steps': step_pacing_rows(result, order[:limit] if limit is not None else order),
+        'journeys': journey_pacing_rows(result),
+    }
+
+
+def pacing_curve(step_id, as_of=None):
+    """Curvas diárias acumuladas de gasto esperado x realizado de um passo (voo inteiro).
+
+    Retorna None se o passo não tiver orçamento e datas de voo.
+    """
+    as_of = as_of or datetime.datetime.now(datetime.timezone.utc).date()
+    steps, costs = load_pacing_inputs(as_of, step_id=step_id, active_only=False)
+    if not len(steps['step_id']):
+        return None
+    start, end, budget = steps['start'][0], steps['end'][0], steps['budget'][0]
+    flight = int(end - start + 1)
+    today = _days([as_of])[0]
+
+    # Array de diferenças: cada custo soma seu valor diário do primeiro ao último dia dentro do voo
+    cost_days = costs['end'] - costs['start'] + 1
+    daily = costs['value'] / cost_days
+    first = np.clip(costs['start'] - start, 0, flight)
+    last = np.clip(costs['end'] - start + 1, 0, flight)
+    diff = np.zeros(flight + 1)
+    np.add.at(diff, first, daily)
+    np.add.at(diff, last, -daily)
+    before_flight = (daily * np.clip(np.minimum(costs['end'], start - 1) - costs['start'] + 1, 0, None)).sum()
+    actual = before_flight + np.cumsum(np.cumsum(diff[:-1]))
+    expected = budget * np.arange(1, flight + 1) / flight
+
+    days = np.arange(start, end + 1)
+    actual_list = _money_list(actual)
+    visible = int(np.clip(today - start + 1, 0, flight))
+    return {
+        'step_id': step_id,
+        'as_of': as_of,
+        'budget': round(float(budget), 2),
+        'dates': days.astype('datetime64[D]').astype(str).tolist(),
+        'expected': _money_list(expected),
+        'actual': actual_list[:visible] + [None] * (flight - visible),
+    }
+
+
+SNAPSHOT_COLUMNS = ('step_id', 'journey_id', 'budget', 'expected_spend', 'actual_spend', 'burn_rate',
+                    'projected_spend', 'pacing_ratio', 'status')
+
+def _snapshot_columns(result):
+    return {
+        'step_id': result['step_id'].tolist(),
+        'journey_id': result['journey_id'].tolist(),
+        'budget': _money_list(result['budget']),
+        'expected_spend': _money_list(result['expected']),
+        'actual_spend': _money_list(result['actual']),
+        'burn_rate': _money_list(result['burn_rate']),
+        'projected_spend': _money_list(result['projected']),
+        'pacing_ratio': _ratio_list(result['ratio']),
+        'status': result['status'].tolist(),
+    }
+
+
+def _copy_snapshot(columns, as_of):
+    """PostgreSQL: grava o retrato com COPY FROM STDIN (psycopg2), na transação da sessão.
+
+    Com 100k passos, INSERTs em lote gastam a maior parte do tempo em parse e
+    planejamento por statement; o COPY fica limitado às checagens de FK.
+    """
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    as_of_text = as_of.isoformat()
+    writer.writerows((as_of_text, *values) for values in zip(*(columns[name] for name in SNAPSHOT_COLUMNS)))
+    buffer.seek(0)
+    cursor = db.session.connection().connection.dbapi_connection.cursor()
+    try:
+        cursor.copy_expert(f"COPY step_pacing (as_of, {', '.join(SNAPSHOT_COLUMNS)}) FROM STDIN WITH (FORMAT csv)",
+                           buffer)
+    finally:
+        cursor.close()
+
+
+def save_pacing_snapshot(as_of=None, window_days=DEFAULT_WINDOW_DAYS, tolerance=DEFAULT_TOLERANCE):
+    """Recalcula o pacing de todos os passos ativos e substitui a tabela step_pacing.
+
+    Uma transação: apaga o retrato anterior e grava o novo com um INSERT em massa.
+    Retorna contagens por status e o tempo de cada fase.
+    """
+    as_of = as_of or datetime.datetime.now(datetime.timezone.utc).date()
+    timings = {}
+    started = time.perf_counter()
+    steps, costs = load_pacing_inputs(as_of)
+    timings['load'] = time.perf_counter() - started
+
+    started = time.perf_counter()
+    result = compute_pacing(steps, costs, as_of, window_days=window_days, tolerance=tolerance)
+    columns = _snapshot_columns(result)
+    timings['compute'] = time.perf_counter() - started
+
+    started = time.perf_counter()
+    db.session.execute(delete(StepPacing))
+    if columns['step_id']:
+        if db.session.get_bind().dialect.name == 'postgresql':
+            _copy_snapshot(columns, as_of)
+        else:
+            db.session.execute(insert(StepPacing), [
+                {'as_of': as_of, **dict(zip(SNAPSHOT_COLUMNS, values))}
+                for values in zip(*(columns[name] for name in SNAPSHOT_COLUMNS))
+            ])
+    db.session.commit()
+    timings['save'] = time.perf_counter() - started
+
+    return {
+        'as_of': as_of,
+        'steps': len(columns['step_id']),
+        'costs': len(costs['step_id']),
+        'counts': {name: int((result['status'] == name).sum()) for name in PACING_STATUSES},
+        'seconds': {phase: round(value, 3) for phase, value in timings.items()},
+    }
+
+
+def pacing_snapshot(journey_id=None, status=None, limit=None):
+    """Lê o último retrato gravado por save_pacing_snapshot (sem recalcular)."""
+    query = select(StepPacing)
+    if journey_id is not None:
+        query = query.where(StepPacing.journey_id == journey_id)
+    if status is not None:
+        query = query.where(StepPacing.status == status)
+    query = query.order_by(func.abs(func.coalesce(StepPacing.pacing_ratio, 1.0) - 1).desc(), StepPacing.step_id)
+    if limit:
+        query = query.limit(limit)
+    return [{
+        'step_id': row.step_id, 'journey_id': row.journey_id, 'as_of': row.as_of, 'budget': row.budget,
+        'expected_spend': row.expected_spend, 'actual_spend': row.actual_spend, 'burn_rate': row.burn_rate,
+        'projected_spend': row.projected_spend, 'projected_variance': row.projected_spend - row.budget,
+        'pacing_ratio': row.pacing_ratio, 'status': row.status, 'computed_at': row.computed_at,
+    } for row in db.session.scalars(query)]
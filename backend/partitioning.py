@@ -0,0 +1,322 @@
+# backend/partitioning.py
+# Particionamento declarativo (PostgreSQL) da tabela costs, opcional
+#
+# costs pode ser particionada por HASH(step_id): todos os custos de um passo
+# ficam na mesma partição, consultas por step_id (detalhe do passo, canvas,
+# rollups, upsert da importação) leem só a partição dele, e índices e VACUUM
+# passam a trabalhar em tabelas N vezes menores. A conversão é online:
+#   1. cria costs_rebuild (já particionada) com as mesmas colunas, coluna gerada,
+#      índices e FKs de costs;
+#   2. um trigger em costs espelha INSERT/UPDATE/DELETE na tabela nova;
+#   3. backfill em lotes curtos (um commit por lote, FOR SHARE nas linhas do lote);
+#   4. confere contagem/somas nas duas tabelas no mesmo snapshot;
+#   5. troca os nomes sob um ACCESS EXCLUSIVE curto (lock_timeout + novas tentativas).
+# O mesmo caminho desfaz o particionamento (partitions=0).
+#
+# A chave primária vira (id, step_id) — o PostgreSQL exige a chave de partição em
+# todo índice único —, mas id continua vindo da mesma sequence e o modelo Cost
+# (backend/models.py) não muda. Só hash por step_id mantém uq_costs_natural_key,
+# usada pelo ON CONFLICT da importação (cost_import.NATURAL_KEY); range por
+# occoured_at exigiria tirar essa unicidade, e particionar steps quebraria as FKs
+# que apontam para steps.id.
+
+import re
+import time
+
+from sqlalchemy import text
+
+COSTS_TABLE = 'costs'
+PARTITION_KEY = 'step_id'
+MAX_PARTITIONS = 256
+REBUILD_TABLE = 'costs_rebuild'
+OLD_TABLE = 'costs_unpartitioned'  # tabela anterior, mantida com --keep-old
+SYNC_FUNCTION = 'costs_rebuild_sync'
+SWAP_LOCK_TIMEOUT = '3s'
+SWAP_ATTEMPTS = 5
+
+# Nomes das partições: costs_h<módulo>_<resto> (não colidem entre layouts diferentes)
+PARTITION_NAME = re.compile(r'^costs_h\d+_\d+$')
+
+_INDEX_DEF = re.compile(r'^(CREATE (?:UNIQUE )?INDEX) (\S+) ON (?:ONLY )?(\S+) (USING .*)$')
+
+
+class PartitioningError(RuntimeError):
+    """Conversão de layout impossível ou interrompida (nada foi trocado)."""
+
+
+def include_in_migrations(obj, name, type_, reflected, compare_to):
+    """include_object do Alembic: as partições e a tabela antiga ficam fora dos modelos."""
+    if type_ == 'table' and reflected and compare_to is None:
+        return not (PARTITION_NAME.match(name) or name in (REBUILD_TABLE, OLD_TABLE))
+    return True
+
+
+def _require_postgresql(bind):
+    if bind.dialect.name != 'postgresql':
+        raise PartitioningError(f'Particionamento disponível só no PostgreSQL (dialeto {bind.dialect.name!r})')
+
+
+def costs_layout(connection):
+    """Layout atual de costs: {'partitions': N (0 = tabela comum), 'tables': [(nome, linhas estimadas, bytes)]}."""
+    _require_postgresql(connection)
+    modulus = connection.execute(text("""
+        SELECT count(*) FROM pg_inherits WHERE inhparent = CAST(:table AS regclass)
+    """), {'table': COSTS_TABLE}).scalar()
+    tables = connection.execute(text("""
+        SELECT c.relname, c.reltuples::bigint, pg_total_relation_size(c.oid)
+        FROM pg_class c
+        WHERE c.oid = CAST(:table AS regclass)
+           OR c.oid IN (SELECT inhrelid FROM pg_inherits WHERE inhparent = CAST(:table AS regclass))
+        ORDER BY c.relname
+    """), {'table': COSTS_TABLE}).all()
+    return {'partitions': modulus, 'tables': [tuple(row) for row in tables]}
+
+
+def _columns(connection):
+    # Colunas graváveis (a coluna gerada search_vector é recalculada pelo banco)
+    return connection.execute(text("""
+        SELECT attname FROM pg_attribute
+        WHERE attrelid = CAST(:table AS regclass) AND attnum > 0 AND NOT attisdropped AND attgenerated = ''
+        ORDER BY attnum
+    """), {'table': COSTS_TABLE}).scalars().all()
+
+
+def _indexes(connection, table):
+    """[(nome, definição)] dos índices de 'table', exceto o da chave primária."""
+    return connection.execute(text("""
+        SELECT i.relname, pg_get_indexdef(i.oid)
+        FROM pg_index x JOIN pg_class i ON i.oid = x.indexrelid
+        WHERE x.indrelid = CAST(:table AS regclass) AND NOT x.indisprimary
+        ORDER BY i.relname
+    """), {'table': table}).all()
+
+
+def _constraints(connection, table, kinds):
+    return connection.execute(text("""
+        SELECT conname, pg_get_constraintdef(oid) FROM pg_constraint
+        WHERE conrelid = CAST(:table AS regclass) AND contype = ANY(:kinds)
+        ORDER BY conname
+    """), {'table': table, 'kinds': list(kinds)}).all()
+
+
+def _quote(name):
+    return '"' + name.replace('"', '""') + '"'
+
+
+def _drop_leftovers(connection):
+    # Restos de uma conversão interrompida antes da troca
+    connection.exec_driver_sql(f'DROP TRIGGER IF EXISTS {SYNC_FUNCTION} ON {COSTS_TABLE}')
+    connection.exec_driver_sql(f'DROP FUNCTION IF EXISTS {SYNC_FUNCTION}()')
+    connection.exec_driver_sql(f'DROP TABLE IF EXISTS {REBUILD_TABLE}')
+
+
+def _create_rebuild_table(connection, partitions, columns):
+    partition_clause = f' PARTITION BY HASH ({PARTITION_KEY})' if partitions else ''
+    connection.exec_driver_sql(
+        f'CREATE TABLE {REBUILD_TABLE} (LIKE {COSTS_TABLE} INCLUDING DEFAULTS INCLUDING GENERATED '
+        f'INCLUDING CONSTRAINTS INCLUDING STORAGE INCLUDING COMMENTS){partition_clause}'
+    )
+    for remainder in range(partitions):
+        connection.exec_driver_sql(
+            f'CREATE TABLE costs_h{partitions}_{remainder} PARTITION OF {REBUILD_TABLE} '
+            f'FOR VALUES WITH (MODULUS {partitions}, REMAINDER {remainder})'
+        )
+    primary_key = f'id, {PARTITION_KEY}' if partitions else 'id'
+    connection.exec_driver_sql(
+        f'ALTER TABLE {REBUILD_TABLE} ADD CONSTRAINT {REBUILD_TABLE}_pkey PRIMARY KEY ({primary_key})'
+    )
+    # Índices e FKs recriados a partir das definições atuais, com nomes provisórios
+    for name, definition in _indexes(connection, COSTS_TABLE):
+        create, _name, _table, rest = _INDEX_DEF.match(definition).groups()
+        connection.exec_driver_sql(f'{create} {_quote(name + "__rebuild")} ON {REBUILD_TABLE} {rest}')
+    for name, definition in _constraints(connection, COSTS_TABLE, 'f'):
+        connection.exec_driver_sql(
+            f'ALTER TABLE {REBUILD_TABLE} ADD CONSTRAINT {_quote(name + "__rebuild")} {definition}'
+        )
+    # Espelho das escritas em costs enquanto o backfill roda
+    column_list = ', '.join(_quote(column) for column in columns)
+    values = ', '.join(f'NEW.{_quote(column)}' for column in columns)
+    connection.exec_driver_sql(f"""
+        CREATE FUNCTION {SYNC_FUNCTION}() RETURNS trigger LANGUAGE plpgsql AS $$
+        BEGIN
+            IF TG_OP IN ('UPDATE', 'DELETE') THEN
+                DELETE FROM {REBUILD_TABLE} WHERE id = OLD.id AND {PARTITION_KEY} = OLD.{PARTITION_KEY};
+            END IF;
+            IF TG_OP IN ('INSERT', 'UPDATE') THEN
+                INSERT INTO {REBUILD_TABLE} ({column_list}) VALUES ({values});
+            END IF;
+            RETURN NULL;
+        END $$
+    """)
+    # CREATE TRIGGER espera as escritas em andamento: depois do commit, toda escrita passa pelo espelho
+    connection.exec_driver_sql(
+        f'CREATE TRIGGER {SYNC_FUNCTION} AFTER INSERT OR UPDATE OR DELETE ON {COSTS_TABLE} '
+        f'FOR EACH ROW EXECUTE FUNCTION {SYNC_FUNCTION}()'
+    )
+
+
+def _backfill(engine, columns, batch_size, echo):
+    column_list = ', '.join(_quote(column) for column in columns)
+    # FOR SHARE: um UPDATE concorrente em uma linha do lote espera o commit do lote,
+    # e o trigger dele então corrige a cópia
+    statement = text(f"""
+        INSERT INTO {REBUILD_TABLE} ({column_list})
+        SELECT {column_list} FROM {COSTS_TABLE} WHERE id > :low AND id <= :high FOR SHARE
+        ON CONFLICT DO NOTHING
+    """)
+    with engine.connect() as connection:
+        low, last = connection.execute(text(f'SELECT min(id) - 1, max(id) FROM {COSTS_TABLE}')).one()
+    copied = 0
+    started = time.perf_counter()
+    while low is not None and low < last:
+        high = low + batch_size
+        with engine.begin() as connection:
+            copied += connection.execute(statement, {'low': low, 'high': high}).rowcount
+        low = high
+        if echo:
+            echo(f'  backfill: {copied} linhas copiadas (id <= {min(high, last)} de {last}), '
+                 f'{time.perf_counter() - started:.1f} s')
+    return copied
+
+
+def _verify(engine):
+    # Mesmo snapshot para as duas tabelas (o trigger escreve nas duas na mesma transação)
+    summary = 'count(*), coalesce(sum(id), 0), coalesce(sum({key}), 0), coalesce(sum(value), 0)'.format(
+        key=PARTITION_KEY)
+    with engine.connect() as connection:
+        connection = connection.execution_options(isolation_level='REPEATABLE READ')
+        with connection.begin():
+            source = connection.execute(text(f'SELECT {summary} FROM {COSTS_TABLE}')).one()
+            target = connection.execute(text(f'SELECT {summary} FROM {REBUILD_TABLE}')).one()
+    if tuple(source) != tuple(target):
+        raise PartitioningError(f'Cópia divergente: {COSTS_TABLE}={tuple(source)} {REBUILD_TABLE}={tuple(target)}')
+    return source[0]
+
+
+def _swap(connection, keep_old):
+    connection.exec_driver_sql(f"SET LOCAL lock_timeout = '{SWAP_LOCK_TIMEOUT}'")
+    connection.exec_driver_sql(f'LOCK TABLE {COSTS_TABLE} IN ACCESS EXCLUSIVE MODE')
+    connection.exec_driver_sql(f'DROP TRIGGER {SYNC_FUNCTION} ON {COSTS_TABLE}')
+    connection.exec_driver_sql(f'DROP FUNCTION {SYNC_FUNCTION}()')
+    connection.exec_driver_sql(f'DROP TABLE IF EXISTS {OLD_TABLE}')
+    old_indexes = [name for name, _definition in _indexes(connection, COSTS_TABLE)]
+    old_constraints = [name for name, _definition in _constraints(connection, COSTS_TABLE, 'pf')]
+    connection.exec_driver_sql(f'ALTER TABLE {COSTS_TABLE} RENAME TO {OLD_TABLE}')
+    for name in old_constraints:
+        connection.exec_driver_sql(f'ALTER TABLE {OLD_TABLE} RENAME CONSTRAINT {_quote(name)} TO {_quote(name + "__old")}')
+    for name in old_indexes:
+        connection.exec_driver_sql(f'ALTER INDEX {_quote(name)} RENAME TO {_quote(name + "__old")}')
+    # Nomes definitivos na tabela nova (os mesmos de backend/models.py e das migrações)
+    connection.exec_driver_sql(f'ALTER TABLE {REBUILD_TABLE} RENAME TO {COSTS_TABLE}')
+    connection.exec_driver_sql(f'ALTER TABLE {COSTS_TABLE} RENAME CONSTRAINT {REBUILD_TABLE}_pkey TO {COSTS_TABLE}_pkey')
+    for name, _definition in _constraints(connection, COSTS_TABLE, 'f'):
+        connection.exec_driver_sql(
+            f'ALTER TABLE {COSTS_TABLE} RENAME CONSTRAINT {_quote(name)} TO {_quote(name.removesuffix("__rebuild"))}')
+    for name, _definition in _indexes(connection, COSTS_TABLE):
+        connection.exec_driver_sql(f'ALTER INDEX {_quote(name)} RENAME TO {_quote(name.removesuffix("__rebuild"))}')
+    connection.exec_driver_sql(f"ALTER SEQUENCE {COSTS_TABLE}_id_seq OWNED BY {COSTS_TABLE}.id")
+    if not keep_old:
+        connection.exec_driver_sql(f'DROP TABLE {OLD_TABLE}')
+
+
+def repartition_costs(engine, partitions, batch_size=5000, keep_old=False, echo=None):
+    """Converte costs para HASH(step_id) com 'partitions' partições (0 = tabela comum), online.
+
+    Retorna o número de linhas na tabela final. Com keep_old, a tabela anterior fica
+    como costs_unpartitioned (sem o espelho, só como cópia de segurança) até a próxima conversão.
+    """
+    _require_postgresql(engine)
+    if not 0 <= partitions <= MAX_PARTITIONS or partitions == 1:
+        raise PartitioningError(f'Quantidade de partições deve ser 0 ou de 2 a {MAX_PARTITIONS}')
+    with engine.begin() as connection:
+        if costs_layout(connection)['partitions'] == partitions:
+            if echo:
+                echo(f'{COSTS_TABLE} já está com {partitions} partições; nada a fazer.')
+            return None
+        triggers = connection.execute(text("""
+            SELECT tgname FROM pg_trigger
+            WHERE tgrelid = CAST(:table AS regclass) AND NOT tgisinternal AND tgname <> :sync
+        """), {'table': COSTS_TABLE, 'sync': SYNC_FUNCTION}).scalars().all()
+        if triggers:
+            raise PartitioningError(f'{COSTS_TABLE} tem triggers próprios ({", ".join(triggers)}); recrie-os à mão')
+        _drop_leftovers(connection)
+        columns = _columns(connection)
+        _create_rebuild_table(connection, partitions, columns)
+    if echo:
+        echo(f'{REBUILD_TABLE} criada ({partitions or "sem"} partições); espelho de escritas ativo.')
+
+    try:
+        _backfill(engine, columns, batch_size, echo)
+        rows = _verify(engine)
+        for attempt in range(1, SWAP_ATTEMPTS + 1):
+            try:
+                with engine.begin() as connection:
+                    _swap(connection, keep_old)
+                break
+            except Exception as e:
+                # lock_timeout: consultas longas em costs; tenta de novo em vez de enfileirar todo mundo
+                if 'lock timeout' not in str(e) or attempt == SWAP_ATTEMPTS:
+                    raise
+                if echo:
+                    echo(f'  troca: lock não obtido em {SWAP_LOCK_TIMEOUT} (tentativa {attempt}); tentando de novo')
+                time.sleep(attempt)
+    except Exception:
+        with engine.begin() as connection:
+            _drop_leftovers(connection)
+        raise
+
+    with engine.begin() as connection:
+        connection.exec_driver_sql(f'ANALYZE {COSTS_TABLE}')
+    if echo:
+        echo(f'{COSTS_TABLE} trocada: {rows} linhas, {partitions or "sem"} partições.')
+    return rows
+
+
+# --- Verificação de partition pruning ---
+def _scanned_partitions(plan, partitions):
+    """Partições lidas no plano (EXPLAIN ANALYZE: nós com loops > 0)."""
+    scanned = set()
+    stack = [plan]
+    while stack:
+        node = stack.pop()
+        relation = node.get('Relation Name')
+        if relation in partitions and node.get('Actual Loops', 1) > 0:
+            scanned.add(relation)
+        stack.extend(node.get('Plans', ()))
+    return scanned
+
+
+# consulta de verificação -> (SQL, parâmetro); o máximo de partições lidas é checado em check_partition_pruning
+PRUNING_QUERIES = {
+    # Detalhe do passo, upsert da importação: poda no planejamento, uma partição
+    'step': (f'SELECT * FROM {COSTS_TABLE} WHERE step_id = :value', 'step_id'),
+    # Lista de passos (rollups.py): no máximo uma partição por passo
+    'steps': (f'SELECT * FROM {COSTS_TABLE} WHERE step_id = ANY(:value)', 'step_ids'),
+    # Jornada via JOIN (canvas, analytics): poda em execução só com nested loop; apenas informativo
+    'journey': (f'SELECT {COSTS_TABLE}.* FROM {COSTS_TABLE} JOIN steps ON steps.id = {COSTS_TABLE}.step_id '
+                f'WHERE steps.journey_id = :value', 'journey_id'),
+}
+
+
+def check_partition_pruning(connection, step_id, journey_id):
+    """Roda PRUNING_QUERIES com EXPLAIN ANALYZE e conta as partições lidas por consulta.
+
+    Retorna [{'query', 'scanned', 'allowed', 'partitions', 'ok'}]; allowed None = sem limite
+    (consulta informativa). Sem particionamento, ok é sempre True.
+    """
+    layout = costs_layout(connection)
+    partitions = {name for name, _rows, _size in layout['tables'] if name != COSTS_TABLE}
+    step_ids = connection.execute(
+        text('SELECT id FROM steps WHERE journey_id = :journey_id'), {'journey_id': journey_id}
+    ).scalars().all()
+    values = {'step_id': step_id, 'step_ids': step_ids, 'journey_id': journey_id}
+    allowed = {'step': 1, 'steps': max(1, min(len(step_ids), len(partitions))), 'journey': None}
+    results = []
+    for name, (sql, param) in PRUNING_QUERIES.items():
+        plan = connection.execute(text(f'EXPLAIN (ANALYZE, FORMAT JSON) {sql}'), {'value': values[param]}).scalar()
+        scanned = len(_scanned_partitions(plan[0]['Plan'], partitions))
+        results.append({
+            'query': name, 'scanned': scanned, 'allowed': allowed[name], 'partitions': len(partitions),
+            'ok': not partitions or allowed[name] is None or scanned <= allowed[name],
+        })
+    return results
@@ -0,0 +1,190 @@
+# backend/pool.py
+# Configuração do pool de conexões via variáveis de ambiente e métricas do pool
+
+import os
+import threading
+import time
+
+from sqlalchemy import event
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.pool import QueuePool
+
+# Perfis com valores padrão; qualquer valor pode ser sobrescrito pelas variáveis DB_*.
+# Conexões totais por instância = workers do gunicorn x (pool_size + max_overflow).
+POOL_PROFILES = {
+    'development': {
+        'pool_size': 5, 'max_overflow': 10, 'pool_timeout': 30, 'pool_recycle': 1800,
+        'statement_timeout_ms': 0, 'connect_timeout': 10,
+    },
+    # Render reinicia o banco sem aviso: pre_ping + recycle curto evitam conexões mortas
+    'production': {
+        'pool_size': 10, 'max_overflow': 5, 'pool_timeout': 10, 'pool_recycle': 300,
+        'statement_timeout_ms': 30000, 'connect_timeout': 5,
+    },
+    # PgBouncer em modo transaction: ele faz o pooling e a app mantém poucas conexões.
+    # PgBouncer recusa o parâmetro de startup 'options', então o statement_timeout
+    # deve ser definido no papel do banco (ALTER ROLE ... SET statement_timeout)
+    'pgbouncer': {
+        'pool_size': 5, 'max_overflow': 0, 'pool_timeout': 10, 'pool_recycle': 300,
+        'statement_timeout_ms': 0, 'connect_timeout': 5,
+    },
+}
+
+
+class InstrumentedQueuePool(QueuePool):
+    """QueuePool que mede o tempo de espera por uma conexão livre."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.wait_stats = {'count': 0, 'total': 0.0, 'max': 0.0, 'timeouts': 0}
+        self._wait_lock = threading.Lock()
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            return super()._do_get()
+        except PoolTimeoutError:
+            with self._wait_lock:
+                self.wait_stats['timeouts'] += 1
+            raise
+        finally:
+            waited = time.perf_counter() - started
+            with self._wait_lock:
+                self.wait_stats['count'] += 1
+                self.wait_stats['total'] += waited
+                self.wait_stats['max'] = max(self.wait_stats['max'], waited)
+
+    def recreate(self):
+        pool = super().recreate()
+        pool.wait_stats = self.wait_stats
+        return pool
+
+
+def _env(environ, name, default, cast=int):
+    value = environ.get(name)
+    if value is None or value == '':
+        return default
+    if cast is bool:
+        return value.strip().lower() in ('1', 'true', 'yes', 'on')
+    return cast(value)
+
+
+def engine_options_from_env(database_url, environ=None):
+    """Monta SQLALCHEMY_ENGINE_OPTIONS a partir de DB_POOL_PROFILE e das variáveis DB_*.
+
+    Variáveis: DB_POOL_PROFILE (development, production, pgbouncer), DB_POOL_SIZE,
+    DB_MAX_OVERFLOW, DB_POOL_TIMEOUT, DB_POOL_RECYCLE, DB_POOL_PRE_PING,
+    DB_STATEMENT_TIMEOUT_MS, DB_CONNECT_TIMEOUT e DB_APPLICATION_NAME.
+    """
+    environ = os.environ if environ is None else environ
+    profile_name = environ.get('DB_POOL_PROFILE', 'development')
+    if profile_name not in POOL_PROFILES:
+        raise ValueError(f"DB_POOL_PROFILE inválido: {profile_name!r}")
+    profile = POOL_PROFILES[profile_name]
+
+    options = {'pool_pre_ping': _env(environ, 'DB_POOL_PRE_PING', True, bool)}
+    if database_url.startswith('sqlite'):
+        # SQLite não tem servidor: mantém o pool padrão do SQLAlchemy
+        return options
+
+    options.update({
+        'poolclass': InstrumentedQueuePool,
+        'pool_size': _env(environ, 'DB_POOL_SIZE', profile['pool_size']),
+        'max_overflow': _env(environ, 'DB_MAX_OVERFLOW', profile['max_overflow']),
+        'pool_timeout': _env(environ, 'DB_POOL_TIMEOUT', profile['pool_timeout'], float),
+        'pool_recycle': _env(environ, 'DB_POOL_RECYCLE', profile['pool_recycle']),
+        'pool_use_lifo': True,  # Reaproveita as conexões quentes; as ociosas expiram pelo recycle
+    })
+
+    if database_url.startswith('postgresql'):
+        connect_args = {
+            'connect_timeout': _env(environ, 'DB_CONNECT_TIMEOUT', profile['connect_timeout']),
+            'application_name': environ.get('DB_APPLICATION_NAME', 'midaspipe'),
+            'keepalives': 1,
+            'keepalives_idle': 30,
+            'keepalives_interval': 10,
+            'keepalives_count': 3,
+        }
+        statement_timeout = _env(environ, 'DB_STATEMENT_TIMEOUT_MS', profile['statement_timeout_ms'])
+        if statement_timeout:
+            connect_args['options'] = f'-c statement_timeout={statement_timeout}'
+        options['connect_args'] = connect_args
+    return options
+
+
+class PoolMetrics:
+    """Contadores de eventos do pool (conexões, checkouts, invalidações) por engine.
+
+    O primário aparece como 'primary'; cada bind (réplicas de leitura) pelo nome do bind.
+    """
+
+    PRIMARY = 'primary'
+    COUNTERS = ('connects', 'checkouts', 'checkins', 'invalidations', 'soft_invalidations', 'closes')
+
+    def __init__(self):
+        self.counters = {}  # bind -> contadores
+        self.engines = {}  # bind -> engine
+        self._lock = threading.Lock()
+
+    def _inc(self, bind, name):
+        with self._lock:
+            self.counters[bind][name] += 1
+
+    def init_app(self, app):
+        """Liga as métricas a todos os engines da app: primário e binds (chamar depois de db.init_app)."""
+        from .extensions import db
+        with app.app_context():
+            for key, engine in db.engines.items():
+                self.attach(engine, self.PRIMARY if key is None else key)
+        app.extensions['pool_metrics'] = self
+
+    def attach(self, engine, bind=PRIMARY):
+        """Registra os listeners de eventos do pool no engine."""
+        with self._lock:
+            self.engines[bind] = engine
+            self.counters[bind] = dict.fromkeys(self.COUNTERS, 0)
+        listeners = {
+            'connect': 'connects', 'checkout': 'checkouts', 'checkin': 'checkins',
+            'invalidate': 'invalidations', 'soft_invalidate': 'soft_invalidations', 'close': 'closes',
+        }
+        for event_name, counter in listeners.items():
+            event.listen(engine, event_name, lambda *args, _b=bind, _c=counter: self._inc(_b, _c))
+
+    def snapshot(self):
+        """Estado atual do pool e contadores acumulados desde o boot do processo.
+
+        O primário fica no nível de cima (formato original); os demais engines em 'binds'.
+        """
+        data = self._engine_snapshot(self.PRIMARY)
+        binds = {bind: self._engine_snapshot(bind) for bind in self.engines if bind != self.PRIMARY}
+        if binds:
+            data['binds'] = binds
+        return data
+
+    def _engine_snapshot(self, bind):
+        with self._lock:
+            data = {'counters': dict(self.counters.get(bind) or dict.fromkeys(self.COUNTERS, 0))}
+        engine = self.engines.get(bind)
+        if engine is None:
+            return data
+        pool = engine.pool
+        data['pool_class'] = type(pool).__name__
+        if isinstance(pool, QueuePool):
+            data.update({
+                'size': pool.size(),
+                'checked_out': pool.checkedout(),
+                'checked_in': pool.checkedin(),
+                'overflow': pool.overflow(),
+                'max_overflow': pool._max_overflow,
+                'timeout': pool.timeout(),
+            })
+        wait_stats = getattr(pool, 'wait_stats', None)
+        if wait_stats is not None:
+            count = wait_stats['count']
+            data['wait'] = {
+                'count': count,
+                'avg_ms': round(wait_stats['total'] / count * 1000, 3) if count else 0.0,
+                'max_ms': round(wait_stats['max'] * 1000, 3),
+                'timeouts': wait_stats['timeouts'],
+            }
+        return data
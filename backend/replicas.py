@@ -0,0 +1,248 @@
+# backend/replicas.py
+# Réplicas de leitura: os GETs da API vão para réplicas, o resto para o primário
+#
+# - DATABASE_REPLICA_URLS (separadas por vírgula) vira um bind 'replica_N' do
+#   Flask-SQLAlchemy por réplica, com as mesmas opções de pool (DB_*) do primário.
+# - RoutingSession.get_bind devolve o engine da réplica escolhida para a requisição;
+#   flush (escrita) sempre usa o primário.
+# - O decorator route_reads, aplicado a todos os Resources do Flask-RESTX, escolhe a
+#   réplica (round-robin) só em GET/HEAD. Se a leitura falhar na réplica, a requisição é
+#   refeita no primário e a réplica fica fora por REPLICA_RETRY_SECONDS.
+# - Read-your-writes: uma requisição que fez commit devolve o header X-DB-Primary-Until
+#   (e o cookie db_primary_until, para clientes na mesma origem); enquanto ele valer
+#   (REPLICA_READ_YOUR_WRITES_SECONDS), os GETs que o reenviarem leem do primário e
+#   enxergam a própria escrita mesmo com a réplica atrasada. O frontend roda em outra
+#   origem e faz fetch sem credenciais, então o cookie não volta: ele guarda o header e o
+#   reenvia nas requisições seguintes (frontend/src/api.ts); o CORS expõe o header.
+# - Com REPLICA_MAX_LAG_SECONDS (PostgreSQL), o atraso de replay de cada réplica é
+#   medido a cada REPLICA_CHECK_SECONDS e réplicas atrasadas demais ficam de fora.
+# Respostas lidas de réplica não são gravadas no cache de respostas: uma réplica
+# atrasada poderia guardar dados antigos sob a geração nova de uma chave.
+
+import functools
+import threading
+import time
+
+from flask import g, has_request_context, request
+from flask_sqlalchemy.session import Session
+from sqlalchemy import event, text
+from sqlalchemy.exc import DBAPIError, InterfaceError, OperationalError
+from sqlalchemy.engine import make_url
+
+from .pool import engine_options_from_env
+
+REPLICA_BIND_PREFIX = 'replica_'
+READ_METHODS = ('GET', 'HEAD')
+STICKY_COOKIE = 'db_primary_until'
+STICKY_HEADER = 'X-DB-Primary-Until'
+# Erros de conexão: a réplica sai na hora. Outros erros do banco (ex.: tabela ausente numa
+# réplica sem a última migração) só tiram a réplica se a mesma leitura funcionar no primário.
+REPLICA_ERRORS = (OperationalError, InterfaceError)
+
+# Atraso de replay de um standby; 0 quando tudo que chegou já foi aplicado ou fora de recovery
+_LAG_QUERY = text("""
+    SELECT CASE WHEN NOT pg_is_in_recovery() OR pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+                ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0) END
+""")
+
+
+def parse_replica_urls(value):
+    """Lista de URLs a partir de DATABASE_REPLICA_URLS (vírgulas; postgres:// vira postgresql://)."""
+    urls = []
+    for url in (value or '').split(','):
+        url = url.strip()
+        if url.startswith('postgres://'):
+            url = url.replace('postgres://', 'postgresql://', 1)
+        if url:
+            urls.append(url)
+    return urls
+
+
+def replica_binds(urls):
+    """SQLALCHEMY_BINDS com um engine por réplica, com as mesmas opções de pool do primário."""
+    return {f'{REPLICA_BIND_PREFIX}{n}': {'url': url, **engine_options_from_env(url)}
+            for n, url in enumerate(urls, 1)}
+
+
+class RoutingSession(Session):
+    """Sessão do Flask-SQLAlchemy que lê da réplica escolhida para a requisição."""
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is None and not self._flushing and has_request_context():
+            replica = g.get('_db_replica')
+            if replica is not None:
+                return replica.engine
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+
+class Replica:
+    def __init__(self, name, engine):
+        self.name = name
+        self.engine = engine
+        self.down_until = 0.0
+        self.next_check = 0.0
+        self.lag_seconds = None
+        self.reads = 0
+        self.failures = 0
+        self.last_error = None
+
+    def available(self, now):
+        return now >= self.down_until
+
+    def as_dict(self, now):
+        return {
+            'name': self.name,
+            'url': make_url(self.engine.url).render_as_string(hide_password=True),
+            'healthy': self.available(now),
+            'retry_in_seconds': round(max(0.0, self.down_until - now), 1),
+            'lag_seconds': self.lag_seconds,
+            'reads': self.reads,
+            'failures': self.failures,
+            'last_error': self.last_error,
+        }
+
+
+class ReplicaRouter:
+    """Extensão que distribui os GETs da API entre as réplicas configuradas.
+
+    Configuração: DATABASE_REPLICA_URLS (vazio = sem réplicas, tudo no primário),
+    REPLICA_READ_YOUR_WRITES_SECONDS (padrão 5), REPLICA_RETRY_SECONDS (padrão 30),
+    REPLICA_MAX_LAG_SECONDS (padrão 0 = não mede) e REPLICA_CHECK_SECONDS (padrão 10).
+    """
+
+    def __init__(self):
+        self.replicas = []
+        self.read_your_writes_seconds = 5.0
+        self.retry_seconds = 30.0
+        self.max_lag_seconds = 0.0
+        self.check_seconds = 10.0
+        self._next = 0
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        """Liga o roteamento (chamar depois de db.init_app e antes de registrar os namespaces)."""
+        from .extensions import db, response_cache, rest_api
+
+        self.read_your_writes_seconds = float(app.config.setdefault('REPLICA_READ_YOUR_WRITES_SECONDS', 5))
+        self.retry_seconds = float(app.config.setdefault('REPLICA_RETRY_SECONDS', 30))
+        self.max_lag_seconds = float(app.config.setdefault('REPLICA_MAX_LAG_SECONDS', 0))
+        self.check_seconds = float(app.config.setdefault('REPLICA_CHECK_SECONDS', 10))
+        binds = sorted(key for key in app.config.get('SQLALCHEMY_BINDS') or {}
+                       if key.startswith(REPLICA_BIND_PREFIX))
+        with app.app_context():
+            self.replicas = [Replica(key, db.engines[key]) for key in binds]
+        self._next = 0
+        app.extensions['replica_router'] = self
+        response_cache.read_only = None
+        if not self.replicas:
+            return
+
+        # Decorators do Api valem para os Resources registrados depois (add_namespace)
+        if self.route_reads not in rest_api.decorators:
+            rest_api.decorators.append(self.route_reads)
+        if not event.contains(db.session, 'after_commit', self._after_commit):
+            event.listen(db.session, 'after_commit', self._after_commit)
+        app.after_request(self._set_sticky)
+        response_cache.read_only = self.serving_from_replica
+
+    # --- Escolha da réplica ---
+    def _wants_primary(self):
+        if request.method not in READ_METHODS:
+            return True
+        try:
+            until = float(request.headers.get(STICKY_HEADER) or request.cookies.get(STICKY_COOKIE, 0))
+        except ValueError:
+            return False
+        # O valor vem do cliente: só vale dentro da janela que o próprio backend emitiria
+        # (now + read_your_writes_seconds, +1s de folga para relógios entre hosts), senão um
+        # header forjado prenderia as leituras no primário indefinidamente
+        now = time.time()
+        return now < until <= now + self.read_your_writes_seconds + 1
+
+    def choose(self):
+        """Réplica para a requisição atual, ou None para usar o primário."""
+        if not self.replicas or self._wants_primary():
+            return None
+        now = time.monotonic()
+        with self._lock:
+            for _ in range(len(self.replicas)):
+                replica = self.replicas[self._next % len(self.replicas)]
+                self._next += 1
+                if replica.available(now):
+                    break
+            else:
+                return None
+        if self.max_lag_seconds and now >= replica.next_check:
+            self._check_lag(replica, now)
+        return replica if replica.available(now) else None
+
+    def _check_lag(self, replica, now):
+        replica.next_check = now + self.check_seconds
+        if replica.engine.dialect.name != 'postgresql':
+            return
+        try:
+            with replica.engine.connect() as connection:
+                replica.lag_seconds = round(float(connection.execute(_LAG_QUERY).scalar()), 3)
+        except REPLICA_ERRORS as e:
+            self.mark_down(replica, e)
+            return
+        if replica.lag_seconds > self.max_lag_seconds:
+            # Fica fora até a próxima medição
+            replica.down_until = max(replica.down_until, replica.next_check)
+            replica.last_error = f'atraso de {replica.lag_seconds:.1f} s (máx. {self.max_lag_seconds:g} s)'
+
+    def mark_down(self, replica, error):
+        with self._lock:
+            replica.down_until = time.monotonic() + self.retry_seconds
+            replica.failures += 1
+            replica.last_error = f'{type(error).__name__}: {str(error).splitlines()[0][:200]}'
+
+    def route_reads(self, view):
+        """Decorator dos Resources: GET/HEAD na réplica, com fallback para o primário."""
+        @functools.wraps(view)
+        def wrapper(*args, **kwargs):
+            replica = self.choose()
+            if replica is None:
+                return view(*args, **kwargs)
+            from .extensions import db
+
+            g._db_replica = replica
+            try:
+                response = view(*args, **kwargs)
+                replica.reads += 1
+                return response
+            except DBAPIError as e:
+                db.session.rollback()
+                g._db_replica = None
+                if isinstance(e, REPLICA_ERRORS):
+                    self.mark_down(replica, e)
+                    return view(*args, **kwargs)
+                response = view(*args, **kwargs)
+                self.mark_down(replica, e)  # Falhou só na réplica
+                return response
+            finally:
+                g.pop('_db_replica', None)
+        return wrapper
+
+    def serving_from_replica(self):
+        return has_request_context() and g.get('_db_replica') is not None
+
+    # --- Read-your-writes ---
+    def _after_commit(self, session):
+        if has_request_context():
+            g._db_committed = True
+
+    def _set_sticky(self, response):
+        if self.replicas and self.read_your_writes_seconds and g.pop('_db_committed', False):
+            until = f'{time.time() + self.read_your_writes_seconds:.3f}'
+            response.headers[STICKY_HEADER] = until
+            response.set_cookie(STICKY_COOKIE, until,
+                                max_age=int(self.read_your_writes_seconds) + 1, httponly=True, samesite='Lax')
+        return response
+
+    def status(self):
+        now = time.monotonic()
+        return {'replicas': [replica.as_dict(now) for replica in self.replicas],
+                'read_your_writes_seconds': self.read_your_writes_seconds,
+                'retry_seconds': self.retry_seconds,
+                'max_lag_seconds': self.max_lag_seconds}
@@ -0,0 +1,188 @@
+# backend/rollups.py
+# Manutenção incremental da tabela cost_rollups (gasto por passo e cost_type)
+#
+# Inserções, alterações e remoções de Cost feitas pela sessão do ORM são
+# convertidas em deltas no after_flush e aplicadas com um UPSERT por chave
+# (step_id, cost_type), na mesma transação. Caminhos em massa que não passam
+# pelo ORM (insert(Cost) com executemany, importações) devem chamar
+# apply_cost_deltas() com seus próprios deltas ou rebuild_cost_rollups().
+
+from collections import defaultdict
+from decimal import Decimal
+
+from sqlalchemy import delete, event, func, inspect, literal, select, update
+from sqlalchemy.dialects import postgresql, sqlite
+
+from .extensions import db
+from .models import Cost, CostRollup, Step
+
+UPSERT_DIALECTS = {'postgresql': postgresql.insert, 'sqlite': sqlite.insert}
+
+
+def _old_and_new(state, attr):
+    """Retorna (valor antigo, valor novo) de um atributo a partir do histórico."""
+    history = state.attrs[attr].history
+    new = history.added[0] if history.added else state.attrs[attr].value
+    old = history.deleted[0] if history.deleted else (None if history.added else new)
+    return old, new
+
+
+def collect_cost_deltas(session):
+    """Agrupa os Custos pendentes do flush em {(step_id, cost_type): [delta_total, delta_count]}."""
+    deltas = defaultdict(lambda: [Decimal(0), 0])
+
+    def add(step_id, cost_type, value, count):
+        if step_id is None or cost_type is None or value is None:
+            return
+        entry = deltas[(step_id, cost_type)]
+        entry[0] += Decimal(value)
+        entry[1] += count
+
+    for obj in session.new:
+        if isinstance(obj, Cost):
+            add(obj.step_id, obj.cost_type, obj.value, 1)
+
+    for obj in session.deleted:
+        if isinstance(obj, Cost):
+            state = inspect(obj)
+            old_step, _ = _old_and_new(state, 'step_id')
+            old_type, _ = _old_and_new(state, 'cost_type')
+            old_value, _ = _old_and_new(state, 'value')
+            add(old_step, old_type, -Decimal(old_value or 0), -1)
+
+    for obj in session.dirty:
+        if isinstance(obj, Cost) and session.is_modified(obj, include_collections=False):
+            state = inspect(obj)
+            old_step, new_step = _old_and_new(state, 'step_id')
+            old_type, new_type = _old_and_new(state, 'cost_type')
+            old_value, new_value = _old_and_new(state, 'value')
+            if (old_step, old_type, old_value) == (new_step, new_type, new_value):
+                continue
+            add(old_step, old_type, -Decimal(old_value or 0), -1)
+            add(new_step, new_type, new_value, 1)
+
+    return {key: tuple(value) for key, value in deltas.items() if value[0] or value[1]}
+
+
+def apply_cost_deltas(connection, deltas):
+    """Aplica deltas {(step_id, cost_type): (delta_total, delta_count)} na tabela de rollups."""
+    if not deltas:
+        return
+    make_insert = UPSERT_DIALECTS.get(connection.dialect.name)
+    if make_insert is None:
+        # Dialeto sem UPSERT suportado aqui: recalcula apenas os passos afetados
+        rebuild_cost_rollups(connection, step_ids={step_id for step_id, _ in deltas})
+        return
+
+    table = CostRollup.__table__
+    for (step_id, cost_type), (delta_total, delta_count) in deltas.items():
+        # INSERT ... SELECT a partir de steps: resolve o journey_id e ignora passos já removidos
+        stmt = make_insert(table).from_select(
+            ['step_id', 'cost_type', 'journey_id', 'total', 'cost_count'],
+            select(Step.id, literal(cost_type), Step.journey_id, literal(delta_total), literal(delta_count))
+            .where(Step.id == step_id)
+        )
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[table.c.step_id, table.c.cost_type],
+            set_={'total': table.c.total + stmt.excluded.total,
+                  'cost_count': table.c.cost_count + stmt.excluded.cost_count},
+        )
+        connection.execute(stmt)
+
+    connection.execute(
+        delete(table).where(table.c.step_id.in_({step_id for step_id, _ in deltas}), table.c.cost_count <= 0)
+    )
+
+
+def rebuild_cost_rollups(connection, step_ids=None, journey_id=None):
+    """Recalcula os rollups a partir da tabela costs (tudo, alguns passos ou uma jornada)."""
+    table = CostRollup.__table__
+    clear = delete(table)
+    source = (
+        select(Cost.step_id, Cost.cost_type, Step.journey_id,
+               func.sum(Cost.value), func.count(Cost.id))
+        .join(Step, Step.id == Cost.step_id)
+        .group_by(Cost.step_id, Cost.cost_type, Step.journey_id)
+    )
+    if step_ids is not None:
+        clear = clear.where(table.c.step_id.in_(step_ids))
+        source = source.where(Cost.step_id.in_(step_ids))
+    if journey_id is not None:
+        clear = clear.where(table.c.journey_id == journey_id)
+        source = source.where(Step.journey_id == journey_id)
+    connection.execute(clear)
+    columns = ['step_id', 'cost_type', 'journey_id', 'total', 'cost_count']
+    make_insert = UPSERT_DIALECTS.get(connection.dialect.name)
+    if make_insert is None:
+        connection.execute(table.insert().from_select(columns, source))
+        return
+    # UPSERT: dois recálculos concorrentes dos mesmos passos (ex.: jobs em paralelo) não colidem na PK
+    stmt = make_insert(table).from_select(columns, source)
+    connection.execute(stmt.on_conflict_do_update(
+        index_elements=[table.c.step_id, table.c.cost_type],
+        set_={'journey_id': stmt.excluded.journey_id, 'total': stmt.excluded.total,
+              'cost_count': stmt.excluded.cost_count},
+    ))
+
+
+@event.listens_for(db.session, 'after_flush')
+def _maintain_cost_rollups(session, flush_context):
+    """Atualiza cost_rollups na mesma transação do flush que alterou Custos ou Passos."""
+    connection = session.connection()
+    apply_cost_deltas(connection, collect_cost_deltas(session))
+
+    # Passos removidos: limpa os rollups mesmo sem ON DELETE CASCADE (ex.: SQLite sem PRAGMA foreign_keys)
+    deleted_steps = [obj.id for obj in session.deleted if isinstance(obj, Step)]
+    if deleted_steps:
+        connection.execute(delete(CostRollup.__table__).where(CostRollup.__table__.c.step_id.in_(deleted_steps)))
+
+    # Passo movido para outra jornada: acompanha o journey_id desnormalizado
+    for obj in session.dirty:
+        if isinstance(obj, Step):
+            old_journey, new_journey = _old_and_new(inspect(obj), 'journey_id')
+            if old_journey != new_journey and new_journey is not None:
+                connection.execute(
+                    update(CostRollup.__table__)
+                    .where(CostRollup.__table__.c.step_id == obj.id)
+                    .values(journey_id=new_journey)
+                )
+
+
+def journey_spend_summary(journey_id):
+    """Orçamento x realizado por passo e por cost_type, lido só de steps + cost_rollups."""
+    rows = db.session.execute(
+        select(Step.id, Step.name, Step.budget, CostRollup.cost_type, CostRollup.total)
+        .outerjoin(CostRollup, CostRollup.step_id == Step.id)
+        .where(Step.journey_id == journey_id)
+        .order_by(Step.id)
+    ).all()
+
+    steps = {}
+    by_type = defaultdict(Decimal)
+    for row in rows:
+        step = steps.setdefault(row.id, {
+            'step_id': row.id,
+            'nome': row.name,
+            'budget': float(row.budget) if row.budget is not None else None,
+            'spent': Decimal(0),
+            'spent_by_type': {},
+        })
+        if row.cost_type is not None:
+            step['spent'] += row.total
+            step['spent_by_type'][row.cost_type] = float(row.total)
+            by_type[row.cost_type] += row.total
+
+    budget_total = sum(s['budget'] or 0.0 for s in steps.values())
+    spent_total = sum(by_type.values(), Decimal(0))
+    for step in steps.values():
+        step['spent'] = float(step['spent'])
+        step['remaining'] = step['budget'] - step['spent'] if step['budget'] is not None else None
+
+    return {
+        'journey_id': journey_id,
+        'budget_total': budget_total,
+        'spent_total': float(spent_total),
+        'remaining_total': budget_total - float(spent_total),
+        'spent_by_type': {cost_type: float(total) for cost_type, total in by_type.items()},
+        'steps': list(steps.values()),
+    }
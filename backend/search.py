@@ -0,0 +1,226 @@
+# backend/search.py
+# Busca textual ranqueada em Jornadas, Passos e Custos
+#
+# PostgreSQL: coluna gerada search_vector (tsvector armazenado com os radicais
+# 'portuguese' e 'english'; título com peso A e descrição com peso B) com índice
+# GIN e, se a extensão estiver disponível, pg_trgm sobre lower(título) para
+# nomes aproximados/com erros de digitação. Criados pela migração b5d1f7e3c820;
+# o próprio banco recalcula a coluna a cada INSERT/UPDATE, inclusive nos
+# caminhos em massa que não passam pelo ORM. A coluna fica fora dos modelos
+# (não é carregada nas consultas do ORM) e do autogenerate (include_in_migrations).
+# SQLite (desenvolvimento/testes): tabela virtual FTS5 search_fts, mantida por
+# triggers e criada junto com as tabelas (db.create_all()).
+
+import re
+
+from sqlalchemy import event, text
+
+from .extensions import db
+
+SEARCH_TYPES = ('journey', 'step', 'cost')
+SEARCH_DEFAULT_LIMIT = 20
+SEARCH_MAX_LIMIT = 100
+SEARCH_MAX_OFFSET = 1000  # Paginação profunda em resultados ranqueados não é útil
+TEXT_CONFIGS = ('portuguese', 'english')
+SEARCH_COLUMN = 'search_vector'
+
+# tipo -> (tabela, coluna de título, coluna de descrição, expressão SQL do journey_id)
+SEARCH_SOURCES = {
+    'journey': ('journeys', 'name', 'description', 'journeys.id'),
+    'step': ('steps', 'name', 'description', 'steps.journey_id'),
+    'cost': ('costs', 'description', 'cost_type', 'steps.journey_id'),
+}
+
+# Índices da migração b5d1f7e3c820 (existem só no PostgreSQL, fora dos modelos)
+SEARCH_INDEXES = frozenset(
+    [f'ix_{table}_{SEARCH_COLUMN}' for table, *_ in SEARCH_SOURCES.values()]
+    + [f'ix_{table}_{title}_trgm' for table, title, *_ in SEARCH_SOURCES.values()]
+)
+
+# SQLite: rowid do search_fts = id * 4 + código do tipo (remoção/atualização por rowid)
+_SQLITE_CODES = {'journey': 1, 'step': 2, 'cost': 3}
+
+
+# URL do engine -> pg_trgm instalado (verificado uma vez por processo)
+_trigram_enabled = {}
+
+
+class SearchError(ValueError):
+    """Consulta de busca inválida (mensagem para o cliente)."""
+
+
+def include_in_migrations(obj, name, type_, reflected, compare_to):
+    """include_object do Alembic: ignora a coluna search_vector e os índices de busca."""
+    if not reflected or compare_to is not None:
+        return True
+    if type_ == 'column':
+        return name != SEARCH_COLUMN
+    if type_ == 'index':
+        return name not in SEARCH_INDEXES
+    return True
+
+
+def _has_trigram(bind):
+    key = str(bind.url)
+    if key not in _trigram_enabled:
+        _trigram_enabled[key] = db.session.execute(
+            text("SELECT EXISTS (SELECT 1 FROM pg_extension WHERE extname = 'pg_trgm')")
+        ).scalar()
+    return _trigram_enabled[key]
+
+
+def _postgresql_source(kind, per_source_limit, trigram):
+    table, title, _body, journey_expr = SEARCH_SOURCES[kind]
+    query = ' || '.join(f"websearch_to_tsquery('{config}', :q)" for config in TEXT_CONFIGS)
+    matches = [f'{table}.{SEARCH_COLUMN} @@ ({query})']
+    rank = f'ts_rank({table}.{SEARCH_COLUMN}, {query})'
+    if trigram:
+        # :q_lower <% lower(título) usa o índice trigram (limite: pg_trgm.word_similarity_threshold)
+        matches.append(f'CAST(:q_lower AS TEXT) <% lower({table}.{title})')
+        rank += f' + word_similarity(CAST(:q_lower AS TEXT), lower({table}.{title}))'
+    join = 'JOIN steps ON steps.id = costs.step_id' if kind == 'cost' else ''
+    step_expr = 'costs.step_id' if kind == 'cost' else ('steps.id' if kind == 'step' else 'NULL')
+    return f"""(
+        SELECT '{kind}' AS type, {table}.id AS id, {journey_expr} AS journey_id, {step_expr} AS step_id,
+               {table}.{title} AS title,
+               {rank} AS rank
+        FROM {table} {join}
+        WHERE ({' OR '.join(matches)}) AND (CAST(:journey_id AS INTEGER) IS NULL OR {journey_expr} = :journey_id)
+        ORDER BY rank DESC, {table}.id
+        LIMIT {per_source_limit}
+    )"""
+
+
+def _sqlite_match(query):
+    """Expressão MATCH do FTS5: todos os termos, cada um como prefixo."""
+    terms = re.findall(r'\w+', query)
+    return ' AND '.join(f'"{term}"*' for term in terms)
+
+
+def _sqlite_source(kind, per_source_limit):
+    table, title, _body, journey_expr = SEARCH_SOURCES[kind]
+    join = 'JOIN steps ON steps.id = costs.step_id' if kind == 'cost' else ''
+    step_expr = 'costs.step_id' if kind == 'cost' else ('steps.id' if kind == 'step' else 'NULL')
+    return f"""SELECT * FROM (
+        SELECT '{kind}' AS type, {table}.id AS id, {journey_expr} AS journey_id, {step_expr} AS step_id,
+               {table}.{title} AS title, -bm25(search_fts, 10.0, 1.0) AS rank
+        FROM search_fts
+        JOIN {table} ON {table}.id = search_fts.rowid / 4 {join}
+        WHERE search_fts MATCH :match AND search_fts.rowid % 4 = {_SQLITE_CODES[kind]}
+          AND (:journey_id IS NULL OR {journey_expr} = :journey_id)
+        ORDER BY rank DESC, {table}.id
+        LIMIT {per_source_limit}
+    )"""
+
+
+def search(query, types=SEARCH_TYPES, journey_id=None, limit=SEARCH_DEFAULT_LIMIT, offset=0):
+    """Resultados ranqueados (maior rank primeiro) e paginados por offset."""
+    query = (query or '').strip()
+    if not query:
+        raise SearchError("Parâmetro 'q' é obrigatório")
+    unknown = set(types or ()) - set(SEARCH_TYPES)
+    if unknown:
+        raise SearchError(f"Parâmetro 'types' aceita apenas {', '.join(SEARCH_TYPES)}")
+    types = [kind for kind in SEARCH_TYPES if kind in set(types or SEARCH_TYPES)]
+    limit = max(1, min(limit or SEARCH_DEFAULT_LIMIT, SEARCH_MAX_LIMIT))
+    offset = max(0, min(offset or 0, SEARCH_MAX_OFFSET))
+    # Cada fonte devolve só o seu top (offset + limit + 1); o merge ordena a união
+    per_source_limit = offset + limit + 1
+    params = {'journey_id': journey_id, 'limit': limit + 1, 'offset': offset}
+
+    dialect = db.session.get_bind().dialect.name
+    if dialect == 'postgresql':
+        trigram = _has_trigram(db.session.get_bind())
+        sources = [_postgresql_source(kind, per_source_limit, trigram) for kind in types]
+        params.update(q=query, q_lower=query.lower())
+    elif dialect == 'sqlite':
+        match = _sqlite_match(query)
+        if not match:
+            raise SearchError("Parâmetro 'q' não contém termos pesquisáveis")
+        sources = [_sqlite_source(kind, per_source_limit) for kind in types]
+        params['match'] = match
+    else:
+        raise RuntimeError(f'Busca textual não suportada no dialeto {dialect!r}')
+
+    statement = text(f"SELECT * FROM ({' UNION ALL '.join(sources)}) AS results "
+                     f"ORDER BY rank DESC, type, id LIMIT :limit OFFSET :offset")
+    rows = db.session.execute(statement, params).mappings().all()
+    items = [{**row, 'rank': round(float(row['rank']), 4)} for row in rows[:limit]]
+    return {
+        'query': query,
+        'items': items,
+        'next_offset': offset + limit if len(rows) > limit and offset + limit <= SEARCH_MAX_OFFSET else None,
+    }
+
+
+# --- SQLite: índice FTS5 mantido por triggers ---
+def _sqlite_index_statements():
+    statements = []
+    for kind, (table, title, body, _journey_expr) in SEARCH_SOURCES.items():
+        rowid = f'new.id * 4 + {_SQLITE_CODES[kind]}'
+        old_rowid = f'old.id * 4 + {_SQLITE_CODES[kind]}'
+        insert = (f'INSERT INTO search_fts (rowid, title, body) '
+                  f'VALUES ({rowid}, new.{title}, new.{body});')
+        remove = f'DELETE FROM search_fts WHERE rowid = {old_rowid};'
+        statements += [
+            f'CREATE TRIGGER IF NOT EXISTS {table}_search_ai AFTER INSERT ON {table} BEGIN {insert} END',
+            f'CREATE TRIGGER IF NOT EXISTS {table}_search_au AFTER UPDATE OF {title}, {body} ON {table} '
+            f'BEGIN {remove} {insert} END',
+            f'CREATE TRIGGER IF NOT EXISTS {table}_search_ad AFTER DELETE ON {table} BEGIN {remove} END',
+        ]
+    return statements
+
+
+def rebuild_search_index(connection):
+    """SQLite: recria o conteúdo do search_fts a partir das tabelas (no PostgreSQL não há o que fazer)."""
+    if connection.dialect.name != 'sqlite':
+        return 0
+    connection.exec_driver_sql('DELETE FROM search_fts')
+    for kind, (table, title, body, _journey_expr) in SEARCH_SOURCES.items():
+        connection.exec_driver_sql(
+            f'INSERT INTO search_fts (rowid, title, body) '
+            f'SELECT id * 4 + {_SQLITE_CODES[kind]}, {title}, {body} FROM {table}'
+        )
+    return connection.exec_driver_sql('SELECT count(*) FROM search_fts').scalar()
+
+
+def create_search_triggers(connection):
+    """SQLite: (re)cria os triggers do search_fts; somem quando uma migração em modo batch recria a tabela."""
+    for statement in _sqlite_index_statements():
+        connection.exec_driver_sql(statement)
+
+
+def drop_search_triggers(connection):
+    """SQLite: remove os triggers do search_fts (cargas em massa; depois create_search_triggers e rebuild)."""
+    for table, *_rest in SEARCH_SOURCES.values():
+        for suffix in ('ai', 'au', 'ad'):
+            connection.exec_driver_sql(f'DROP TRIGGER IF EXISTS {table}_search_{suffix}')
+
+
+def has_search_index(connection):
+    """SQLite: o índice search_fts existe (criado por create_all)?"""
+    return connection.dialect.name == 'sqlite' and connection.exec_driver_sql(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'search_fts'"
+    ).first() is not None
+
+
+@event.listens_for(db.metadata, 'after_create')
+def _create_sqlite_search_index(target, connection, **kw):
+    if connection.dialect.name != 'sqlite':
+        return
+    exists = connection.exec_driver_sql(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'search_fts'"
+    ).first()
+    if not exists:
+        connection.exec_driver_sql(
+            "CREATE VIRTUAL TABLE search_fts USING fts5(title, body, tokenize = 'unicode61 remove_diacritics 2')"
+        )
+    create_search_triggers(connection)
+    if not exists:
+        rebuild_search_index(connection)
+
+
+@event.listens_for(db.metadata, 'before_drop')
+def _drop_sqlite_search_index(target, connection, **kw):
+    if connection.dialect.name == 'sqlite':
+        connection.exec_driver_sql('DROP TABLE IF EXISTS search_fts')
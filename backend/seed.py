@@ -0,0 +1,175 @@
+# backend/seed.py
+# Gerador de dados sintéticos (usuários, jornadas, passos, dependências e custos)
+#
+# Reprodutível: tudo sai de random.Random(seed) e de uma data base fixa, então a
+# mesma seed gera a mesma massa de dados em qualquer banco. Os INSERTs são em
+# massa (executemany, agrupado pelo "insertmanyvalues" do SQLAlchemy); os ids de
+# jornadas e passos voltam por RETURNING, na ordem dos parâmetros, para os filhos
+# serem montados sem consultas extras. Um commit por usuário (e suas jornadas) mantém a
+# transação e a memória limitadas mesmo com milhões de custos. No SQLite os triggers
+# do índice FTS (search.py) ficam suspensos durante a carga e o índice é refeito no fim.
+
+import datetime
+import random
+
+from sqlalchemy import func, insert, select
+
+from .extensions import db
+from .models import Cost, Journey, Step, StepEdge, User
+from .rollups import rebuild_cost_rollups
+from .search import create_search_triggers, drop_search_triggers, has_search_index, rebuild_search_index
+
+SEED_BASE_DATE = datetime.date(2025, 1, 1)
+# "Hoje" da massa de dados: define quais passos saem Completed, In Progress ou Planned
+SEED_TODAY = SEED_BASE_DATE + datetime.timedelta(days=365)
+SEED_EMAIL = 'seed-{seed}-{n}@midaspipe.local'
+DEFAULT_BATCH_SIZE = 10000
+
+STEP_TYPES = ('Performance Campaign', 'Brand Activation', 'Organic Post', 'Email Marketing', 'Event')
+CHANNELS = ('Google Ads', 'Meta Ads', 'Instagram Feed', 'TikTok', 'LinkedIn Ads', 'Blog', 'Newsletter', 'YouTube')
+COST_TYPES = ('Paid Media', 'Creative Production', 'Human Resources', 'SaaS Tool', 'Consulting', 'Other')
+JOURNEY_STATUSES = ('Active', 'Active', 'Active', 'Draft', 'Completed', 'Archived')
+WORDS = ('Lançamento', 'Black Friday', 'Verão', 'Inverno', 'Retenção', 'Onboarding', 'Reativação', 'Natal',
+         'Volta às Aulas', 'Dia das Mães', 'Awareness', 'Leads B2B', 'Webinar', 'App Install', 'Fidelidade')
+
+
+class SeedError(RuntimeError):
+    """Seed já aplicada ou parâmetros inválidos."""
+
+
+def _around(rng, mean):
+    """Tamanho com variação (metade a 1,5x da média), para as jornadas não serem todas iguais."""
+    return rng.randint(max(1, mean // 2), max(1, mean * 3 // 2)) if mean else 0
+
+
+def _insert_returning_ids(model, rows):
+    if not rows:
+        return []
+    return db.session.scalars(insert(model).returning(model.id, sort_by_parameter_order=True), rows).all()
+
+
+def _insert_many(model, rows, batch_size):
+    # INSERT do Core: sem a contabilidade do bulk insert do ORM, que aqui não serve para nada
+    for start in range(0, len(rows), batch_size):
+        db.session.execute(insert(model.__table__), rows[start:start + batch_size])
+
+
+def _journey_rows(rng, user_id, count):
+    rows = []
+    for _ in range(count):
+        theme = rng.choice(WORDS)
+        rows.append({'name': f'{theme} {rng.randint(2025, 2027)} #{rng.randint(1, 9999)}',
+                     'description': f'Jornada sintética: {theme.lower()}',
+                     'status': rng.choice(JOURNEY_STATUSES), 'user_id': user_id})
+    return rows
+
+
+def _step_rows(rng, journey_id, count):
+    start = SEED_BASE_DATE + datetime.timedelta(days=rng.randint(0, 540))
+    rows = []
+    for i in range(count):
+        begin = start + datetime.timedelta(days=rng.randint(0, 120))
+        end = begin + datetime.timedelta(days=rng.randint(3, 60))
+        status = 'Completed' if end < SEED_TODAY else ('In Progress' if begin <= SEED_TODAY else 'Planned')
+        rows.append({
+            'name': f'{rng.choice(STEP_TYPES)} {i + 1}', 'description': None,
+            'type': rng.choice(STEP_TYPES), 'channel': rng.choice(CHANNELS),
+            'budget': round(rng.uniform(500, 50000), 2), 'status': status,
+            'date_start': datetime.datetime.combine(begin, datetime.time(9), datetime.timezone.utc),
+            'date_end': datetime.datetime.combine(end, datetime.time(18), datetime.timezone.utc),
+            'pos_x': (i % 8) * 220, 'pos_y': (i // 8) * 140, 'journey_id': journey_id,
+        })
+    return rows
+
+
+def _cost_rows(rng, step_id, step, count):
+    begin = step['date_start']
+    span = max(1, (step['date_end'] - begin).days)
+    rows = []
+    for n in range(count):
+        occoured_at = begin + datetime.timedelta(days=rng.randint(0, span), minutes=rng.randint(0, 1439))
+        cost_type = rng.choice(COST_TYPES)
+        rows.append({
+            # description única por passo: a chave natural (uq_costs_natural_key) não colide
+            'description': f'{cost_type} #{n + 1}', 'cost_type': cost_type, 'step_id': step_id,
+            'value': round(min(rng.lognormvariate(5, 1.2), 9_999_999), 2), 'occoured_at': occoured_at,
+            'timePeriod_start': occoured_at.date().replace(day=1), 'timePeriod_end': None,
+        })
+    return rows
+
+
+def _seed_user(rng, user_id, journeys_per_user, steps_per_journey, costs_per_step, batch_size, totals):
+    """Jornadas, passos, dependências e custos de um usuário, com um commit no final."""
+    journey_ids = _insert_returning_ids(Journey, _journey_rows(rng, user_id, _around(rng, journeys_per_user)))
+    step_rows = []
+    for journey_id in journey_ids:
+        step_rows += _step_rows(rng, journey_id, _around(rng, steps_per_journey))
+    step_ids = _insert_returning_ids(Step, step_rows)
+
+    edge_rows, cost_rows = [], []
+    for index, (step_id, step) in enumerate(zip(step_ids, step_rows)):
+        previous = step_rows[index - 1] if index else None
+        # Dependência do passo anterior da mesma jornada em ~60% dos casos
+        if previous is not None and previous['journey_id'] == step['journey_id'] and rng.random() < 0.6:
+            edge_rows.append({'from_step_id': step_ids[index - 1], 'to_step_id': step_id,
+                              'journey_id': step['journey_id'], 'lag_days': rng.randint(0, 3)})
+        cost_rows += _cost_rows(rng, step_id, step, _around(rng, costs_per_step))
+    _insert_many(StepEdge, edge_rows, batch_size)
+    _insert_many(Cost, cost_rows, batch_size)
+    db.session.commit()
+
+    totals['journeys'] += len(journey_ids)
+    totals['steps'] += len(step_ids)
+    totals['edges'] += len(edge_rows)
+    totals['costs'] += len(cost_rows)
+
+
+def seed_database(users=100, journeys_per_user=10, steps_per_journey=20, costs_per_step=50, seed=42,
+                  batch_size=DEFAULT_BATCH_SIZE, echo=None):
+    """Gera a massa de dados e devolve as contagens; com os padrões, ~1M de custos.
+
+    journeys_per_user, steps_per_journey e costs_per_step são médias (cada item
+    varia de metade a 1,5x). Faz commit por usuário; os rollups são recalculados
+    e as estatísticas do planner atualizadas (ANALYZE) no final.
+    """
+    if min(users, journeys_per_user, steps_per_journey, costs_per_step) < 0 or users == 0:
+        raise SeedError('users deve ser positivo e as médias não podem ser negativas')
+    first_email = SEED_EMAIL.format(seed=seed, n=1)
+    if db.session.execute(select(User.id).where(User.email == first_email)).first():
+        raise SeedError(f'A seed {seed} já foi aplicada neste banco ({first_email} existe); use outra --seed')
+
+    rng = random.Random(seed)
+    totals = {'users': 0, 'journeys': 0, 'steps': 0, 'edges': 0, 'costs': 0}
+    # SQLite: os triggers do FTS custam mais que o próprio INSERT; o índice é refeito uma vez no final
+    search_index = has_search_index(db.session.connection())
+    if search_index:
+        drop_search_triggers(db.session.connection())
+        db.session.commit()
+    try:
+        user_ids = _insert_returning_ids(User, [
+            {'name': f'Usuário {n}', 'email': SEED_EMAIL.format(seed=seed, n=n)} for n in range(1, users + 1)
+        ])
+        totals['users'] = len(user_ids)
+        for done, user_id in enumerate(user_ids, 1):
+            _seed_user(rng, user_id, journeys_per_user, steps_per_journey, costs_per_step, batch_size, totals)
+            if echo and (done % max(1, users // 10) == 0 or done == users):
+                echo(f"{done}/{users} usuários: {totals['journeys']} jornadas, {totals['steps']} passos, "
+                     f"{totals['costs']} custos")
+        rebuild_cost_rollups(db.session.connection())
+        db.session.commit()
+    finally:
+        # Mesmo se a carga falhar no meio, o que foi gravado volta a ser indexado
+        db.session.rollback()
+        if search_index:
+            create_search_triggers(db.session.connection())
+            rebuild_search_index(db.session.connection())
+            db.session.commit()
+    with db.engine.connect() as connection:
+        connection.execution_options(isolation_level='AUTOCOMMIT').exec_driver_sql('ANALYZE')
+    return totals
+
+
+def data_volume():
+    """Contagem atual das tabelas principais (registrada junto dos resultados do benchmark)."""
+    return {name: db.session.execute(select(func.count()).select_from(model)).scalar()
+            for name, model in (('users', User), ('journeys', Journey), ('steps', Step), ('costs', Cost))}
@@ -0,0 +1,81 @@
+# backend/serialization.py
+# Serialização JSON das respostas da API (orjson quando instalado, json da stdlib como fallback)
+#
+# Os payloads podem carregar Decimal (Step.budget, Cost.value, totais), datetime
+# com fuso e date direto das linhas do banco: o serializador os converte, sem
+# conversão campo a campo em Python nos handlers.
+
+import datetime
+import decimal
+import json
+
+from flask import make_response
+
+try:
+    import orjson  # Dependência opcional (pip install orjson)
+except ImportError:
+    orjson = None
+
+JSON_SERIALIZERS = ('auto', 'orjson', 'json')
+
+
+def default(value):
+    """Tipos fora do JSON padrão. O orjson já trata datetime/date nativamente."""
+    if isinstance(value, decimal.Decimal):
+        return float(value)
+    if isinstance(value, (datetime.datetime, datetime.date, datetime.time)):
+        return value.isoformat()
+    if isinstance(value, (set, frozenset)):
+        return list(value)
+    raise TypeError(f"Objeto do tipo {type(value).__name__} não é serializável em JSON")
+
+
+def orjson_dumps(obj, default=default):
+    return orjson.dumps(obj, default=default, option=orjson.OPT_NON_STR_KEYS)
+
+
+def stdlib_dumps(obj, default=default):
+    return json.dumps(obj, default=default, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+
+_active = {'name': 'orjson' if orjson is not None else 'json',
+           'dumps': orjson_dumps if orjson is not None else stdlib_dumps}
+
+
+def configure(name='auto'):
+    """Escolhe o serializador do processo ('auto' usa orjson se estiver instalado)."""
+    if name not in JSON_SERIALIZERS:
+        raise ValueError(f"JSON_SERIALIZER inválido: {name!r}")
+    if name == 'orjson' and orjson is None:
+        raise RuntimeError("JSON_SERIALIZER=orjson exige o pacote orjson instalado")
+    use_orjson = orjson is not None and name != 'json'
+    _active['name'] = 'orjson' if use_orjson else 'json'
+    _active['dumps'] = orjson_dumps if use_orjson else stdlib_dumps
+    return _active['name']
+
+
+def serializer_name():
+    return _active['name']
+
+
+def dumps(obj, default=default):
+    """Serializa para bytes UTF-8 com o serializador ativo."""
+    return _active['dumps'](obj, default=default)
+
+
+def loads(raw):
+    return orjson.loads(raw) if orjson is not None else json.loads(raw)
+
+
+def output_json(data, code, headers=None):
+    """Representação 'application/json' do Flask-RESTX usando o serializador ativo."""
+    response = make_response(dumps(data), code)
+    response.headers.extend(headers or {})
+    return response
+
+
+def init_app(app):
+    """Seleciona o serializador (JSON_SERIALIZER) e o instala no rest_api."""
+    from .extensions import rest_api
+    configure(app.config.setdefault('JSON_SERIALIZER', 'auto'))
+    rest_api.representations['application/json'] = output_json
@@ -0,0 +1,85 @@
+# backend/startup.py
+# Inicialização rápida da app (FAST_STARTUP) e diagnóstico do tempo de boot
+#
+# - StartupTimings: tempo de cada fase do create_app (app.extensions['startup']).
+# - LazyGroup: grupo de comandos do Flask CLI cujo módulo só é importado quando
+#   o grupo é usado (ex.: 'flask db', que importa o Alembic).
+# - parse_importtime / summarize_importtime: leitura da saída de
+#   'python -X importtime' (usada por check_cli.py --importtime).
+
+import time
+
+import click
+
+
+class StartupTimings:
+    """Tempo (ms) de cada fase da factory, medido entre marcas consecutivas."""
+
+    def __init__(self):
+        self.started = self._last = time.perf_counter()
+        self.phases = []
+
+    def mark(self, phase):
+        now = time.perf_counter()
+        self.phases.append((phase, round((now - self._last) * 1000, 2)))
+        self._last = now
+
+    @property
+    def total_ms(self):
+        return round((self._last - self.started) * 1000, 2)
+
+    def as_dict(self):
+        return {'total_ms': self.total_ms, 'phases': dict(self.phases)}
+
+
+class LazyGroup(click.Group):
+    """Grupo do CLI resolvido no primeiro uso; 'flask --help' não dispara o import."""
+
+    def __init__(self, name, loader, **attrs):
+        super().__init__(name, **attrs)
+        self._loader = loader
+        self._group = None
+
+    def _resolve(self):
+        if self._group is None:
+            self._group = self._loader()
+        return self._group
+
+    def make_context(self, info_name, args, parent=None, **extra):
+        # Opções, callback e subcomandos vêm do grupo real
+        return self._resolve().make_context(info_name, args, parent=parent, **extra)
+
+    def list_commands(self, ctx):
+        return self._resolve().list_commands(ctx)
+
+    def get_command(self, ctx, cmd_name):
+        return self._resolve().get_command(ctx, cmd_name)
+
+
+def parse_importtime(lines):
+    """Linhas 'import time: self | cumulative | módulo' -> [(módulo, self_us, cumulativo_us)]."""
+    rows = []
+    for line in lines:
+        if not line.startswith('import time:'):
+            continue
+        fields = line[len('import time:'):].split('|')
+        if len(fields) != 3 or not fields[0].strip().isdigit():
+            continue  # cabeçalho
+        rows.append((fields[2].strip(), int(fields[0]), int(fields[1])))
+    return rows
+
+
+def summarize_importtime(rows, top=15):
+    """Soma o tempo próprio por pacote de topo (sqlalchemy, alembic, numpy...) e lista os módulos mais caros."""
+    packages = {}
+    for name, self_us, _cumulative_us in rows:
+        package = name.split('.', 1)[0]
+        packages[package] = packages.get(package, 0) + self_us
+    by_self = sorted(rows, key=lambda row: row[1], reverse=True)[:top]
+    return {
+        'total_ms': round(sum(packages.values()) / 1000, 1),
+        'packages': [(package, round(us / 1000, 1))
+                     for package, us in sorted(packages.items(), key=lambda item: item[1], reverse=True)[:top]],
+        'modules': [(name, round(self_us / 1000, 1), round(cumulative_us / 1000, 1))
+                    for name, self_us, cumulative_us in by_self],
+    }
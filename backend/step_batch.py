@@ -0,0 +1,136 @@
+# backend/step_batch.py
+# Atualização em lote de Passos (posições no canvas e campos simples)
+
+import datetime
+from decimal import Decimal, InvalidOperation
+
+from sqlalchemy import select, update
+
+from .extensions import db
+from .journey_events import record_journey_change
+from .models import Step
+
+MAX_BATCH_UPDATES = 5000
+_STATUS_MAX = Step.__table__.c.status.type.length
+
+
+class StepBatchError(ValueError):
+    """Lote inválido; 'errors' lista os problemas por item."""
+
+    def __init__(self, message, errors=None):
+        super().__init__(message)
+        self.errors = errors or []
+
+
+def _int(value):
+    if isinstance(value, bool):
+        raise ValueError('esperado inteiro')
+    return int(value)
+
+
+def _datetime(value):
+    if value is None:
+        return None
+    parsed = datetime.datetime.fromisoformat(str(value))
+    return parsed if parsed.tzinfo else parsed.replace(tzinfo=datetime.timezone.utc)
+
+
+def _budget(value):
+    if value is None:
+        return None
+    try:
+        budget = Decimal(str(value))
+    except InvalidOperation:
+        raise ValueError('esperado número')
+    if not budget.is_finite():
+        raise ValueError('esperado número finito')
+    return budget.quantize(Decimal('0.01'))
+
+
+def _status(value):
+    value = str(value).strip()
+    if not value or len(value) > _STATUS_MAX:
+        raise ValueError(f'status deve ter de 1 a {_STATUS_MAX} caracteres')
+    return value
+
+
+# Campos aceitos no lote e o conversor de cada um
+STEP_BATCH_FIELDS = {
+    'pos_x': _int,
+    'pos_y': _int,
+    'status': _status,
+    'date_start': _datetime,
+    'date_end': _datetime,
+    'budget': _budget,
+}
+
+
+def merge_step_updates(updates):
+    """Valida e funde as atualizações por passo, na ordem recebida (o último valor vence).
+
+    Retorna ({step_id: {campo: valor}}, quantidade de itens fundidos em um anterior).
+    """
+    if not isinstance(updates, list):
+        raise StepBatchError("'updates' deve ser uma lista")
+    if len(updates) > MAX_BATCH_UPDATES:
+        raise StepBatchError(f'No máximo {MAX_BATCH_UPDATES} atualizações por lote')
+
+    merged = {}
+    errors = []
+    for index, item in enumerate(updates):
+        if not isinstance(item, dict):
+            errors.append({'index': index, 'error': 'item deve ser um objeto'})
+            continue
+        try:
+            step_id = _int(item.get('id'))
+        except (TypeError, ValueError):
+            errors.append({'index': index, 'error': 'id ausente ou inválido'})
+            continue
+        values = {}
+        for field, value in item.items():
+            if field == 'id':
+                continue
+            convert = STEP_BATCH_FIELDS.get(field)
+            if convert is None:
+                errors.append({'index': index, 'error': f'campo não suportado: {field}'})
+                continue
+            if value is None and field in ('pos_x', 'pos_y', 'status'):
+                errors.append({'index': index, 'error': f'{field} não pode ser nulo'})
+                continue
+            try:
+                values[field] = convert(value)
+            except (TypeError, ValueError) as e:
+                errors.append({'index': index, 'error': f'{field}: {e}'})
+        merged.setdefault(step_id, {}).update(values)
+
+    if errors:
+        raise StepBatchError('Lote de atualizações inválido', errors)
+    merged = {step_id: values for step_id, values in merged.items() if values}
+    return merged, len(updates) - len(merged)
+
+
+def apply_step_updates(journey_id, updates):
+    """Aplica o lote em uma transação: um SELECT de validação e um UPDATE em massa.
+
+    O UPDATE usa o "bulk UPDATE por chave primária" do ORM (executemany), agrupado
+    pelo conjunto de colunas alteradas; modificated_at é preenchido pelo onupdate.
+    """
+    merged, merged_count = merge_step_updates(updates)
+    if not merged:
+        return {'updated': 0, 'merged': merged_count, 'step_ids': []}
+
+    known = set(db.session.scalars(
+        select(Step.id).where(Step.journey_id == journey_id, Step.id.in_(merged))
+    ))
+    unknown = sorted(set(merged) - known)
+    if unknown:
+        raise StepBatchError('Passos não pertencem a esta jornada', [{'id': step_id} for step_id in unknown])
+
+    try:
+        db.session.execute(update(Step), [{'id': step_id, **values} for step_id, values in merged.items()])
+        record_journey_change(journey_id, steps=merged)
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+    return {'updated': len(merged), 'merged': merged_count, 'step_ids': sorted(merged)}
@@ -0,0 +1,345 @@
+# backend/step_graph.py
+# Grafo de dependências dos Passos de uma jornada: ordem topológica, ciclos,
+# caminho crítico (por date_start/date_end) e impacto a jusante de um atraso
+#
+# O grafo é lido em uma consulta por jornada (passos UNION ALL arestas),
+# guardado no response_cache com a versão dos passos e das arestas na chave e
+# montado como listas de adjacência por índice. Cada operação é O(V + E).
+
+import datetime
+from collections import deque
+
+from sqlalchemy import DateTime, Integer, String, cast, delete, func, literal, null, select, union_all
+from sqlalchemy.exc import IntegrityError
+
+from .extensions import db, response_cache
+from .journey_events import record_journey_change
+from .models import Journey, Step, StepEdge
+
+
+class StepGraphError(ValueError):
+    """Aresta inválida (passo inexistente, de outra jornada, laço ou duplicada)."""
+
+
+class GraphCycleError(ValueError):
+    """As dependências formam um ciclo; 'cycle' lista os step_ids na ordem das arestas."""
+
+    def __init__(self, cycle):
+        super().__init__('As dependências entre passos formam um ciclo')
+        self.cycle = cycle
+
+
+def _day(value):
+    """datetime -> dia ordinal (UTC); None permanece None."""
+    if value is None:
+        return None
+    if value.tzinfo is not None:
+        value = value.astimezone(datetime.timezone.utc)
+    return value.date().toordinal()
+
+
+def _iso_day(day):
+    return datetime.date.fromordinal(day).isoformat() if day is not None else None
+
+
+class JourneyGraph:
+    """Listas de adjacência (por índice 0..n-1) dos passos de uma jornada."""
+
+    def __init__(self, step_ids, starts, ends, edges):
+        self.step_ids = list(step_ids)
+        self.index = {step_id: i for i, step_id in enumerate(self.step_ids)}
+        self.start = list(starts)
+        # Duração em dias; passos sem datas completas duram 0
+        self.duration = [max(0, e - s) if s is not None and e is not None else 0 for s, e in zip(starts, ends)]
+        self.succ = [[] for _ in self.step_ids]
+        self.pred = [[] for _ in self.step_ids]
+        self.edge_count = 0
+        for from_id, to_id, lag in edges:
+            i, j = self.index.get(from_id), self.index.get(to_id)
+            if i is None or j is None:
+                continue  # Aresta para passo removido/movido em banco sem ON DELETE CASCADE
+            self.succ[i].append((j, lag))
+            self.pred[j].append((i, lag))
+            self.edge_count += 1
+
+    @classmethod
+    def from_payload(cls, payload):
+        return cls(payload['step_ids'], payload['starts'], payload['ends'], payload['edges'])
+
+    def __len__(self):
+        return len(self.step_ids)
+
+    def topological_order(self):
+        """Kahn: índices em ordem topológica (empates pela ordem de step_id)."""
+        indegree = [len(p) for p in self.pred]
+        queue = deque(i for i, d in enumerate(indegree) if d == 0)
+        order = []
+        while queue:
+            i = queue.popleft()
+            order.append(i)
+            for j, _ in self.succ[i]:
+                indegree[j] -= 1
+                if indegree[j] == 0:
+                    queue.append(j)
+        if len(order) < len(self.step_ids):
+            raise GraphCycleError(self._find_cycle(indegree))
+        return order
+
+    def _find_cycle(self, indegree):
+        """Um ciclo concreto entre os nós que sobraram no Kahn.
+
+        Todo nó restante tem um predecessor também restante, então andar para
+        trás pelos predecessores sempre fecha um ciclo em no máximo V passos.
+        """
+        remaining = [d > 0 for d in indegree]
+        i = remaining.index(True)
+        seen = {}
+        path = []
+        while i not in seen:
+            seen[i] = len(path)
+            path.append(i)
+            i = next(p for p, _ in self.pred[i] if remaining[p])
+        cycle = path[seen[i]:]
+        cycle.reverse()
+        return [self.step_ids[k] for k in cycle]
+
+    def schedule(self, order, slip=None):
+        """Passe para frente: (início, fim) mais cedo de cada passo, em dias ordinais.
+
+        Um passo começa em max(date_start planejado, fim de cada predecessor + lag).
+        'slip' ({índice: dias}) atrasa o início dos passos indicados.
+        """
+        es = [None] * len(self.step_ids)
+        ef = [None] * len(self.step_ids)
+        for i in order:
+            start = self.start[i]
+            for p, lag in self.pred[i]:
+                if ef[p] is not None and (start is None or ef[p] + lag > start):
+                    start = ef[p] + lag
+            if slip and i in slip and start is not None:
+                start += slip[i]
+            if start is not None:
+                es[i] = start
+                ef[i] = start + self.duration[i]
+        return es, ef
+
+    def critical_path(self, order=None):
+        """Caminho crítico e folga de cada passo.
+
+        Retorna (ids do caminho, es, ef, slack). A folga vem do passe para trás a
+        partir do fim do projeto; o caminho sai do passo que termina por último e
+        volta pelos predecessores que determinaram seu início.
+        """
+        order = self.topological_order() if order is None else order
+        es, ef = self.schedule(order)
+        finishes = [f for f in ef if f is not None]
+        if not finishes:
+            return [], es, ef, [None] * len(self.step_ids)
+        finish = max(finishes)
+
+        lf = [None] * len(self.step_ids)
+        for i in reversed(order):
+            if ef[i] is None:
+                continue
+            latest = finish
+            for j, lag in self.succ[i]:
+                if lf[j] is not None:
+                    latest = min(latest, lf[j] - self.duration[j] - lag)
+            lf[i] = latest
+        slack = [lf[i] - ef[i] if ef[i] is not None else None for i in range(len(self.step_ids))]
+
+        i = min((k for k in range(len(self.step_ids)) if ef[k] == finish), key=lambda k: self.step_ids[k])
+        path = [i]
+        while True:
+            driver = next((p for p, lag in self.pred[i] if ef[p] is not None and ef[p] + lag == es[i]), None)
+            if driver is None:
+                break
+            path.append(driver)
+            i = driver
+        path.reverse()
+        return [self.step_ids[k] for k in path], es, ef, slack
+
+    def path_between(self, source_id, target_id):
+        """BFS: step_ids de um caminho source -> target, ou None se não houver."""
+        source, target = self.index.get(source_id), self.index.get(target_id)
+        if source is None or target is None:
+            return None
+        parent = {source: None}
+        queue = deque([source])
+        while queue:
+            i = queue.popleft()
+            if i == target:
+                path = []
+                while i is not None:
+                    path.append(self.step_ids[i])
+                    i = parent[i]
+                return path[::-1]
+            for j, _ in self.succ[i]:
+                if j not in parent:
+                    parent[j] = i
+                    queue.append(j)
+        return None
+
+
+# --- Carga e cache ---
+def graph_version(journey_id):
+    """Versão dos passos e das arestas da jornada (uma consulta agregada)."""
+    steps = Step.journey_id == journey_id
+    edges = StepEdge.journey_id == journey_id
+    row = db.session.execute(select(
+        select(func.count(Step.id)).where(steps).scalar_subquery(),
+        select(func.max(func.coalesce(Step.modificated_at, Step.created_at))).where(steps).scalar_subquery(),
+        select(func.count()).select_from(StepEdge).where(edges).scalar_subquery(),
+        select(func.max(StepEdge.created_at)).where(edges).scalar_subquery(),
+    )).one()
+    # O contador cobre trocas de arestas na mesma transação (mesmo created_at e mesma contagem)
+    writes = response_cache.get_version(f'journey-edges:{journey_id}') or 0
+    return f'{row[0]}:{row[1]}:{row[2]}:{row[3]}:{writes}'
+
+
+def _graph_payload(journey_id):
+    """Passos e arestas da jornada em uma única consulta (UNION ALL)."""
+    steps = select(
+        literal('s').label('kind'), Step.id.label('a'), cast(null(), Integer).label('b'),
+        cast(null(), Integer).label('lag'), Step.date_start.label('date_start'), Step.date_end.label('date_end'),
+    ).where(Step.journey_id == journey_id)
+    edges = select(
+        literal('e', String), StepEdge.from_step_id, StepEdge.to_step_id, StepEdge.lag_days,
+        cast(null(), DateTime(timezone=True)), cast(null(), DateTime(timezone=True)),
+    ).where(StepEdge.journey_id == journey_id)
+    query = union_all(steps, edges).order_by('kind', 'a', 'b')
+
+    step_ids, starts, ends, edge_list = [], [], [], []
+    for kind, a, b, lag, date_start, date_end in db.session.execute(query):
+        if kind == 's':
+            step_ids.append(a)
+            starts.append(_day(date_start))
+            ends.append(_day(date_end))
+        else:
+            edge_list.append([a, b, lag])
+    return {'step_ids': step_ids, 'starts': starts, 'ends': ends, 'edges': edge_list}
+
+
+def load_journey_graph(journey_id):
+    """Grafo da jornada, lido do cache quando a versão (passos/arestas) não mudou."""
+    key = f'journey-deps:{journey_id}@{graph_version(journey_id)}'
+    return JourneyGraph.from_payload(response_cache.get_or_set(key, lambda: _graph_payload(journey_id)))
+
+
+# --- Consultas e escritas usadas pela API ---
+def _schedule_rows(graph, es, ef, slack=None):
+    return [{
+        'step_id': step_id,
+        'earliest_start': _iso_day(es[i]),
+        'earliest_finish': _iso_day(ef[i]),
+        **({'slack_days': slack[i], 'critical': slack[i] == 0} if slack is not None else {}),
+    } for i, step_id in enumerate(graph.step_ids)]
+
+
+def dependency_report(journey_id):
+    """Ordem topológica, caminho crítico e folga por passo; se houver ciclo, o ciclo."""
+    graph = load_journey_graph(journey_id)
+    try:
+        order = graph.topological_order()
+    except GraphCycleError as e:
+        return {'acyclic': False, 'cycle': e.cycle, 'steps_count': len(graph), 'edges_count': graph.edge_count}
+    path, es, ef, slack = graph.critical_path(order)
+    starts = [s for s in es if s is not None]
+    finishes = [f for f in ef if f is not None]
+    return {
+        'acyclic': True,
+        'steps_count': len(graph),
+        'edges_count': graph.edge_count,
+        'order': [graph.step_ids[i] for i in order],
+        'critical_path': path,
+        'project_start': _iso_day(min(starts)) if starts else None,
+        'project_finish': _iso_day(max(finishes)) if finishes else None,
+        'steps': _schedule_rows(graph, es, ef, slack),
+    }
+
+
+def slip_impact(journey_id, step_id, slip_days):
+    """Passos a jusante que atrasam (e quanto) se step_id começar slip_days depois.
+
+    Folgas absorvem o atraso: um passo só se move se o novo fim de um predecessor
+    (+ lag) passar do seu início atual. Retorna None se o passo não for da jornada.
+    """
+    graph = load_journey_graph(journey_id)
+    index = graph.index.get(step_id)
+    if index is None:
+        return None
+    order = graph.topological_order()
+    es, ef = graph.schedule(order)
+    new_es, new_ef = graph.schedule(order, slip={index: slip_days})
+    finishes = [f for f in ef if f is not None]
+    new_finishes = [f for f in new_ef if f is not None]
+    affected = [{
+        'step_id': graph.step_ids[i],
+        'delay_days': new_es[i] - es[i],
+        'start': _iso_day(new_es[i]),
+        'end': _iso_day(new_ef[i]),
+    } for i in order if es[i] is not None and new_es[i] != es[i]]
+    return {
+        'step_id': step_id,
+        'slip_days': slip_days,
+        'project_finish_before': _iso_day(max(finishes)) if finishes else None,
+        'project_finish_after': _iso_day(max(new_finishes)) if new_finishes else None,
+        'project_delay_days': (max(new_finishes) - max(finishes)) if finishes else 0,
+        'affected': affected,
+    }
+
+
+def list_step_edges(journey_id):
+    rows = db.session.execute(
+        select(StepEdge.from_step_id, StepEdge.to_step_id, StepEdge.lag_days)
+        .where(StepEdge.journey_id == journey_id)
+        .order_by(StepEdge.from_step_id, StepEdge.to_step_id)
+    )
+    return [{'from_step_id': a, 'to_step_id': b, 'lag_days': lag} for a, b, lag in rows]
+
+
+def add_step_edge(journey_id, from_step_id, to_step_id, lag_days=0):
+    """Cria a dependência from -> to; recusa laços, passos de outra jornada e ciclos."""
+    if from_step_id == to_step_id:
+        raise StepGraphError('Um passo não pode depender de si mesmo')
+    # Trava a jornada até o commit: duas arestas concorrentes (a -> b e b -> a) checariam
+    # o ciclo no mesmo grafo antigo e passariam as duas
+    db.session.execute(select(Journey.id).where(Journey.id == journey_id).with_for_update())
+    found = set(db.session.scalars(
+        select(Step.id).where(Step.id.in_([from_step_id, to_step_id]), Step.journey_id == journey_id)
+    ))
+    missing = [step_id for step_id in (from_step_id, to_step_id) if step_id not in found]
+    if missing:
+        raise StepGraphError(f'Passos não encontrados nesta jornada: {missing}')
+    # Se 'to' já alcança 'from', a nova aresta fecharia um ciclo. Lido do banco, não do cache:
+    # com a trava, o grafo inclui as arestas que outro processo acabou de gravar
+    back_path = JourneyGraph.from_payload(_graph_payload(journey_id)).path_between(to_step_id, from_step_id)
+    if back_path is not None:
+        raise GraphCycleError(back_path)
+
+    db.session.add(StepEdge(from_step_id=from_step_id, to_step_id=to_step_id,
+                            journey_id=journey_id, lag_days=lag_days))
+    try:
+        db.session.commit()
+    except IntegrityError:
+        db.session.rollback()
+        raise StepGraphError('Dependência já existe')
+    response_cache.bump_version(f'journey-edges:{journey_id}')
+    return {'from_step_id': from_step_id, 'to_step_id': to_step_id, 'lag_days': lag_days}
+
+
+def remove_step_edge(journey_id, from_step_id, to_step_id):
+    """Remove a dependência; retorna False se ela não existir."""
+    deleted = db.session.execute(
+        delete(StepEdge).where(
+            StepEdge.journey_id == journey_id,
+            StepEdge.from_step_id == from_step_id,
+            StepEdge.to_step_id == to_step_id,
+        )
+    ).rowcount
+    if deleted:
+        record_journey_change(journey_id, edges=True)
+    db.session.commit()
+    if deleted:
+        response_cache.bump_version(f'journey-edges:{journey_id}')
+    return bool(deleted)
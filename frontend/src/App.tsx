@@ -4,6 +4,7 @@ import { useState, useEffect } from 'react';
 import reactLogo from './assets/react.svg';
 import viteLogo from '/vite.svg'; // Se estiver usando Vite >= 4
 import './App.css';
+import { apiFetch } from './api';
 
 // Interface para tipar os dados esperados da API (bom para TypeScript)
 interface ApiResponse {
@@ -27,8 +28,8 @@ function App() {
       setError(null); // Limpa erros anteriores
       try {
         // Faz a requisição GET para o endpoint do backend
-        // Certifique-se que a URL está correta (http, host, porta, caminho)
-        const response = await fetch('http://127.0.0.1:5000/api/test/hello');
+        // apiFetch usa API_URL (src/api.ts) e reenvia o header de read-your-writes
+        const response = await apiFetch('/api/test/hello');
 
         // Verifica se a resposta HTTP foi bem-sucedida (status 2xx)
         if (!response.ok) {
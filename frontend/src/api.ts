@@ -0,0 +1,24 @@
+// frontend/src/api.ts
+// fetch para a API Flask com read-your-writes entre réplicas de leitura.
+// O frontend roda em outra origem e não manda credenciais, então o cookie
+// db_primary_until do backend não volta. Depois de uma escrita o backend devolve
+// o header X-DB-Primary-Until; ele é guardado aqui e reenviado enquanto valer,
+// para os GETs seguintes lerem do primário e enxergarem a própria escrita.
+
+export const API_URL = 'http://127.0.0.1:5000';
+
+const STICKY_HEADER = 'X-DB-Primary-Until';
+let primaryUntil: string | null = null; // Timestamp Unix (segundos) devolvido pelo backend
+
+export async function apiFetch(path: string, init: RequestInit = {}): Promise<Response> {
+  const headers = new Headers(init.headers);
+  if (primaryUntil && Number(primaryUntil) * 1000 > Date.now()) {
+    headers.set(STICKY_HEADER, primaryUntil);
+  }
+  const response = await fetch(`${API_URL}${path}`, { ...init, headers });
+  const until = response.headers.get(STICKY_HEADER);
+  if (until) {
+    primaryUntil = until;
+  }
+  return response;
+}
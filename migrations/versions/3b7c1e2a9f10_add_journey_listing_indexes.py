@@ -0,0 +1,28 @@
+"""Add composite indexes for keyset-paginated journey listing
+
+Revision ID: 3b7c1e2a9f10
+Revises: 9dd481ea00e0
+Create Date: 2026-10-18 09:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3b7c1e2a9f10'
+down_revision = '9dd481ea00e0'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('journeys', schema=None) as batch_op:
+        batch_op.create_index('ix_journeys_user_id_id', ['user_id', 'id'], unique=False)
+        batch_op.create_index('ix_journeys_status_id', ['status', 'id'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('journeys', schema=None) as batch_op:
+        batch_op.drop_index('ix_journeys_status_id')
+        batch_op.drop_index('ix_journeys_user_id_id')
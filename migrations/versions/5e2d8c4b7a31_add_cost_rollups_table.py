@@ -0,0 +1,46 @@
+"""Add cost_rollups table with per-step/cost_type spend totals
+
+Revision ID: 5e2d8c4b7a31
+Revises: 3b7c1e2a9f10
+Create Date: 2026-10-18 10:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '5e2d8c4b7a31'
+down_revision = '3b7c1e2a9f10'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('cost_rollups',
+    sa.Column('step_id', sa.Integer(), nullable=False),
+    sa.Column('cost_type', sa.String(length=50), nullable=False),
+    sa.Column('journey_id', sa.Integer(), nullable=False),
+    sa.Column('total', sa.Numeric(precision=14, scale=2), nullable=False),
+    sa.Column('cost_count', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['journey_id'], ['journeys.id'], ondelete='CASCADE'),
+    sa.ForeignKeyConstraint(['step_id'], ['steps.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('step_id', 'cost_type')
+    )
+    with op.batch_alter_table('cost_rollups', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_cost_rollups_journey_id'), ['journey_id'], unique=False)
+
+    # Carga inicial a partir dos custos existentes
+    op.execute(
+        'INSERT INTO cost_rollups (step_id, cost_type, journey_id, total, cost_count) '
+        'SELECT costs.step_id, costs.cost_type, steps.journey_id, SUM(costs.value), COUNT(costs.id) '
+        'FROM costs JOIN steps ON steps.id = costs.step_id '
+        'GROUP BY costs.step_id, costs.cost_type, steps.journey_id'
+    )
+
+
+def downgrade():
+    with op.batch_alter_table('cost_rollups', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_cost_rollups_journey_id'))
+
+    op.drop_table('cost_rollups')
@@ -0,0 +1,81 @@
+"""Add unique natural-key index on costs for idempotent bulk import
+
+Revision ID: 8a4f6d2c1b57
+Revises: 5e2d8c4b7a31
+Create Date: 2026-10-18 11:00:00.000000
+
+Existing duplicates would make the index build fail halfway, so they are
+detected first and the upgrade aborts listing them: costs are money and
+cost_rollups is maintained by the application, so this migration does not
+pick which duplicate survives. On PostgreSQL the index is built with
+CREATE UNIQUE INDEX CONCURRENTLY (outside the migration transaction), which
+does not block writes to costs; an invalid index left by an interrupted
+build is dropped and rebuilt.
+
+"""
+from alembic import context, op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '8a4f6d2c1b57'
+down_revision = '5e2d8c4b7a31'
+branch_labels = None
+depends_on = None
+
+INDEX_NAME = 'uq_costs_natural_key'
+KEY_COLUMNS = ['step_id', 'cost_type', 'timePeriod_start', 'timePeriod_end', 'description']
+KEY_SQL = 'step_id, cost_type, "timePeriod_start", "timePeriod_end", description'
+# NULLs não colidem num índice único: só as chaves completas podem estar duplicadas
+DUPLICATES = sa.text(f'''
+    SELECT {KEY_SQL}, count(*) AS copies, min(id) AS first_id
+    FROM costs
+    WHERE "timePeriod_start" IS NOT NULL AND "timePeriod_end" IS NOT NULL
+    GROUP BY {KEY_SQL}
+    HAVING count(*) > 1
+    ORDER BY count(*) DESC, min(id)
+''')
+SAMPLE_SIZE = 10
+
+
+def _check_duplicates(bind):
+    rows = bind.execute(DUPLICATES).all()
+    if not rows:
+        return
+    sample = '\n'.join(
+        f'  step_id={row.step_id} cost_type={row.cost_type!r} período={row.timePeriod_start}..{row.timePeriod_end} '
+        f'description={row.description!r}: {row.copies} custos (primeiro id {row.first_id})'
+        for row in rows[:SAMPLE_SIZE]
+    )
+    more = f'\n  ... e mais {len(rows) - SAMPLE_SIZE} chaves' if len(rows) > SAMPLE_SIZE else ''
+    raise RuntimeError(
+        f'{INDEX_NAME}: {len(rows)} chaves naturais com custos duplicados; junte ou apague as cópias '
+        f'(e rode flask rebuild-cost-rollups) antes de aplicar esta migração:\n{sample}{more}'
+    )
+
+
+def upgrade():
+    bind = op.get_bind()
+    _check_duplicates(bind)
+    if bind.dialect.name != 'postgresql':
+        with op.batch_alter_table('costs', schema=None) as batch_op:
+            batch_op.create_index(INDEX_NAME, KEY_COLUMNS, unique=True)
+        return
+    # CONCURRENTLY não roda dentro de transação
+    with context.get_context().autocommit_block():
+        invalid = bind.exec_driver_sql(
+            "SELECT 1 FROM pg_index i JOIN pg_class c ON c.oid = i.indexrelid "
+            "WHERE c.relname = %(name)s AND NOT i.indisvalid", {'name': INDEX_NAME}
+        ).first()
+        if invalid:
+            op.execute(f'DROP INDEX CONCURRENTLY {INDEX_NAME}')
+        op.create_index(INDEX_NAME, 'costs', KEY_COLUMNS, unique=True, postgresql_concurrently=True)
+
+
+def downgrade():
+    if op.get_bind().dialect.name != 'postgresql':
+        with op.batch_alter_table('costs', schema=None) as batch_op:
+            batch_op.drop_index(INDEX_NAME)
+        return
+    with context.get_context().autocommit_block():
+        op.drop_index(INDEX_NAME, table_name='costs', postgresql_concurrently=True)
@@ -0,0 +1,42 @@
+"""Add step_edges table for dependencies between steps
+
+Revision ID: a4c8e2f6b913
+Revises: e7b1a9c3d2f4
+Create Date: 2026-10-18 15:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a4c8e2f6b913'
+down_revision = 'e7b1a9c3d2f4'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('step_edges',
+    sa.Column('from_step_id', sa.Integer(), nullable=False),
+    sa.Column('to_step_id', sa.Integer(), nullable=False),
+    sa.Column('journey_id', sa.Integer(), nullable=False),
+    sa.Column('lag_days', sa.Integer(), nullable=False),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True),
+    sa.CheckConstraint('from_step_id <> to_step_id', name='ck_step_edges_no_self_loop'),
+    sa.ForeignKeyConstraint(['from_step_id'], ['steps.id'], ondelete='CASCADE'),
+    sa.ForeignKeyConstraint(['journey_id'], ['journeys.id'], ondelete='CASCADE'),
+    sa.ForeignKeyConstraint(['to_step_id'], ['steps.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('from_step_id', 'to_step_id')
+    )
+    with op.batch_alter_table('step_edges', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_step_edges_journey_id'), ['journey_id'], unique=False)
+        batch_op.create_index(batch_op.f('ix_step_edges_to_step_id'), ['to_step_id'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('step_edges', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_step_edges_to_step_id'))
+        batch_op.drop_index(batch_op.f('ix_step_edges_journey_id'))
+
+    op.drop_table('step_edges')
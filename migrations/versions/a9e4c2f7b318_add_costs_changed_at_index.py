@@ -0,0 +1,33 @@
+"""Add expression index on the cost version for incremental snapshots
+
+Revision ID: a9e4c2f7b318
+Revises: f1b8c5e3a7d6
+Create Date: 2026-10-18 23:00:00.000000
+
+The columnar cost snapshot (backend/cost_snapshot.py) fetches only the costs
+whose coalesce(modificated_at, created_at) is past its high-water mark; this
+index turns that into a range scan instead of a full pass over costs. Both
+PostgreSQL and SQLite support indexes on this expression; on a partitioned
+costs table the index is created on the parent and cascades to the partitions.
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a9e4c2f7b318'
+down_revision = 'f1b8c5e3a7d6'
+branch_labels = None
+depends_on = None
+
+# Mesma expressão de cost_snapshot._version(Cost), para que o planner use o índice
+CHANGED_AT = 'coalesce(modificated_at, created_at)'
+
+
+def upgrade():
+    op.create_index('ix_costs_changed_at', 'costs', [sa.text(CHANGED_AT)])
+
+
+def downgrade():
+    op.drop_index('ix_costs_changed_at', table_name='costs')
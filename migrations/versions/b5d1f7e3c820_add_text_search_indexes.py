@@ -0,0 +1,62 @@
+"""Add full-text search_vector columns and trigram indexes on journeys, steps and costs
+
+Revision ID: b5d1f7e3c820
+Revises: a4c8e2f6b913
+Create Date: 2026-10-18 16:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b5d1f7e3c820'
+down_revision = 'a4c8e2f6b913'
+branch_labels = None
+depends_on = None
+
+# tabela -> (coluna de título, coluna de descrição); mesmas fontes de search.SEARCH_SOURCES
+SOURCES = {
+    'journeys': ('name', 'description'),
+    'steps': ('name', 'description'),
+    'costs': ('description', 'cost_type'),
+}
+CONFIGS = ('portuguese', 'english')
+
+
+def _document(title, body):
+    # Radicais pt e en no mesmo tsvector: título com peso A, descrição com peso B
+    parts = [f"setweight(to_tsvector('{config}', coalesce({column}, '')), '{weight}')"
+             for column, weight in ((title, 'A'), (body, 'B')) for config in CONFIGS]
+    return ' || '.join(parts)
+
+
+def upgrade():
+    bind = op.get_bind()
+    # tsvector e pg_trgm são do PostgreSQL; no SQLite a busca usa FTS5 (criado em search.py)
+    if bind.dialect.name != 'postgresql':
+        return
+    # pg_trgm é um módulo contrib: sem ele a busca usa só o texto completo (search._has_trigram)
+    trigram = bind.execute(sa.text(
+        "SELECT EXISTS (SELECT 1 FROM pg_available_extensions WHERE name = 'pg_trgm')"
+    )).scalar()
+    if trigram:
+        op.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    for table, (title, body) in SOURCES.items():
+        # Coluna gerada armazenada (PostgreSQL 12+): recalculada pelo banco a cada escrita.
+        # Adicioná-la reescreve a tabela; em bases grandes, rode fora do horário de pico.
+        op.execute(f'ALTER TABLE {table} ADD COLUMN search_vector tsvector '
+                   f'GENERATED ALWAYS AS ({_document(title, body)}) STORED')
+        op.create_index(f'ix_{table}_search_vector', table, ['search_vector'], postgresql_using='gin')
+        if trigram:
+            op.execute(f'CREATE INDEX ix_{table}_{title}_trgm ON {table} USING gin (lower({title}) gin_trgm_ops)')
+
+
+def downgrade():
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+    for table, (title, _body) in SOURCES.items():
+        op.execute(f'DROP INDEX IF EXISTS ix_{table}_{title}_trgm')
+        op.drop_index(f'ix_{table}_search_vector', table_name=table)
+        op.drop_column(table, 'search_vector')
+    # A extensão pg_trgm é mantida: outros objetos do banco podem depender dela
@@ -0,0 +1,31 @@
+"""Add jobs.output_path for job outputs spooled to disk
+
+Revision ID: b7d2e5f8c041
+Revises: a9e4c2f7b318
+Create Date: 2026-10-19 10:00:00.000000
+
+Exports no longer build the whole file in memory and store it in
+jobs.output_data: the worker writes it under JOBS_OUTPUT_DIR and the job keeps
+only its path (relative to that directory). output_data stays for outputs
+written before this revision.
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b7d2e5f8c041'
+down_revision = 'a9e4c2f7b318'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('jobs', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('output_path', sa.String(length=500), nullable=True))
+
+
+def downgrade():
+    with op.batch_alter_table('jobs', schema=None) as batch_op:
+        batch_op.drop_column('output_path')
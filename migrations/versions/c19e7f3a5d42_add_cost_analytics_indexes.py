@@ -0,0 +1,35 @@
+"""Add expression indexes on cost periods for spend analytics
+
+Revision ID: c19e7f3a5d42
+Revises: 8a4f6d2c1b57
+Create Date: 2026-10-18 12:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c19e7f3a5d42'
+down_revision = '8a4f6d2c1b57'
+branch_labels = None
+depends_on = None
+
+# Mesma expressão de analytics.cost_period_bounds(), para que o planner use os índices
+PERIOD_START = 'coalesce("timePeriod_start", CAST(timezone(\'UTC\', occoured_at) AS DATE))'
+PERIOD_END = f'coalesce("timePeriod_end", {PERIOD_START})'
+
+
+def upgrade():
+    # Índices de expressão usam funções do PostgreSQL; em outros bancos não há o que criar
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+    op.create_index('ix_costs_step_id_period', 'costs', ['step_id', sa.text(PERIOD_START), sa.text(PERIOD_END)])
+    op.create_index('ix_costs_period', 'costs', [sa.text(PERIOD_START), sa.text(PERIOD_END)])
+
+
+def downgrade():
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+    op.drop_index('ix_costs_period', table_name='costs')
+    op.drop_index('ix_costs_step_id_period', table_name='costs')
@@ -0,0 +1,37 @@
+"""Add journeys.version, changed on every commit that touches a journey
+
+Revision ID: c3f8a1d6e925
+Revises: b7d2e5f8c041
+Create Date: 2026-10-19 12:00:00.000000
+
+ETags and response cache keys were derived from modificated_at/created_at,
+which SQLite stores with one-second resolution: two writes in the same second
+kept the same validator. The application now gives a journey a fresh version
+(backend/journey_events.py) in the same transaction as any write to it or to
+its steps, costs or dependencies. On PostgreSQL the values come from
+journeys_version_seq; on SQLite from max(version) + 1. Existing rows start at 0.
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c3f8a1d6e925'
+down_revision = 'b7d2e5f8c041'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    if op.get_bind().dialect.name == 'postgresql':
+        op.execute('CREATE SEQUENCE journeys_version_seq')
+    with op.batch_alter_table('journeys', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('version', sa.BigInteger(), server_default='0', nullable=False))
+
+
+def downgrade():
+    with op.batch_alter_table('journeys', schema=None) as batch_op:
+        batch_op.drop_column('version')
+    if op.get_bind().dialect.name == 'postgresql':
+        op.execute('DROP SEQUENCE journeys_version_seq')
@@ -0,0 +1,59 @@
+"""Optionally partition costs by HASH(step_id) with an online backfill
+
+Revision ID: c6e9a2d4f718
+Revises: b5d1f7e3c820
+Create Date: 2026-10-18 18:00:00.000000
+
+Opt-in: the number of partitions comes from 'flask db upgrade -x costs_partitions=16'
+or the COSTS_PARTITIONS environment variable; without either (or with 0) this
+revision only records itself and costs stays a plain table. The layout can be
+changed later, online, with 'flask partition-costs'.
+
+Unlike the other revisions this one imports application code: the online
+conversion lives in backend.partitioning and is shared with 'flask
+partition-costs'. Its repartition_costs(engine, partitions) and
+costs_layout(connection) must stay compatible with this revision, or the
+conversion has to be copied in here before they change.
+
+"""
+import os
+
+from alembic import context, op
+
+# Dependência deliberada do código da app (ver docstring): mesma conversão do 'flask partition-costs'
+from backend.partitioning import costs_layout, repartition_costs
+
+
+# revision identifiers, used by Alembic.
+revision = 'c6e9a2d4f718'
+down_revision = 'b5d1f7e3c820'
+branch_labels = None
+depends_on = None
+
+
+def _requested_partitions():
+    value = context.get_x_argument(as_dictionary=True).get('costs_partitions') or os.getenv('COSTS_PARTITIONS')
+    return int(value or 0)
+
+
+def _repartition(partitions):
+    bind = op.get_bind()
+    # Particionamento declarativo é do PostgreSQL; no SQLite costs continua como está
+    if bind.dialect.name != 'postgresql':
+        return
+    if costs_layout(bind)['partitions'] == partitions:
+        return
+    # Conversão online (backfill em lotes, cada um com seu commit): fora da transação da migração
+    with context.get_context().autocommit_block():
+        repartition_costs(bind.engine, partitions, echo=print)
+
+
+def upgrade():
+    partitions = _requested_partitions()
+    if partitions:
+        _repartition(partitions)
+
+
+def downgrade():
+    # Volta costs para uma tabela comum (mesmo caminho online, partitions=0)
+    _repartition(0)
@@ -0,0 +1,45 @@
+"""Add step_pacing table with the latest pacing snapshot per step
+
+Revision ID: e7b1a9c3d2f4
+Revises: c19e7f3a5d42
+Create Date: 2026-10-18 14:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e7b1a9c3d2f4'
+down_revision = 'c19e7f3a5d42'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('step_pacing',
+    sa.Column('step_id', sa.Integer(), nullable=False),
+    sa.Column('journey_id', sa.Integer(), nullable=False),
+    sa.Column('as_of', sa.Date(), nullable=False),
+    sa.Column('budget', sa.Numeric(precision=12, scale=2), nullable=False),
+    sa.Column('expected_spend', sa.Numeric(precision=14, scale=2), nullable=False),
+    sa.Column('actual_spend', sa.Numeric(precision=14, scale=2), nullable=False),
+    sa.Column('burn_rate', sa.Numeric(precision=14, scale=2), nullable=False),
+    sa.Column('projected_spend', sa.Numeric(precision=14, scale=2), nullable=False),
+    sa.Column('pacing_ratio', sa.Float(), nullable=True),
+    sa.Column('status', sa.String(length=20), nullable=False),
+    sa.Column('computed_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True),
+    sa.ForeignKeyConstraint(['step_id'], ['steps.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('step_id')
+    )
+    with op.batch_alter_table('step_pacing', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_step_pacing_journey_id'), ['journey_id'], unique=False)
+        batch_op.create_index(batch_op.f('ix_step_pacing_status'), ['status'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('step_pacing', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_step_pacing_status'))
+        batch_op.drop_index(batch_op.f('ix_step_pacing_journey_id'))
+
+    op.drop_table('step_pacing')
@@ -0,0 +1,101 @@
+"""ON DELETE CASCADE on steps.journey_id and costs.step_id
+
+Revision ID: f1b8c5e3a7d6
+Revises: d3a7f1c9e254
+Create Date: 2026-10-18 20:00:00.000000
+
+Deleting a journey becomes a single DELETE: the database removes steps and costs
+(step_edges, cost_rollups and step_pacing already cascade). On PostgreSQL no
+step holds ACCESS EXCLUSIVE while rows are checked: each constraint is swapped
+for a NOT VALID one (catalog only) and then validated in its own transaction,
+which only takes SHARE UPDATE EXCLUSIVE, so reads and writes go on during the
+scan. PostgreSQL 16 has no NOT VALID foreign keys on partitioned tables, so for
+a partitioned costs the new FK is added NOT VALID and validated on each
+partition, and the parent FK then attaches to those without scanning again.
+On SQLite the tables are recreated in batch mode (the search_fts triggers go
+with the old tables and are recreated); the cascade only applies with
+PRAGMA foreign_keys=ON.
+
+"""
+from alembic import context, op
+
+
+# revision identifiers, used by Alembic.
+revision = 'f1b8c5e3a7d6'
+down_revision = 'd3a7f1c9e254'
+branch_labels = None
+depends_on = None
+
+# (tabela, coluna, tabela referenciada, nome da constraint)
+FOREIGN_KEYS = (
+    ('steps', 'journey_id', 'journeys', 'steps_journey_id_fkey'),
+    ('costs', 'step_id', 'steps', 'costs_step_id_fkey'),
+)
+# Nome das FKs sem nome no SQLite, para o modo batch conseguir removê-las
+NAMING_CONVENTION = {'fk': '%(table_name)s_%(column_0_name)s_fkey'}
+# SQLite: triggers do search_fts de steps e costs como estavam nesta revisão (cópia fixa de
+# backend/search.py, para a migração não mudar junto com o código); o batch os remove
+SEARCH_TRIGGERS = (
+    'CREATE TRIGGER IF NOT EXISTS steps_search_ai AFTER INSERT ON steps BEGIN '
+    'INSERT INTO search_fts (rowid, title, body) VALUES (new.id * 4 + 2, new.name, new.description); END',
+    'CREATE TRIGGER IF NOT EXISTS steps_search_au AFTER UPDATE OF name, description ON steps BEGIN '
+    'DELETE FROM search_fts WHERE rowid = old.id * 4 + 2; '
+    'INSERT INTO search_fts (rowid, title, body) VALUES (new.id * 4 + 2, new.name, new.description); END',
+    'CREATE TRIGGER IF NOT EXISTS steps_search_ad AFTER DELETE ON steps BEGIN '
+    'DELETE FROM search_fts WHERE rowid = old.id * 4 + 2; END',
+    'CREATE TRIGGER IF NOT EXISTS costs_search_ai AFTER INSERT ON costs BEGIN '
+    'INSERT INTO search_fts (rowid, title, body) VALUES (new.id * 4 + 3, new.description, new.cost_type); END',
+    'CREATE TRIGGER IF NOT EXISTS costs_search_au AFTER UPDATE OF description, cost_type ON costs BEGIN '
+    'DELETE FROM search_fts WHERE rowid = old.id * 4 + 3; '
+    'INSERT INTO search_fts (rowid, title, body) VALUES (new.id * 4 + 3, new.description, new.cost_type); END',
+    'CREATE TRIGGER IF NOT EXISTS costs_search_ad AFTER DELETE ON costs BEGIN '
+    'DELETE FROM search_fts WHERE rowid = old.id * 4 + 3; END',
+)
+
+
+def _partitions(table):
+    return op.get_bind().exec_driver_sql(
+        'SELECT inhrelid::regclass::text FROM pg_inherits WHERE inhparent = %(table)s::regclass ORDER BY 1',
+        {'table': table},
+    ).scalars().all()
+
+
+def _swap_foreign_key(table, column, referent, name, ondelete):
+    definition = f'FOREIGN KEY ({column}) REFERENCES {referent} (id)' + (f' ON DELETE {ondelete}' if ondelete else '')
+    partitions = _partitions(table)
+    # Cada ALTER na sua transação: a validação não pode herdar o lock exclusivo da troca
+    with context.get_context().autocommit_block():
+        if not partitions:
+            op.execute(f'ALTER TABLE {table} DROP CONSTRAINT {name}, ADD CONSTRAINT {name} {definition} NOT VALID')
+            op.execute(f'ALTER TABLE {table} VALIDATE CONSTRAINT {name}')
+            return
+        # Nome pela ação: no downgrade as FKs antigas das partições ainda existem
+        suffix = (ondelete or 'no_action').lower().replace(' ', '_')
+        for partition in partitions:
+            op.execute(f'ALTER TABLE {partition} ADD CONSTRAINT {partition}_{column}_fkey_{suffix} {definition} NOT VALID')
+            op.execute(f'ALTER TABLE {partition} VALIDATE CONSTRAINT {partition}_{column}_fkey_{suffix}')
+        # A FK do pai adota as das partições (já validadas) e a antiga sai junto com as suas
+        op.execute(f'ALTER TABLE {table} DROP CONSTRAINT {name}, ADD CONSTRAINT {name} {definition}')
+
+
+def _set_on_delete(ondelete):
+    if op.get_bind().dialect.name == 'postgresql':
+        for table, column, referent, name in FOREIGN_KEYS:
+            _swap_foreign_key(table, column, referent, name, ondelete)
+        return
+    for table, column, referent, name in FOREIGN_KEYS:
+        with op.batch_alter_table(table, schema=None, naming_convention=NAMING_CONVENTION) as batch_op:
+            batch_op.drop_constraint(name, type_='foreignkey')
+            batch_op.create_foreign_key(name, referent, [column], ['id'], ondelete=ondelete)
+    bind = op.get_bind()
+    if bind.exec_driver_sql("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'search_fts'").first():
+        for statement in SEARCH_TRIGGERS:
+            bind.exec_driver_sql(statement)
+
+
+def upgrade():
+    _set_on_delete('CASCADE')
+
+
+def downgrade():
+    _set_on_delete(None)